@@ -1,10 +1,11 @@
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import requests
-import json
+import httpx
+import asyncio
 import os
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
@@ -13,7 +14,34 @@ import traceback
 import logging
 
 import re
-from urllib.parse import quote
+
+from json_provider import json_provider_class
+from metrics_engine import (
+    DASHBOARD_SECTIONS, finalize_language_stats, process_dashboard_metrics, process_dashboard_sections,
+    summarize_daily_stats
+)
+from metrics_columnar import process_dashboard_metrics_columnar, process_dashboard_metrics_with_cube_columnar
+from metrics_cube import MetricsCube, parse_group_by, process_dashboard_metrics_with_cube
+from metrics_rollups import DEFAULT_MAX_POINTS, choose_granularity, rollups_to_dashboard
+from metrics_store import MetricsStore, DEFAULT_STORE_PATH
+from metrics_window import DEFAULT_ROLLUP_WINDOWS
+from records import DailyStats, LanguageStats, PeriodStats
+from user_index import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_FIELDS, USER_STATUSES, UserIndex
+from user_manager import CopilotUserManager
+from response_cache import ResponseCache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+from response_encoding import DEFAULT_MIN_SIZE, ResponseEncoder
+from sync_worker import (
+    SyncWorker, get_warm_data, configured_orgs, window_since,
+    DEFAULT_SYNC_INTERVAL, DEFAULT_SYNC_DAYS
+)
+from async_copilot_api_client import (
+    AsyncGitHubCopilotAPIClient, configure_background_loop, run_async, DEFAULT_EXECUTOR_THREADS
+)
+from copilot_api_client import (
+    GitHubCopilotAPIClient, RateLimitExceeded, SingleFlight, DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES,
+    token_fingerprint
+)
+
 # Configuration du logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -30,15 +58,93 @@ CORS(app, resources={
         # Prod: restrict this to your exact frontend origins
         "origins": "*",
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["ETag"]
     }
 })
 load_dotenv()
 
 # Configuration
-GITHUB_API_BASE = "https://api.github.com"
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 GITHUB_ORG = os.getenv('GITHUB_ORG')
+GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', DEFAULT_POOL_SIZE))
+GITHUB_MAX_RETRIES = int(os.getenv('GITHUB_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+# Stockage local des jours de métriques (SQLite)
+METRICS_STORE_PATH = os.getenv('METRICS_STORE_PATH', DEFAULT_STORE_PATH)
+# Worker de synchronisation (pré-chauffe billing/seats/metrics des organisations configurées)
+SYNC_ENABLED = os.getenv('SYNC_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SYNC_INTERVAL = int(os.getenv('SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL))
+# false sous gunicorn : le worker tourne dans un processus dédié lancé par le master (gunicorn.conf.py)
+SYNC_IN_PROCESS = os.getenv('SYNC_IN_PROCESS', 'true').lower() in ('1', 'true', 'yes')
+# Fenêtres glissantes (en jours) maintenues incrémentalement par le worker
+SYNC_ROLLUP_WINDOWS = tuple(
+    int(days) for days in os.getenv('SYNC_ROLLUP_WINDOWS', ','.join(map(str, DEFAULT_ROLLUP_WINDOWS))).split(',')
+    if days.strip()
+)
+# Cache de réponses partagé par les routes (TTL + LRU)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', DEFAULT_TTL))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+# Compression des réponses de /api/* à partir de RESPONSE_COMPRESSION_MIN_SIZE octets
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE))
+# Durée pendant laquelle une synchronisation réussie autorise un token à lire l'historique stocké
+METRICS_ACCESS_MAX_AGE = int(os.getenv('METRICS_ACCESS_MAX_AGE', max(RESPONSE_CACHE_TTL, 2 * SYNC_INTERVAL)))
+# Threads de la boucle asyncio de fond : synchronisations des métriques et attentes du rate limit
+# de toutes les requêtes en cours du processus (GUNICORN_THREADS requêtes à la fois sous gunicorn)
+ASYNC_EXECUTOR_THREADS = int(os.getenv('ASYNC_EXECUTOR_THREADS', DEFAULT_EXECUTOR_THREADS))
+# Fan-out multi-organisations : nombre d'organisations par requête et appels simultanés
+MAX_ORGS_PER_REQUEST = int(os.getenv('MAX_ORGS_PER_REQUEST', 50))
+ORG_FANOUT_CONCURRENCY = int(os.getenv('ORG_FANOUT_CONCURRENCY', 8))
+# /api/metrics?days= : au-delà de la rétention de l'API Copilot Metrics, la série
+# est lue depuis le stockage local, par semaine ou par mois si elle dépasse METRICS_MAX_POINTS
+METRICS_API_RETENTION_DAYS = int(os.getenv('METRICS_API_RETENTION_DAYS', 100))
+METRICS_MAX_DAYS = int(os.getenv('METRICS_MAX_DAYS', 1100))
+METRICS_MAX_POINTS = int(os.getenv('METRICS_MAX_POINTS', DEFAULT_MAX_POINTS))
+# Breakdown par équipe : appels simultanés et durée de vie du classement en cache
+TEAM_FANOUT_CONCURRENCY = int(os.getenv('TEAM_FANOUT_CONCURRENCY', 8))
+TEAM_METRICS_CACHE_TTL = int(os.getenv('TEAM_METRICS_CACHE_TTL', 900))
+# Pipeline d'agrégation des métriques : 'reducers' (parcours unique) ou 'columnar' (pandas vectorisé)
+METRICS_PIPELINE = os.getenv('METRICS_PIPELINE', 'reducers').lower()
+
+METRICS_PIPELINES = {
+    'reducers': process_dashboard_metrics,
+    'columnar': process_dashboard_metrics_columnar,
+}
+# Mêmes pipelines, construisant aussi le cube date × editor × model × language
+METRICS_CUBE_PIPELINES = {
+    'reducers': process_dashboard_metrics_with_cube,
+    'columnar': process_dashboard_metrics_with_cube_columnar,
+}
+if METRICS_PIPELINE not in METRICS_PIPELINES:
+    raise ValueError(f"METRICS_PIPELINE invalide: {METRICS_PIPELINE} (attendu: {', '.join(METRICS_PIPELINES)})")
+# Sérialisation des réponses JSON : 'orjson' (repli sur 'stdlib' s'il n'est pas installé)
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson').lower()
+app.json = json_provider_class(JSON_PROVIDER)(app)
+# Blocs de /api/metrics sélectionnables par ?sections= / ?fields=
+METRICS_SECTIONS = ('billing',) + tuple(DASHBOARD_SECTIONS)
+# Champs connus des sections faites d'enregistrements (vérifiés par ?fields=)
+METRICS_RECORD_FIELDS = {
+    'users': PeriodStats.__match_args__,
+    'language_stats': LanguageStats.__match_args__,
+}
+
+metrics_store = MetricsStore(METRICS_STORE_PATH)
+configure_background_loop(ASYNC_EXECUTOR_THREADS)
+response_cache = ResponseCache(
+    ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES
+)
+# ETag, 304 et compression gzip/brotli des réponses JSON de /api/*
+response_encoder = ResponseEncoder(
+    cache=response_cache, min_size=RESPONSE_COMPRESSION_MIN_SIZE, compression=RESPONSE_COMPRESSION
+)
+response_encoder.init_app(app)
+
+# Synchronisations des métriques en cours (une seule par token, organisation et fenêtre)
+metrics_sync_flight = SingleFlight()
+
+# Sémaphore global (vit sur la boucle asyncio de fond partagée par toutes les requêtes)
+org_fanout_semaphore = asyncio.Semaphore(ORG_FANOUT_CONCURRENCY)
 
 def is_valid_github_org(org: str) -> bool:
     """Validate GitHub org/user identifier to prevent path injection.
@@ -53,248 +159,481 @@ def is_valid_github_org(org: str) -> bool:
         return False
     return re.match(r'^[A-Za-z0-9](?:[A-Za-z0-9-]{0,37}[A-Za-z0-9])?$', org) is not None
 
-def get_github_headers(token):
+def token_from_header(value):
+    """Extrait le token brut d'un en-tête Authorization ("Bearer xxx" ou "token xxx")."""
+    if not value:
+        return None
+    scheme, _, credentials = value.strip().partition(' ')
+    if credentials and scheme.lower() in ('bearer', 'token'):
+        return credentials.strip()
+    return value.strip()
+
+def get_api_client(token, org):
+    """Construit un client GitHub partageant le pool de connexions du processus."""
+    return GitHubCopilotAPIClient(
+        token, org, pool_size=GITHUB_POOL_SIZE, max_retries=GITHUB_MAX_RETRIES
+    )
+
+def rate_limited_response(error):
+    """Réponse 429 propagée au client lorsque le budget GitHub est épuisé."""
+    logger.warning(f"Rate limit GitHub: {str(error)}")
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def get_async_api_client(token, org):
+    """Construit un client GitHub asynchrone (pool httpx partagé sur la boucle de fond)."""
+    return AsyncGitHubCopilotAPIClient(token, org, pool_size=GITHUB_POOL_SIZE)
+
+def metrics_window(days):
+    """
+    Retourne la fenêtre (since, until) des `days` derniers jours.
+    `since` est aligné sur minuit UTC et `until` est omis (GitHub renvoie
+    jusqu'au dernier jour disponible) : les paramètres restent identiques
+    toute la journée, ce qui permet les requêtes conditionnelles (ETag).
+    """
+    return window_since(days), None
+
+def get_org_warm_data(org, token):
+    """Données pré-chauffées par le worker de synchronisation pour ce token, ou None."""
+    return get_warm_data(
+        metrics_store, org, token, max_age=2 * SYNC_INTERVAL,
+        processor=process_daily_metrics, days=DEFAULT_SYNC_DAYS,
+        rollup_windows=SYNC_ROLLUP_WINDOWS
+    )
+
+def warm_processed_metrics(warm, days=DEFAULT_SYNC_DAYS):
+    """Résultats pré-chauffés pour la fenêtre de `days` jours (fenêtres glissantes du worker), ou None."""
+    if not warm:
+        return None
+    rollups = warm.get('rollups') or {}
+    if days in rollups:
+        return rollups[days]
+    return warm['processed'] if days == DEFAULT_SYNC_DAYS else None
+
+def parse_metrics_days(args):
+    """Paramètre `days` de /api/metrics (90 par défaut) ; None s'il est invalide."""
+    days = args.get('days', default=DEFAULT_SYNC_DAYS, type=int)
+    if days is None or not 1 <= days <= METRICS_MAX_DAYS:
+        return None
+    return days
+
+def parse_metrics_fields(args):
+    """
+    Paramètres `sections` et `fields` de /api/metrics (listes séparées par des
+    virgules). `sections` choisit les blocs renvoyés parmi METRICS_SECTIONS ;
+    `fields` restreint les clés d'un bloc (`global_metrics.total_suggestions`,
+    `users.day`) et demande ce bloc. Sans l'un ni l'autre, tout est renvoyé.
+
+    Returns:
+        Tuple[sections (frozenset), fields ({section: frozenset de champs})]
+
+    Raises:
+        ValueError: section ou champ inconnu
+    """
+    def values(name):
+        return [part.strip() for value in args.getlist(name) for part in value.split(',') if part.strip()]
+
+    sections = set(values('sections'))
+    fields = {}
+    for path in values('fields'):
+        section, _, name = path.partition('.')
+        if not name:
+            raise ValueError(f"Champ invalide: {path} (attendu: section.champ)")
+        fields.setdefault(section, set()).add(name)
+    unknown = sorted((sections | set(fields)) - set(METRICS_SECTIONS))
+    if unknown:
+        raise ValueError(f"Section inconnue: {', '.join(unknown)} (attendu: {', '.join(METRICS_SECTIONS)})")
+    for section, names in fields.items():
+        unknown = sorted(names - set(METRICS_RECORD_FIELDS.get(section, names)))
+        if unknown:
+            raise ValueError(f"Champ inconnu pour {section}: {', '.join(unknown)}")
+    sections |= set(fields)
+    return (frozenset(sections or METRICS_SECTIONS),
+            {section: frozenset(names) for section, names in fields.items()})
+
+def select_fields(section, value, names):
+    """Restreint le bloc `section` de /api/metrics aux champs `names` (tous si None)."""
+    if names is None or value is None:
+        return value
+    if section == 'users':
+        return [{name: day[name] for name in names if name in day} for day in value]
+    if section == 'language_stats':
+        return {language: {name: stats[name] for name in names} for language, stats in value.items()}
+    return {name: value[name] for name in names if name in value}
+
+def usage_response(processed, sections=METRICS_SECTIONS, fields=None):
+    """Bloc `usage` de /api/metrics, limité aux sections et champs demandés."""
+    fields = fields or {}
     return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json",
-        "X-GitHub-Api-Version": "2022-11-28"
+        section: select_fields(section, value, fields.get(section))
+        for section, value in zip(DASHBOARD_SECTIONS, processed) if section in sections
     }
 
-def process_users_from_metrics(daily_metrics, language_stats):
+def parse_users_query(args):
+    """
+    Paramètres de /api/users : sort, order, limit (1 à MAX_PAGE_SIZE), cursor
+    et filtres status / editor (listes séparées par des virgules).
+
+    Raises:
+        ValueError: paramètre invalide (le tri, l'ordre et le curseur sont
+        vérifiés par UserIndex.page)
+    """
+    limit = args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Paramètre limit invalide (1 à {MAX_PAGE_SIZE})")
+
+    def values(name):
+        parts = frozenset(part.strip().lower() for part in args.get(name, '').split(',') if part.strip())
+        return parts or None
+
+    statuses = values('status')
+    unknown = sorted((statuses or set()) - set(USER_STATUSES))
+    if unknown:
+        raise ValueError(f"Statut inconnu: {', '.join(unknown)} (attendu: {', '.join(USER_STATUSES)})")
+    sort = args.get('sort', 'login')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Tri inconnu: {sort} (attendu: {', '.join(SORT_FIELDS)})")
+    return sort, args.get('order'), limit, args.get('cursor'), statuses, values('editor')
+
+def user_index_key(org, token):
+    """Clé du cache de réponses pour l'index des utilisateurs d'une organisation."""
+    return ('users', org.lower(), token_fingerprint(token))
+
+def get_user_index(org, token):
+    """
+    Index trié des utilisateurs, construit une fois par liste de sièges et
+    gardé en cache : les pages suivantes, autres tris et filtres le
+    réutilisent sans redemander les sièges. Il est reconstruit dès que le
+    worker de synchronisation a pré-chauffé de nouveaux sièges : l'entrée
+    garde l'horodatage de la synchronisation (et non les sièges bruts, qui
+    ne sont pas comptés dans la taille de l'index).
+    """
+    key = user_index_key(org, token)
+    warm = get_org_warm_data(org, token)
+    synced_at = warm['synced_at'] if warm else None
+    cached = response_cache.get(key)
+    if cached is not None and (warm is None or cached[0] == synced_at):
+        return cached[1]
+    seats_data = warm['seats'] if warm else get_api_client(token, org).get_all_seats()
+    rows = CopilotUserManager.process_users_data(seats_data)
+    index = UserIndex.from_user_rows(rows, seats_data.get('total_seats') or len(rows))
+    response_cache.set(key, (synced_at, index), size=index.estimated_size())
+    return index
+
+def load_org_users(token, org):
+    """
+    Utilisateurs de l'organisation pour les exports : les lignes de l'index
+    de /api/users (get_user_index), sans nouvel appel à GitHub tant que
+    l'index est en cache.
+
+    Returns:
+        Tuple[users, user_metrics]
     """
-    Extrait les données utilisateurs depuis les métriques Copilot (API GA)
-    pour remplacer l'ancienne API /copilot/usage
+    users = get_user_index(org, token).users
+    return users, CopilotUserManager.summarize_users(users)
+
+def merge_processed_metrics(per_org_results):
     """
-    logger.debug("Traitement des données utilisateurs depuis les métriques")
+    Fusionne les résultats de process_daily_metrics de plusieurs organisations.
+    Les compteurs quotidiens et par langage sont additionnés (les organisations
+    sont des populations distinctes), puis les métriques globales sont recalculées.
 
-    user_stats = {}
-    global_user_metrics = {
-        'total_users': 0,
-        'active_users': 0,
-        'inactive_users': 0
-    }
+    Args:
+        per_org_results: Liste de tuples (daily_metrics, global_metrics, language_stats)
 
-    try:
-        for day_data in daily_metrics or []:
-            date_str = day_data.get('date', day_data.get('day', 'Unknown'))
-
-            # Comptabiliser les utilisateurs actifs ce jour-là
-            active_users_today = set()
-
-            # Parcourir les données par langage pour extraire les utilisateurs
-            for lang_name, lang_data in language_stats.items():
-                if 'active_users' in lang_data and isinstance(lang_data['active_users'], list):
-                    # Les métriques incluent parfois des listes d'utilisateurs actifs
-                    active_users_today.update(lang_data['active_users'])
-
-            # Si nous n'avons pas de données détaillées, utiliser le total du jour
-            if not active_users_today and 'active_users' in day_data:
-                active_users_today.add(f"user_{day_data['active_users']}")
-
-            # Mettre à jour les statistiques globales
-            for user_id in active_users_today:
-                if user_id not in user_stats:
-                    user_stats[user_id] = {
-                        'login': user_id,
-                        'total_suggestions': 0,
-                        'accepted_suggestions': 0,
-                        'rejected_suggestions': 0,
-                        'languages_used': set(),
-                        'active_days': set(),
-                        'last_activity': date_str,
-                        'is_active': True
-                    }
-
-                user_stats[user_id]['active_days'].add(date_str)
-                user_stats[user_id]['total_suggestions'] += day_data.get('total_suggestions', 0)
-                user_stats[user_id]['accepted_suggestions'] += day_data.get('accepted_suggestions', 0)
-                user_stats[user_id]['rejected_suggestions'] += day_data.get('rejected_suggestions', 0)
-
-                # Ajouter les langages utilisés
-                for lang_name in language_stats.keys():
-                    user_stats[user_id]['languages_used'].add(lang_name)
-
-        # Calculer les métriques finales pour chaque utilisateur
-        users = []
-        for user_id, stats in user_stats.items():
-            total_suggestions = stats['total_suggestions']
-            acceptance_rate = 0
-            if total_suggestions > 0:
-                acceptance_rate = (stats['accepted_suggestions'] / total_suggestions) * 100
-
-            user = {
-                'login': stats['login'],
-                'name': stats['login'],  # Nom d'utilisateur comme nom d'affichage
-                'avatar_url': f"https://github.com/{stats['login']}.png",  # Avatar par défaut GitHub
-                'last_activity': stats['last_activity'],
-                'last_editor': 'VS Code',  # Valeur par défaut
-                'created_at': None,  # Non disponible dans cette API
-                'total_suggestions': total_suggestions,
-                'accepted_suggestions': stats['accepted_suggestions'],
-                'rejected_suggestions': stats['rejected_suggestions'],
-                'acceptance_rate': round(acceptance_rate, 2),
-                'languages_used': list(stats['languages_used']),
-                'active_days_count': len(stats['active_days']),
-                'is_active': stats['is_active']
-            }
-            users.append(user)
-
-        global_user_metrics['total_users'] = len(users)
-        global_user_metrics['active_users'] = len([u for u in users if u['is_active']])
-        global_user_metrics['inactive_users'] = global_user_metrics['total_users'] - global_user_metrics['active_users']
-
-        logger.debug(f"Utilisateurs traités: {len(users)}")
-        return users, global_user_metrics
+    Returns:
+        Tuple[daily_metrics, global_metrics, language_stats]
+    """
+    summed_fields = (
+        'accepted_suggestions', 'total_suggestions', 'active_users', 'lines_suggested',
+        'lines_accepted', 'chat_turns', 'chat_acceptances',
+    )
+    language_fields = ('suggestions', 'acceptances', 'lines_suggested', 'lines_accepted', 'active_users')
 
-    except Exception as e:
-        logger.error(f"Erreur lors du traitement des utilisateurs: {str(e)}")
-        return [], {'total_users': 0, 'active_users': 0, 'inactive_users': 0}
+    days = {}
+    language_stats = {}
+    for daily_metrics, _, org_language_stats in per_org_results:
+        for day in daily_metrics:
+            merged = days.get(day['day'])
+            if merged is None:
+                merged = days[day['day']] = DailyStats(day['day'], *(0,) * 9)
+            for field in summed_fields:
+                merged[field] += day[field]
+        for lang_name, stats in org_language_stats.items():
+            merged = language_stats.get(lang_name)
+            if merged is None:
+                merged = language_stats[lang_name] = LanguageStats()
+            for field in language_fields:
+                merged[field] += stats[field]
+
+    processed_data = []
+    for day_str in sorted(days):
+        day = days[day_str]
+        day['rejected_suggestions'] = max(day['total_suggestions'] - day['accepted_suggestions'], 0)
+        day['acceptance_rate'] = (
+            day['accepted_suggestions'] / day['total_suggestions'] * 100
+        ) if day['total_suggestions'] > 0 else 0
+        processed_data.append(day)
+
+    return processed_data, summarize_daily_stats(processed_data), finalize_language_stats(language_stats)
 
 def process_daily_metrics(daily_metrics):
     """
     Transforme la réponse Copilot Metrics API (GA) en format utilisable par le frontend.
-    Attend une liste de jours, chaque jour contenant des blocs
-    comme `copilot_ide_code_completions`, `copilot_ide_chat`, etc.
+    Le pipeline METRICS_PIPELINE produit en une passe statistiques quotidiennes,
+    métriques globales et statistiques par langage ; le mode 'columnar' calcule
+    les agrégats par group-by pandas, plus rapide sur les gros volumes.
     """
-    logger.debug("Traitement des données quotidiennes (Copilot Metrics API)")
+    logger.debug(f"Traitement des données quotidiennes (Copilot Metrics API, pipeline={METRICS_PIPELINE})")
 
-    processed_data = []
-    global_metrics = {
-        'total_lines_suggested': 0,
-        'total_lines_accepted': 0,
-        'active_days': 0,
-        'total_suggestions': 0,
-        'total_users': 0,
-        'total_chat_turns': 0,
-        'total_chat_acceptances': 0,
-    }
+    try:
+        processed_data, global_metrics, language_stats = METRICS_PIPELINES[METRICS_PIPELINE](daily_metrics)
+    except Exception as e:
+        logger.error(f"Erreur lors du traitement des données: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise
 
-    # Agrégats par langage sur toute la période
-    language_stats = {}
+    logger.debug(f"Métriques globales: {global_metrics}")
+    logger.debug(f"Nombre de langages traités: {len(language_stats)}")
 
-    try:
-        for day_data in daily_metrics or []:
-            date_str = day_data.get('date', day_data.get('day', 'Unknown'))
-
-            # Code completions
-            completions = day_data.get('copilot_ide_code_completions', {}) or {}
-            editors = completions.get('editors', []) or []
-
-            day_suggestions = 0
-            day_acceptances = 0
-            day_lines_suggested = 0
-            day_lines_accepted = 0
-
-            # Agrégation par langage (jour)
-            for editor in editors:
-                for model in editor.get('models', []) or []:
-                    for lang in model.get('languages', []) or []:
-                        lang_name = lang.get('name', 'unknown')
-                        suggestions = int(lang.get('total_code_suggestions', 0) or 0)
-                        acceptances = int(lang.get('total_code_acceptances', 0) or 0)
-                        lines_sugg = int(lang.get('total_code_lines_suggested', 0) or 0)
-                        lines_acc = int(lang.get('total_code_lines_accepted', 0) or 0)
-                        active_users_lang = int(lang.get('total_engaged_users', 0) or 0)
-
-                        day_suggestions += suggestions
-                        day_acceptances += acceptances
-                        day_lines_suggested += lines_sugg
-                        day_lines_accepted += lines_acc
-
-                        if lang_name not in language_stats:
-                            language_stats[lang_name] = {
-                                'suggestions': 0,
-                                'acceptances': 0,
-                                'lines_suggested': 0,
-                                'lines_accepted': 0,
-                                'active_users': 0,
-                            }
-                        stats = language_stats[lang_name]
-                        stats['suggestions'] += suggestions
-                        stats['acceptances'] += acceptances
-                        stats['lines_suggested'] += lines_sugg
-                        stats['lines_accepted'] += lines_acc
-                        stats['active_users'] = max(stats['active_users'], active_users_lang)
-
-            # Chat
-            chat = day_data.get('copilot_ide_chat', {}) or {}
-            chat_editors = chat.get('editors', []) or []
-            day_chat_turns = 0
-            day_chat_acceptances = 0
-            for editor in chat_editors:
-                for model in editor.get('models', []) or []:
-                    day_chat_turns += int(model.get('total_chats', 0) or 0)
-                    day_chat_acceptances += int(model.get('total_chat_insertion_events', 0) or 0)
-                    day_chat_acceptances += int(model.get('total_chat_copy_events', 0) or 0)
-
-            active_users_day = int(day_data.get('total_active_users', 0) or 0)
-
-            daily_stats = {
-                'day': date_str,
-                'accepted_suggestions': day_acceptances,
-                'rejected_suggestions': max(day_suggestions - day_acceptances, 0),
-                'total_suggestions': day_suggestions,
-                'active_users': active_users_day,
-                'lines_suggested': day_lines_suggested,
-                'lines_accepted': day_lines_accepted,
-                'chat_turns': day_chat_turns,
-                'chat_acceptances': day_chat_acceptances,
-                'acceptance_rate': (day_acceptances / day_suggestions * 100) if day_suggestions > 0 else 0,
-            }
-
-            if day_suggestions > 0:
-                global_metrics['active_days'] += 1
-                global_metrics['total_suggestions'] += day_suggestions
-                global_metrics['total_lines_suggested'] += day_lines_suggested
-                global_metrics['total_lines_accepted'] += day_lines_accepted
-                global_metrics['total_users'] = max(global_metrics['total_users'], active_users_day)
-                global_metrics['total_chat_turns'] += day_chat_turns
-                global_metrics['total_chat_acceptances'] += day_chat_acceptances
-
-            processed_data.append(daily_stats)
+    return processed_data, global_metrics, language_stats
 
+def analyze_daily_metrics(daily_metrics):
+    """
+    Comme process_daily_metrics, en construisant aussi dans le même parcours
+    le cube date × editor × model × language.
+
+    Returns:
+        Tuple[(daily_metrics, global_metrics, language_stats), MetricsCube]
+    """
+    try:
+        return METRICS_CUBE_PIPELINES[METRICS_PIPELINE](daily_metrics)
     except Exception as e:
         logger.error(f"Erreur lors du traitement des données: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise
 
-    # Calcul des métriques moyennes
-    if global_metrics['active_days'] > 0:
-        global_metrics['average_suggestions_per_day'] = round(
-            global_metrics['total_suggestions'] / global_metrics['active_days'], 2
+async def fetch_org_metrics_async(token, org, days=90, include_metrics=True, include_billing=True):
+    """
+    Récupère en parallèle la facturation et les métriques d'une organisation.
+    La latence est celle de l'appel le plus lent et non plus leur somme.
+    Les métriques sont synchronisées de façon incrémentale dans metrics_store
+    (sync_org_usage, pages parsées en flux dans un thread), puis la fenêtre
+    demandée est relue depuis le stockage par lots : usage_data est un
+    itérateur à parcourir une seule fois. Avec include_metrics=False seule la
+    facturation est demandée (usage_data = None), avec include_billing=False
+    seules les métriques (billing_data = None).
+
+    Returns:
+        Tuple[billing_data, usage_data, notice]
+    """
+    since_iso, until_iso = metrics_window(days)
+    client = get_async_api_client(token, org)
+
+    async def sync_metrics():
+        if include_metrics:
+            await asyncio.to_thread(sync_org_usage, token, org, since_iso, until_iso)
+
+    results, metrics_result = await asyncio.gather(
+        client.get_dashboard_data(include_billing=include_billing, include_seats=False, include_metrics=False),
+        sync_metrics(),
+        return_exceptions=True
+    )
+    if isinstance(results, Exception):
+        raise results
+    billing_result = results['billing']
+
+    # 1) Billing
+    if isinstance(billing_result, httpx.HTTPStatusError):
+        # Ne pas bloquer si la facturation n'est pas accessible (401/404 fréquents si l'utilisateur n'est pas admin)
+        logger.warning(f"Billing unavailable ({billing_result.response.status_code}). Continuing without billing. Body={billing_result.response.text}")
+        billing_data = { 'seat_breakdown': {}, 'warning': 'billing_unavailable' }
+    elif isinstance(billing_result, Exception):
+        raise billing_result
+    else:
+        billing_data = billing_result
+
+    # 2) Metrics (GA endpoint)
+    notice = None
+    if isinstance(metrics_result, requests.exceptions.HTTPError) and metrics_result.response is not None:
+        # Graceful fallback: return empty usage with a notice instead of failing the entire request
+        logger.error(f"Metrics error: {metrics_result.response.text}")
+        usage_data = []
+        notice = (
+            "Copilot metrics are unavailable (metrics API returned "
+            f"{metrics_result.response.status_code}). Ensure the Copilot Metrics API access policy is enabled for the org, "
+            "and that your token has the required scopes (manage_billing:copilot or read:org)."
         )
-        total_acceptances = sum(day['accepted_suggestions'] for day in processed_data)
-        total_suggestions = sum(day['total_suggestions'] for day in processed_data)
-        global_metrics['average_acceptance_rate'] = round(
-            (total_acceptances / total_suggestions * 100), 2
-        ) if total_suggestions > 0 else 0
-        if global_metrics['total_users'] > 0:
-            global_metrics['average_suggestions_per_user'] = round(
-                global_metrics['total_suggestions'] / global_metrics['total_users'], 2
+    elif isinstance(metrics_result, Exception):
+        raise metrics_result
+    elif not include_metrics:
+        usage_data = None
+    else:
+        usage_data = metrics_store.iter_days(org, since_iso, until_iso)
+
+    return billing_data, usage_data, notice
+
+def sync_org_usage(token, org, since_iso, until_iso=None):
+    """
+    Écrit dans metrics_store les jours de la fenêtre qui manquent (ceux
+    postérieurs au dernier jour stocké si la plage synchronisée couvre déjà
+    le début de la fenêtre, sinon toute la fenêtre). Les pages sont parsées
+    en flux (stream_metrics) et les jours écrits par lots, la mémoire reste
+    donc bornée quel que soit le volume. Les appels
+    simultanés pour le même token, la même organisation et la même fenêtre
+    partagent une seule synchronisation. Une synchronisation réussie autorise
+    le token à lire l'historique stocké (metrics_access_granted), un refus de
+    GitHub lui retire cet accès.
+
+    Returns:
+        Nombre de jours écrits
+    """
+    token_fp = token_fingerprint(token)
+
+    def sync():
+        since = metrics_store.sync_since(org, since_iso)
+        try:
+            written = metrics_store.upsert_days(
+                org, get_api_client(token, org).stream_metrics(since=since, until=until_iso)
             )
+        except requests.exceptions.HTTPError:
+            metrics_store.revoke_access(org, token_fp)
+            raise
+        metrics_store.mark_synced(org, since, until_iso)
+        metrics_store.grant_access(org, token_fp)
+        return written
+
+    key = (token_fp, org.lower(), since_iso, until_iso)
+    return metrics_sync_flight.do(key, sync)
+
+def metrics_access_granted(org, token):
+    """
+    Indique si `token` a récemment synchronisé les métriques de `org` avec
+    succès : l'historique de metrics_store est commun à tous les tokens, il
+    n'est lu hors d'une synchronisation que pour ceux-là.
+    """
+    return metrics_store.has_access(org, token_fingerprint(token), METRICS_ACCESS_MAX_AGE)
+
+def metrics_cache_key(org, token, days=90):
+    """Clé du cache de réponses pour la fenêtre de métriques d'une organisation."""
+    since_iso, until_iso = metrics_window(days)
+    return ('metrics', org.lower(), token_fingerprint(token), since_iso, until_iso)
+
+def cache_org_metrics(org, token, processed, days=90, cube=None):
+    """
+    Mémorise le tuple traité d'une organisation (et son cube s'il est fourni).
+    Les jours bruts ne sont pas gardés : ils restent dans metrics_store.
+    """
+    response_cache.set(metrics_cache_key(org, token, days), {'processed': processed})
+    if cube is not None:
+        response_cache.set(metrics_cube_key(org, token, days), cube, size=cube.estimated_size())
+
+def metrics_cube_key(org, token, days=90):
+    """Clé du cache de réponses pour le cube d'une organisation."""
+    return ('cube',) + metrics_cache_key(org, token, days)[1:]
+
+def get_metrics_cube(org, token, days=90):
+    """
+    Cube de la fenêtre de métriques : en cache, sinon reconstruit à partir des
+    jours du stockage local, relus par lots. Sans synchronisation réussie de
+    ce token (metrics_access_granted), le cube est vide et n'est pas mis en cache.
+    """
+    cube = response_cache.get(metrics_cube_key(org, token, days))
+    if cube is None:
+        if not metrics_access_granted(org, token):
+            return MetricsCube()
+        _, cube = analyze_daily_metrics(metrics_store.iter_days(org, *metrics_window(days)))
+        response_cache.set(metrics_cube_key(org, token, days), cube, size=cube.estimated_size())
+    return cube
+
+def breakdown_response(cube, group_by):
+    """Bloc `breakdown` de /api/metrics : le cube découpé selon `group_by`."""
+    return {'group_by': list(group_by), 'rows': cube.slice(group_by)}
+
+def get_long_range_metrics(token, org, days, include_billing=True):
+    """
+    Métriques d'une période plus longue que la rétention de l'API : les jours
+    récents sont synchronisés dans le stockage, puis la série est lue à la
+    granularité la plus fine qui tient en METRICS_MAX_POINTS points (jours,
+    semaines ISO ou mois, ces derniers depuis les résumés pré-calculés ;
+    les périodes en bordure sont prises en entier). Le stockage n'est lu que
+    si ce token a pu synchroniser l'organisation : sinon l'usage est vide,
+    accompagné de la notice, et rien n'est mis en cache.
+
+    Returns:
+        Tuple[billing_data, processed, notice, granularity]
+    """
+    granularity = choose_granularity(days, METRICS_MAX_POINTS)
+    since_iso = window_since(days)
+    key = ('range', org.lower(), token_fingerprint(token), since_iso, granularity)
+    processed = response_cache.get(key)
+    billing_data, notice = None, None
+    if include_billing or processed is None:
+        billing_data, _, notice = fetch_org_metrics(
+            token, org, METRICS_API_RETENTION_DAYS, include_metrics=processed is None,
+            include_billing=include_billing
+        )
+    if processed is None:
+        if notice is not None or not metrics_access_granted(org, token):
+            return billing_data, process_daily_metrics([]), notice, granularity
+        if granularity == 'day':
+            processed = process_daily_metrics(metrics_store.iter_days(org, since_iso))
         else:
-            global_metrics['average_suggestions_per_user'] = 0
-
-        max_active_users = max((day['active_users'] for day in processed_data), default=0)
-        global_metrics['seats_usage_rate'] = round(
-            (max_active_users / global_metrics['total_users'] * 100), 2
-        ) if global_metrics['total_users'] > 0 else 0
-
-    # Ajout des taux d'acceptation pour chaque langage
-    for lang_name, stats in language_stats.items():
-        stats['acceptance_rate'] = (
-            stats['acceptances'] / stats['suggestions'] * 100
-        ) if stats['suggestions'] > 0 else 0
-
-    # Tri des langages par suggestions
-    language_stats = dict(
-        sorted(language_stats.items(), key=lambda x: x[1]['suggestions'], reverse=True)
+            processed = rollups_to_dashboard(metrics_store.get_rollups(org, granularity, since_iso))
+        response_cache.set(key, processed)
+    return billing_data, processed, notice, granularity
+
+def get_metrics_sections(token, org, days, sections, include_billing=True):
+    """
+    Métriques de la fenêtre de `days` jours limitées aux `sections` du
+    dashboard : le tuple complet en cache est réutilisé s'il existe, sinon
+    seuls les reducers de ces sections sont alimentés et le résultat partiel
+    est mis en cache sous sa propre clé. Aucun appel à GitHub n'est fait si
+    le résultat est en cache et que la facturation n'est pas demandée.
+
+    Returns:
+        Tuple[billing_data, processed, notice] (sections non demandées à None)
+    """
+    base_key = metrics_cache_key(org, token, days)
+    key = ('sections',) + base_key[1:] + (tuple(sorted(sections)),)
+    cached = response_cache.get(base_key)
+    processed = cached['processed'] if cached else response_cache.get(key)
+    if processed is None and not sections:
+        processed = (None, None, None)
+    if processed is not None and not include_billing:
+        return None, processed, None
+    billing_data, usage_data, notice = fetch_org_metrics(
+        token, org, days, include_metrics=processed is None, include_billing=include_billing
     )
+    if processed is None:
+        processed = process_dashboard_sections(usage_data, sections)
+        if notice is None:
+            response_cache.set(key, processed)
+    return billing_data, processed, notice
 
-    logger.debug(f"Métriques globales: {global_metrics}")
-    logger.debug(f"Nombre de langages traités: {len(language_stats)}")
+def fetch_org_metrics(token, org, days=90, include_metrics=True, include_billing=True):
+    """Version synchrone de fetch_org_metrics_async (pour les routes Flask)."""
+    return run_async(fetch_org_metrics_async(token, org, days, include_metrics, include_billing))
 
-    return processed_data, global_metrics, language_stats
+def fetch_orgs_metrics(token, orgs, days=90, cached_orgs=(), include_billing=True):
+    """
+    Récupère plusieurs organisations en parallèle, sous la limite globale
+    ORG_FANOUT_CONCURRENCY partagée par toutes les requêtes du processus.
+    Pour les organisations de `cached_orgs`, seule la facturation est demandée.
+
+    Returns:
+        Liste alignée sur `orgs` : tuple (billing, usage, notice) ou exception
+    """
+    async def fetch_bounded(org):
+        async with org_fanout_semaphore:
+            return await fetch_org_metrics_async(token, org, days, include_metrics=org not in cached_orgs,
+                                                 include_billing=include_billing)
+
+    async def fetch_all():
+        return await asyncio.gather(*(fetch_bounded(org) for org in orgs), return_exceptions=True)
+
+    return run_async(fetch_all())
 
 @app.route('/api/save-token', methods=['POST'])
 def save_token():
@@ -322,16 +661,8 @@ def save_token():
     logger.info(f"Saved token and org. Testing GitHub API...")  
     
     # Test the token immediately
-    headers = get_github_headers(token)
     try:
-        safe_org = quote(org, safe='')
-        test_response = requests.get(
-            f"{GITHUB_API_BASE}/orgs/{safe_org}",
-            headers=headers,
-            timeout=10,
-            allow_redirects=False
-        )
-        test_response.raise_for_status()
+        get_api_client(token, org).get_organization()
         logger.info(f"GitHub API test successful")  
     except Exception as e:
         logger.error(f"GitHub API test failed: {str(e)}")  
@@ -342,81 +673,241 @@ def save_token():
 @app.route('/api/metrics', methods=['GET'])
 def get_metrics():
     try:
-        token = request.headers.get('Authorization')
+        token = token_from_header(request.headers.get('Authorization'))
         if not token:
             return jsonify({'error': 'Token manquant'}), 401
             
-        org = request.args.get('org')
-        if not org:
+        orgs = parse_org_list(request.args)
+        if not orgs:
             return jsonify({'error': 'Organisation manquante'}), 400
-        if not is_valid_github_org(org):
-            return jsonify({'error': 'Organisation invalide'}), 400
+        if len(orgs) > MAX_ORGS_PER_REQUEST:
+            return jsonify({'error': f'Trop d\'organisations (maximum {MAX_ORGS_PER_REQUEST})'}), 400
+        invalid = [o for o in orgs if not is_valid_github_org(o)]
+        if invalid:
+            return jsonify({'error': 'Organisation invalide', 'organizations': invalid}), 400
+        days = parse_metrics_days(request.args)
+        if days is None:
+            return jsonify({'error': f'Paramètre days invalide (1 à {METRICS_MAX_DAYS})'}), 400
+        try:
+            group_by = parse_group_by(request.args.get('group_by'))
+            sections, fields = parse_metrics_fields(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if 'orgs' in request.args or len(orgs) > 1:
+            if days > METRICS_API_RETENTION_DAYS:
+                return jsonify({'error': f'Plus de {METRICS_API_RETENTION_DAYS} jours : une seule organisation'}), 400
+            return get_multi_org_metrics(token, orgs, days, group_by, sections, fields)
+        org = orgs[0]
+        include_billing = 'billing' in sections
+        usage_sections = sections & set(DASHBOARD_SECTIONS)
             
-        headers = {
-            'Authorization': token,
-            'Accept': 'application/vnd.github+json',
-            'X-GitHub-Api-Version': '2022-11-28'
-        }
-        
-        logger.info(f"Récupération des métriques pour l'organisation: {org}")
-        safe_org = quote(org, safe='')
-        
-        # 1) Billing
-        billing_url = f'https://api.github.com/orgs/{safe_org}/copilot/billing'
-        billing_response = requests.get(billing_url, headers=headers, timeout=20, allow_redirects=False)
-        if billing_response.status_code != 200:
-            # Ne pas bloquer si la facturation n'est pas accessible (401/404 fréquents si l'utilisateur n'est pas admin)
-            logger.warning(f"Billing unavailable ({billing_response.status_code}). Continuing without billing. Body={billing_response.text}")
-            billing_data = { 'seat_breakdown': {}, 'warning': 'billing_unavailable' }
+        cube = None
+        granularity = 'day'
+        warm = get_org_warm_data(org, token) if days <= METRICS_API_RETENTION_DAYS else None
+        warm_metrics = warm_processed_metrics(warm, days)
+        if days > METRICS_API_RETENTION_DAYS:
+            logger.info(f"Récupération des métriques longue période ({days} jours) pour l'organisation: {org}")
+            billing_data, processed, notice, granularity = get_long_range_metrics(token, org, days, include_billing)
+        elif warm_metrics:
+            logger.info(f"Métriques pré-chauffées servies pour l'organisation: {org}")
+            billing_data, notice = warm['billing'], None
+            processed = warm_metrics
+        elif len(usage_sections) < len(DASHBOARD_SECTIONS) and group_by is None:
+            # Widgets : seules les sections demandées sont calculées
+            logger.info(f"Récupération des sections {sorted(sections)} pour l'organisation: {org}")
+            billing_data, processed, notice = get_metrics_sections(token, org, days, usage_sections, include_billing)
         else:
-            billing_data = billing_response.json()
-        
-        # 2) Metrics (GA endpoint)
-        from datetime import datetime, timedelta
-        now_utc = datetime.utcnow()
-        until_iso = now_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
-        # Augmenter la période à 90 jours pour plus de données
-        since_iso = (now_utc - timedelta(days=90)).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-        metrics_url = f'https://api.github.com/orgs/{safe_org}/copilot/metrics'
-        metrics_response = requests.get(
-            metrics_url,
-            headers=headers,
-            params={'since': since_iso, 'until': until_iso, 'per_page': 100},
-            timeout=20,
-            allow_redirects=False
-        )
-        logger.info(f"Metrics status: {metrics_response.status_code}")
-        if metrics_response.status_code != 200:
-            # Graceful fallback: return empty usage with a notice instead of failing the entire request
-            error_msg = metrics_response.text
-            logger.error(f"Metrics error: {error_msg}")
-            usage_data = []
-            notice = (
-                "Copilot metrics are unavailable (metrics API returned "
-                f"{metrics_response.status_code}). Ensure the Copilot Metrics API access policy is enabled for the org, "
-                "and that your token has the required scopes (manage_billing:copilot or read:org)."
+            logger.info(f"Récupération des métriques pour l'organisation: {org}")
+            cached = response_cache.get(metrics_cache_key(org, token, days))
+            billing_data, usage_data, notice = fetch_org_metrics(
+                token, org, days, include_metrics=cached is None, include_billing=include_billing
             )
-        else:
-            usage_data = metrics_response.json()
-            notice = None
-
-        daily_metrics, global_metrics, language_stats = process_daily_metrics(usage_data)
+            if cached:
+                processed = cached['processed']
+            else:
+                processed, cube = analyze_daily_metrics(usage_data)
+                if notice is None:
+                    cache_org_metrics(org, token, processed, days, cube)
         
-        response_data = {
-            'billing': billing_data,
-            'usage': {
-                'users': daily_metrics,
-                'global_metrics': global_metrics,
-                'language_stats': language_stats
-            }
-        }
+        response_data = {'granularity': granularity}
+        if include_billing:
+            response_data['billing'] = select_fields('billing', billing_data, fields.get('billing'))
+        if usage_sections:
+            response_data['usage'] = usage_response(processed, usage_sections, fields)
+        if group_by is not None:
+            response_data['breakdown'] = breakdown_response(
+                cube if cube is not None else get_metrics_cube(org, token, days), group_by
+            )
         if notice:
             response_data['notice'] = notice
         logger.info("Réponse préparée avec succès")
         return jsonify(response_data)
         
-    except requests.exceptions.RequestException as e:
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    except (requests.exceptions.RequestException, httpx.RequestError) as e:
+        logger.error(f"Erreur de requête: {str(e)}")
+        return jsonify({'error': f'Erreur de requête: {str(e)}'}), 500
+    except Exception as e:
+        logger.error(f"Erreur interne: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify({'error': f'Erreur interne: {str(e)}'}), 500
+
+def parse_org_list(args):
+    """Liste ordonnée et dédoublonnée des organisations (`org` répété et/ou `orgs=a,b`)."""
+    orgs = list(args.getlist('org'))
+    for value in args.getlist('orgs'):
+        orgs.extend(part.strip() for part in value.split(','))
+    return list(dict.fromkeys(o for o in orgs if o))
+
+def get_multi_org_metrics(token, orgs, days=90, group_by=None, sections=METRICS_SECTIONS, fields=None):
+    """
+    Fan-out multi-organisations : chaque organisation est récupérée en parallèle
+    puis traitée par process_daily_metrics ; la réponse contient le détail par
+    organisation et les agrégats fusionnés côté serveur (ainsi que la
+    ventilation des cubes fusionnés si `group_by` est demandé). Les tuples
+    traités restent complets (ils sont fusionnés et mis en cache) ; seules les
+    `sections` et `fields` demandés sont sérialisés, et la facturation n'est
+    demandée que si elle est dans `sections`.
+    """
+    logger.info(f"Récupération des métriques pour {len(orgs)} organisations")
+    fields = fields or {}
+    include_billing = 'billing' in sections
+    include_usage = bool(sections & set(DASHBOARD_SECTIONS))
+    cached = {org: response_cache.get(metrics_cache_key(org, token, days)) for org in orgs}
+    cached = {org: entry for org, entry in cached.items() if entry}
+    results = fetch_orgs_metrics(token, orgs, days, cached_orgs=set(cached), include_billing=include_billing)
+
+    organizations = {}
+    processed = []
+    # Cubes calculés pendant cette requête ; ceux des organisations en cache sont relus
+    cubes = {}
+    for org, result in zip(orgs, results):
+        if isinstance(result, RateLimitExceeded):
+            organizations[org] = {'error': str(result), 'retry_after': result.retry_after}
+            continue
+        if isinstance(result, Exception):
+            logger.error(f"Échec de récupération pour {org}: {str(result)}")
+            organizations[org] = {'error': str(result)}
+            continue
+        billing_data, usage_data, notice = result
+        if org in cached:
+            daily_metrics, global_metrics, language_stats = cached[org]['processed']
+        else:
+            (daily_metrics, global_metrics, language_stats), cube = analyze_daily_metrics(usage_data)
+            if notice is None:
+                cache_org_metrics(org, token, (daily_metrics, global_metrics, language_stats), days, cube)
+            cubes[org] = cube
+        processed.append((daily_metrics, global_metrics, language_stats))
+        organizations[org] = {}
+        if include_usage:
+            organizations[org]['usage'] = usage_response(processed[-1], sections, fields)
+        if include_billing:
+            organizations[org]['billing'] = select_fields('billing', billing_data, fields.get('billing'))
+        if notice:
+            organizations[org]['notice'] = notice
+
+    response_data = {'organizations': organizations}
+    if include_usage:
+        response_data['usage'] = usage_response(merge_processed_metrics(processed), sections, fields)
+    if group_by is not None:
+        merged = MetricsCube.merge(
+            cubes[org] if org in cubes else get_metrics_cube(org, token, days)
+            for org in orgs if 'error' not in organizations[org]
+        )
+        response_data['breakdown'] = breakdown_response(merged, group_by)
+    logger.info("Réponse multi-organisations préparée avec succès")
+    return jsonify(response_data)
+
+TEAM_LEADERBOARD_SORT_KEYS = {
+    'suggestions': lambda entry: entry['global_metrics']['total_suggestions'],
+    'acceptance_rate': lambda entry: entry['global_metrics'].get('average_acceptance_rate', 0),
+    'active_users': lambda entry: entry['global_metrics']['total_users'],
+    'lines_accepted': lambda entry: entry['global_metrics']['total_lines_accepted'],
+}
+
+def fetch_teams_metrics(token, org, days=90):
+    """
+    Liste les équipes de l'organisation puis récupère les métriques de chacune
+    en parallèle (au plus TEAM_FANOUT_CONCURRENCY appels simultanés).
+
+    Returns:
+        Tuple[teams, results] — results aligné sur teams (liste de jours ou exception)
+    """
+    since_iso, until_iso = metrics_window(days)
+    client = get_async_api_client(token, org)
+
+    async def fetch_all():
+        teams = await client.get_all_teams()
+        semaphore = asyncio.Semaphore(TEAM_FANOUT_CONCURRENCY)
+
+        async def fetch_team(team):
+            async with semaphore:
+                return await client.get_team_metrics(team['slug'], since=since_iso, until=until_iso)
+
+        results = await asyncio.gather(*(fetch_team(t) for t in teams), return_exceptions=True)
+        return teams, results
+
+    return run_async(fetch_all())
+
+def build_team_leaderboard(teams, results):
+    """Passe chaque équipe dans process_daily_metrics et construit le classement."""
+    leaderboard = []
+    unavailable = []
+    for team, result in zip(teams, results):
+        if isinstance(result, RateLimitExceeded):
+            raise result
+        if isinstance(result, Exception):
+            # GitHub ne publie pas les métriques des équipes de moins de 5 membres licenciés
+            unavailable.append({'team': team.get('slug'), 'error': str(result)})
+            continue
+        daily_metrics, global_metrics, language_stats = process_daily_metrics(result)
+        leaderboard.append({
+            'team': team.get('slug'),
+            'name': team.get('name'),
+            'global_metrics': global_metrics,
+            'top_languages': list(language_stats)[:3],
+            'days': len(daily_metrics),
+        })
+    return leaderboard, unavailable
+
+@app.route('/api/teams/metrics', methods=['GET'])
+def get_teams_metrics():
+    try:
+        token = token_from_header(request.headers.get('Authorization'))
+        if not token:
+            return jsonify({'error': 'Token manquant'}), 401
+
+        org = request.args.get('org')
+        if not org:
+            return jsonify({'error': 'Organisation manquante'}), 400
+        if not is_valid_github_org(org):
+            return jsonify({'error': 'Organisation invalide'}), 400
+
+        sort = request.args.get('sort', 'suggestions')
+        if sort not in TEAM_LEADERBOARD_SORT_KEYS:
+            return jsonify({'error': f'Tri invalide (valeurs possibles: {", ".join(TEAM_LEADERBOARD_SORT_KEYS)})'}), 400
+        days = request.args.get('days', 90, type=int)
+        if not 1 <= days <= 100:
+            return jsonify({'error': 'Le paramètre days doit être compris entre 1 et 100'}), 400
+
+        cache_key = ('teams', org.lower(), token_fingerprint(token), days)
+        cached = response_cache.get(cache_key)
+        if cached:
+            leaderboard, unavailable = cached
+        else:
+            logger.info(f"Récupération des métriques par équipe pour l'organisation: {org}")
+            teams, results = fetch_teams_metrics(token, org, days)
+            leaderboard, unavailable = build_team_leaderboard(teams, results)
+            response_cache.set(cache_key, (leaderboard, unavailable), ttl=TEAM_METRICS_CACHE_TTL)
+
+        ranked = sorted(leaderboard, key=TEAM_LEADERBOARD_SORT_KEYS[sort], reverse=True)
+        ranked = [{'rank': rank, **entry} for rank, entry in enumerate(ranked, start=1)]
+        return jsonify({'organization': org, 'sort': sort, 'teams': ranked, 'unavailable': unavailable})
+
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    except (requests.exceptions.RequestException, httpx.RequestError, httpx.HTTPStatusError) as e:
         logger.error(f"Erreur de requête: {str(e)}")
         return jsonify({'error': f'Erreur de requête: {str(e)}'}), 500
     except Exception as e:
@@ -437,41 +928,36 @@ def get_users():
         if not is_valid_github_org(org):
             return jsonify({'error': 'Invalid organization configured'}), 400
 
-        headers = get_github_headers(token)
+        try:
+            sort, order, limit, cursor, statuses, editors = parse_users_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         logger.info("Fetching Copilot seats data (accurate user info)")
 
-        # Récupérer les sièges (source de vérité pour les utilisateurs)
-        safe_org = quote(org, safe='')
-        seats_url = f'https://api.github.com/orgs/{safe_org}/copilot/billing/seats'
-        seats_response = requests.get(seats_url, headers=headers, timeout=20, allow_redirects=False)
-        logger.info(f"Seats response status: {seats_response.status_code}")
-
-        if seats_response.status_code != 200:
-            logger.error(f"Failed to fetch seats data: {seats_response.status_code} Body={seats_response.text}")
-            return jsonify({'error': 'Failed to fetch seats data'}), seats_response.status_code
-
-        seats_data = seats_response.json()
-        total_seats = seats_data.get('total_seats') or len(seats_data.get('seats', []))
-
-        users = []
-        for seat in seats_data.get('seats', []):
-            assignee = seat.get('assignee') or {}
-            login = assignee.get('login')
-            user = {
-                'login': login,
-                'name': assignee.get('name'),
-                'avatar_url': assignee.get('avatar_url'),
-                'last_activity': seat.get('last_activity_at'),
-                'last_editor': seat.get('last_activity_editor'),
-                'created_at': seat.get('created_at'),
-                'is_active': seat.get('last_activity_at') is not None
-            }
-            users.append(user)
-
-        logger.info(f"Sending response with {len(users)} users (from seats)")
-        return jsonify({'total_seats': total_seats, 'users': users})
-
+        # Sièges (source de vérité pour les utilisateurs), indexés une fois
+        try:
+            index = get_user_index(org, token)
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"Failed to fetch seats data: {e.response.status_code} Body={e.response.text}")
+            return jsonify({'error': 'Failed to fetch seats data'}), e.response.status_code
+
+        try:
+            page = index.page(sort, order, limit, cursor, statuses, editors)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        logger.info(f"Sending {len(page['users'])}/{page['total']} users (sort={sort}, from seats)")
+        return jsonify({
+            'total_seats': index.total_seats,
+            'active_users': index.active_users,
+            'total': page['total'],
+            'users': page['users'],
+            'next_cursor': page['next_cursor'],
+        })
+
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         logger.error(f"Error in get_users: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
@@ -488,45 +974,29 @@ def export_pdf():
     if not is_valid_github_org(org):
         return jsonify({"error": "Invalid organization configured"}), 400
 
-    headers = get_github_headers(token)
-
     try:
-        # Récupérer les données depuis la nouvelle API (même logique que les autres routes)
-        from datetime import datetime, timedelta
-        now_utc = datetime.utcnow()
-        until_iso = now_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
-        since_iso = (now_utc - timedelta(days=90)).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-        safe_org = quote(org, safe='')
-        metrics_url = f'https://api.github.com/orgs/{safe_org}/copilot/metrics'
-        metrics_response = requests.get(
-            metrics_url,
-            headers=headers,
-            params={'since': since_iso, 'until': until_iso, 'per_page': 100},
-            timeout=20,
-            allow_redirects=False
-        )
-
-        if metrics_response.status_code != 200:
+        # Utilisateurs réels : sièges joints à leur activité par login
+        try:
+            users, user_metrics = load_org_users(token, org)
+        except requests.exceptions.HTTPError:
             return jsonify({"error": "Impossible de récupérer les données Copilot"}), 500
 
-        usage_data = metrics_response.json()
-        daily_metrics, global_metrics, language_stats = process_daily_metrics(usage_data)
-        users, user_metrics = process_users_from_metrics(daily_metrics, language_stats)
-
         # Créer le PDF avec les nouvelles données
         filename = f"copilot_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         doc = SimpleDocTemplate(filename, pagesize=letter)
         elements = []
 
         # Convert data to table format
-        data = [['User', 'Suggestions Accepted', 'Suggestions Rejected', 'Acceptance Rate']]
+        data = [['User', 'Last Activity', 'Status', 'Suggestions Accepted', 'Suggestions Rejected',
+                 'Acceptance Rate']]
         for user in users:
             data.append([
-                user['login'],
-                user.get('accepted_suggestions', 0),
-                user.get('rejected_suggestions', 0),
-                f"{user.get('acceptance_rate', 0):.1f}%"
+                user.login,
+                (user.last_activity or '-')[:10],
+                user.activity_status,
+                user.accepted_suggestions,
+                user.rejected_suggestions,
+                f"{user.acceptance_rate:.1f}%"
             ])
 
         table = Table(data)
@@ -549,6 +1019,8 @@ def export_pdf():
 
         return send_file(filename, as_attachment=True)
 
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         logger.error(f"Erreur lors de la génération du fichier Excel: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -564,44 +1036,29 @@ def export_excel():
     if not is_valid_github_org(org):
         return jsonify({"error": "Invalid organization configured"}), 400
 
-    headers = get_github_headers(token)
-
     try:
-        # Récupérer les données depuis la nouvelle API (même logique que les autres routes)
-        from datetime import datetime, timedelta
-        now_utc = datetime.utcnow()
-        until_iso = now_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
-        since_iso = (now_utc - timedelta(days=90)).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-        safe_org = quote(org, safe='')
-        metrics_url = f'https://api.github.com/orgs/{safe_org}/copilot/metrics'
-        metrics_response = requests.get(
-            metrics_url,
-            headers=headers,
-            params={'since': since_iso, 'until': until_iso, 'per_page': 100},
-            timeout=20,
-            allow_redirects=False
-        )
-
-        if metrics_response.status_code != 200:
+        # Utilisateurs réels : sièges joints à leur activité par login
+        try:
+            users, user_metrics = load_org_users(token, org)
+        except requests.exceptions.HTTPError:
             return jsonify({"error": "Impossible de récupérer les données Copilot"}), 500
 
-        usage_data = metrics_response.json()
-        daily_metrics, global_metrics, language_stats = process_daily_metrics(usage_data)
-        users, user_metrics = process_users_from_metrics(daily_metrics, language_stats)
-
         # Créer le DataFrame avec les nouvelles données
         users_data = []
         for user in users:
             users_data.append({
-                'User': user['login'],
-                'Name': user.get('name', user['login']),
-                'Suggestions Accepted': user.get('accepted_suggestions', 0),
-                'Suggestions Rejected': user.get('rejected_suggestions', 0),
-                'Acceptance Rate (%)': user.get('acceptance_rate', 0),
-                'Languages Used': ', '.join(user.get('languages_used', [])),
-                'Active Days': user.get('active_days_count', 0),
-                'Is Active': 'Yes' if user.get('is_active', False) else 'No'
+                'User': user.login,
+                'Name': user.name or user.login,
+                'Last Activity': user.last_activity,
+                'Last Editor': user.last_activity_editor,
+                'Days Since Last Activity': user.days_since_last_activity,
+                'Activity Status': user.activity_status,
+                'Suggestions Accepted': user.accepted_suggestions,
+                'Suggestions Rejected': user.rejected_suggestions,
+                'Acceptance Rate (%)': user.acceptance_rate,
+                'Languages Used': ', '.join(user.languages),
+                'Active Days': user.active_days,
+                'Is Active': 'Yes' if user.is_active else 'No'
             })
 
         df = pd.DataFrame(users_data)
@@ -612,6 +1069,8 @@ def export_excel():
 
         return send_file(filename, as_attachment=True)
 
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         logger.error(f"Erreur lors de la génération du fichier Excel: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -620,6 +1079,15 @@ def export_excel():
 def health_check():
     return jsonify({'status': 'healthy'}), 200
 
+sync_worker = None
+if SYNC_ENABLED and SYNC_IN_PROCESS and GITHUB_TOKEN:
+    sync_worker = SyncWorker(
+        GITHUB_TOKEN, configured_orgs(), metrics_store,
+        interval=SYNC_INTERVAL, days=DEFAULT_SYNC_DAYS, processor=process_daily_metrics,
+        rollup_windows=SYNC_ROLLUP_WINDOWS
+    )
+    sync_worker.start()
+
 if __name__ == '__main__':
     # Never enable debug by default in production. Control via env var.
     debug_mode = os.environ.get('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
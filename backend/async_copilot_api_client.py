@@ -0,0 +1,304 @@
+"""
+Client API GitHub Copilot asynchrone - Appels parallèles via asyncio/httpx
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from copilot_api_client import (
+    GITHUB_API_BASE, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, DEFAULT_PAGE_WORKERS,
+    DEFAULT_INTERACTIVE_MAX_WAIT, DEFAULT_BACKGROUND_MAX_WAIT, PRIORITY_INTERACTIVE,
+    GitHubCopilotAPIClient, RateLimitExceeded, RateLimitScheduler, ValidatorCache,
+    _rate_limit_scheduler, _validator_cache, response_size, token_fingerprint
+)
+
+logger = logging.getLogger(__name__)
+
+# Threads du pool dédié de la boucle de fond (appels bloquants : synchronisations,
+# attentes du scheduler de rate limit), partagé par toutes les requêtes du processus
+DEFAULT_EXECUTOR_THREADS = 64
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_executor_threads = DEFAULT_EXECUTOR_THREADS
+# Clients httpx partagés, rattachés à la boucle de fond (accédés uniquement depuis celle-ci)
+_async_clients: Dict[int, httpx.AsyncClient] = {}
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Boucle asyncio dédiée, démarrée à la demande dans un thread daemon.
+
+    Son exécuteur par défaut (asyncio.to_thread) est un pool de
+    `_executor_threads` threads qui lui est propre, et non le pool implicite
+    d'asyncio (min(32, CPU + 4) threads), trop petit pour les threads
+    gunicorn qui la partagent.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                ThreadPoolExecutor(max_workers=_executor_threads, thread_name_prefix='github-async-io')
+            )
+            threading.Thread(target=loop.run_forever, name='github-async-loop', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def configure_background_loop(executor_threads: int = DEFAULT_EXECUTOR_THREADS) -> None:
+    """Taille du pool de threads de la boucle de fond (à appeler avant son démarrage)"""
+    global _executor_threads
+    with _loop_lock:
+        _executor_threads = executor_threads
+        if _loop is not None and not _loop.is_closed():
+            logger.warning("Background loop already running: executor size applies to the next loop")
+
+
+def run_async(coro, timeout: Optional[float] = None):
+    """
+    Exécute une coroutine depuis du code synchrone (routes Flask).
+
+    Toutes les coroutines partagent la même boucle de fond, ce qui permet de
+    conserver le pool de connexions keep-alive d'un appel à l'autre.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result(timeout)
+
+
+def get_shared_async_client(pool_size: int = DEFAULT_POOL_SIZE,
+                            timeout: int = DEFAULT_TIMEOUT) -> httpx.AsyncClient:
+    """Retourne le client httpx partagé (à appeler depuis la boucle de fond)"""
+    client = _async_clients.get(pool_size)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=False,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        _async_clients[pool_size] = client
+        logger.info(f"Created shared async GitHub client (pool_size={pool_size})")
+    return client
+
+
+class AsyncSingleFlight:
+    """
+    Pendant asynchrone de SingleFlight : les coroutines qui demandent une clé
+    déjà en vol attendent la tâche du premier appelant et en partagent le
+    résultat. L'annulation d'un appelant n'annule pas la tâche partagée.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.shared += 1
+        else:
+            task = self._tasks[key] = loop.create_task(fn())
+            task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def __len__(self):
+        return len(self._tasks)
+
+
+# Tâches en vol de la boucle de fond (partagées par tous les clients asynchrones)
+_async_single_flight = AsyncSingleFlight()
+
+
+class AsyncGitHubCopilotAPIClient:
+    """Client asynchrone pour les APIs GitHub Copilot (pendant de GitHubCopilotAPIClient)"""
+
+    def __init__(self, token: str, org: str, http_client: Optional[httpx.AsyncClient] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, timeout: int = DEFAULT_TIMEOUT,
+                 page_workers: int = DEFAULT_PAGE_WORKERS,
+                 validator_cache: Optional[ValidatorCache] = None,
+                 scheduler: Optional[RateLimitScheduler] = None,
+                 priority: int = PRIORITY_INTERACTIVE, max_wait: Optional[float] = None,
+                 single_flight: Optional[AsyncSingleFlight] = None):
+        self.token = token
+        self.org = org
+        self.base_url = GITHUB_API_BASE
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.page_workers = max(1, min(page_workers, pool_size))
+        self._http_client = http_client
+        self.validator_cache = validator_cache if validator_cache is not None else _validator_cache
+        self.single_flight = single_flight if single_flight is not None else _async_single_flight
+        self.scheduler = scheduler or _rate_limit_scheduler
+        self.priority = priority
+        if max_wait is None:
+            max_wait = (DEFAULT_INTERACTIVE_MAX_WAIT if priority == PRIORITY_INTERACTIVE
+                        else DEFAULT_BACKGROUND_MAX_WAIT)
+        self.max_wait = max_wait
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        }
+        self._org_url = f"{self.base_url}/orgs/{quote(org, safe='')}"
+        self._token_fp = token_fingerprint(token)
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = get_shared_async_client(self.pool_size, self.timeout)
+        return self._http_client
+
+    async def _get(self, url: str, params: Optional[Dict] = None,
+                   headers: Optional[Dict] = None) -> httpx.Response:
+        """GET asynchrone passant par le scheduler de rate limit"""
+        for attempt in range(self.scheduler.max_attempts):
+            # acquire() peut bloquer : il s'exécute hors de la boucle, sauf si le budget permet de partir tout de suite
+            if not self.scheduler.try_acquire(self.token, self.priority):
+                await asyncio.to_thread(self.scheduler.acquire, self.token, self.priority, self.max_wait)
+            response = await self.http_client.get(url, headers=headers or self.headers, params=params)
+            self.scheduler.update(self.token, response.headers)
+            if not self.scheduler.is_rate_limited(response):
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+            delay = self.scheduler.backoff(self.token, response, attempt)
+        raise RateLimitExceeded(
+            f"GitHub rate limit still exceeded after {self.scheduler.max_attempts} attempts",
+            delay
+        )
+
+    async def _get_json(self, url: str, params: Optional[Dict] = None) -> Tuple[object, Dict]:
+        """
+        GET conditionnel asynchrone (partage le cache ETag du client synchrone) ;
+        les appels identiques simultanés partagent une seule requête.
+        """
+        key = ValidatorCache.make_key(self.org, url, params)
+        flight_key = (self._token_fp, self.priority) + key
+        return await self.single_flight.do(flight_key, lambda: self._fetch_json(url, params, key))
+
+    async def _fetch_json(self, url: str, params: Optional[Dict], key: Tuple) -> Tuple[object, Dict]:
+        cached = self.validator_cache.get(key)
+        headers = {**self.headers, "If-None-Match": cached.etag} if cached else None
+
+        response = await self._get(url, params=params, headers=headers)
+        if response.status_code == 304:
+            if cached:
+                logger.debug(f"Not modified (304), serving cached body for {url}")
+                return cached.body, cached.links
+            # 304 sans corps connu (entrée évincée entre-temps) : une seule relance, inconditionnelle
+            response = await self._get(url, params=params, headers=self.headers)
+
+        body = response.json()
+        links = response.links
+        etag = response.headers.get('ETag')
+        if etag:
+            self.validator_cache.set(key, etag, body, links, response_size(response, body))
+        return body, links
+
+    async def _get_all_pages(self, url: str, params: Dict, items_key: Optional[str] = None,
+                             total_key: Optional[str] = None) -> List[Dict]:
+        """Récupère toutes les pages d'un endpoint, les suivantes en parallèle (bornées)"""
+        body, links = await self._get_json(url, params={**params, "page": 1})
+        items = list(GitHubCopilotAPIClient._page_items(body, items_key))
+
+        last_page = GitHubCopilotAPIClient._last_page(links, body, params["per_page"], total_key)
+        if last_page <= 1:
+            return items
+
+        semaphore = asyncio.Semaphore(self.page_workers)
+
+        async def fetch(page: int) -> List[Dict]:
+            async with semaphore:
+                page_body, _ = await self._get_json(url, params={**params, "page": page})
+                return GitHubCopilotAPIClient._page_items(page_body, items_key)
+
+        for page_items in await asyncio.gather(*(fetch(p) for p in range(2, last_page + 1))):
+            items.extend(page_items)
+        return items
+
+    async def get_billing_info(self) -> Dict:
+        """Récupère les informations de facturation Copilot"""
+        url = f"{self._org_url}/copilot/billing"
+        logger.info(f"Fetching billing info from: {url}")
+        return (await self._get_json(url))[0]
+
+    async def get_all_seats(self, per_page: int = 100) -> Dict:
+        """Récupère tous les sièges, au format de la réponse billing/seats"""
+        url = f"{self._org_url}/copilot/billing/seats"
+        seats = await self._get_all_pages(url, {"per_page": per_page},
+                                          items_key="seats", total_key="total_seats")
+        return {"total_seats": len(seats), "seats": seats}
+
+    async def get_all_metrics(self, since: Optional[str] = None, until: Optional[str] = None,
+                              per_page: int = 100) -> List[Dict]:
+        """Récupère tous les jours de métriques de la période, triés par date"""
+        url = f"{self._org_url}/copilot/metrics"
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        days = await self._get_all_pages(url, params)
+        days.sort(key=lambda day: day.get('date', ''))
+        return days
+
+    async def get_all_teams(self, per_page: int = 100) -> List[Dict]:
+        """Récupère toutes les équipes de l'organisation"""
+        url = f"{self._org_url}/teams"
+        return await self._get_all_pages(url, {"per_page": per_page})
+
+    async def get_team_metrics(self, team_slug: str, since: Optional[str] = None,
+                               until: Optional[str] = None, per_page: int = 100) -> List[Dict]:
+        """Récupère les métriques Copilot d'une équipe, triées par date"""
+        url = f"{self._org_url}/team/{quote(team_slug, safe='')}/copilot/metrics"
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        days = await self._get_all_pages(url, params)
+        days.sort(key=lambda day: day.get('date', ''))
+        return days
+
+    async def get_metrics_for_period(self, days: int = 30) -> List[Dict]:
+        """Récupère les métriques pour une période donnée"""
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        return await self.get_all_metrics(
+            since=start_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            until=end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
+        )
+
+    async def get_dashboard_data(self, since: Optional[str] = None, until: Optional[str] = None,
+                                 include_billing: bool = True, include_seats: bool = True,
+                                 include_metrics: bool = True) -> Dict:
+        """
+        Lance billing, seats et metrics en parallèle.
+
+        Returns:
+            Dict {'billing', 'seats', 'metrics'} : chaque valeur est le résultat
+            de l'appel ou l'exception levée (None si non demandé), afin que
+            l'appelant applique sa propre stratégie de repli par source.
+        """
+        calls = {}
+        if include_billing:
+            calls['billing'] = self.get_billing_info()
+        if include_seats:
+            calls['seats'] = self.get_all_seats()
+        if include_metrics:
+            calls['metrics'] = self.get_all_metrics(since=since, until=until)
+
+        results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        data = {'billing': None, 'seats': None, 'metrics': None}
+        data.update(zip(calls.keys(), results))
+        return data
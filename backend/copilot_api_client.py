@@ -2,84 +2,701 @@
 Client API GitHub Copilot - Gestion des appels aux nouvelles APIs
 """
 import requests
+import hashlib
 import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlparse, parse_qs
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from response_cache import estimate_size
+
+try:
+    import ijson
+except ImportError:  # parseur incrémental optionnel : repli sur response.json()
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+GITHUB_API_BASE = "https://api.github.com"
+
+# Paramètres par défaut du pool de connexions partagé
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_TIMEOUT = 20
+# Nombre maximal de pages récupérées en parallèle lors de l'auto-pagination
+DEFAULT_PAGE_WORKERS = 4
+
+# Nombre maximal de validateurs ETag conservés par processus, et taille cumulée de leurs corps
+DEFAULT_VALIDATOR_CACHE_SIZE = 1024
+DEFAULT_VALIDATOR_CACHE_BYTES = 32 * 1024 * 1024
+
+# Priorités du scheduler : les requêtes interactives passent avant les tâches de fond
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Paramètres par défaut du scheduler de rate limit
+DEFAULT_BURST = 20
+# Le token bucket ne limite le débit que lorsque le budget restant passe sous cette fraction
+DEFAULT_PACE_BELOW = 0.25
+# Part du budget réservée aux requêtes interactives
+DEFAULT_BACKGROUND_RESERVE = 0.1
+DEFAULT_MAX_ATTEMPTS = 3
+# Nombre maximal de budgets (un par token) suivis par processus
+DEFAULT_MAX_TOKEN_BUDGETS = 1024
+# Attente maximale avant d'abandonner (secondes) selon la priorité
+DEFAULT_INTERACTIVE_MAX_WAIT = 10
+DEFAULT_BACKGROUND_MAX_WAIT = 900
+# Backoff minimal recommandé par GitHub pour un rate limit secondaire sans Retry-After
+SECONDARY_RATE_LIMIT_BACKOFF = 60
+
+_sessions: Dict[Tuple[int, int], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_shared_session(pool_size: int = DEFAULT_POOL_SIZE,
+                       max_retries: int = DEFAULT_MAX_RETRIES) -> requests.Session:
+    """
+    Retourne une session HTTP keep-alive partagée par tous les clients.
+
+    Les en-têtes d'authentification sont passés à chaque requête : une même
+    session peut donc servir plusieurs tokens sans refaire de handshake TLS.
+    """
+    key = (pool_size, max_retries)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False,
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+            logger.info(f"Created shared GitHub session (pool_size={pool_size}, max_retries={max_retries})")
+        return session
+
+
+def token_fingerprint(token: str) -> str:
+    """Empreinte courte d'un token, utilisable comme clé sans conserver le secret"""
+    return hashlib.sha256((token or '').encode('utf-8')).hexdigest()[:16]
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """Le budget GitHub est épuisé et l'attente dépasserait le délai autorisé"""
+
+    def __init__(self, message: str, retry_after: float, response=None):
+        super().__init__(message, response=response)
+        self.retry_after = max(0, int(math.ceil(retry_after)))
+
+
+class _TokenBudget:
+    """État du budget de rate limit d'un token"""
+
+    __slots__ = ('limit', 'remaining', 'reset_at', 'tokens', 'updated_at',
+                 'blocked_until', 'waiting_interactive')
+
+    def __init__(self, burst: int, now: float):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.tokens = float(burst)
+        self.updated_at = now
+        self.blocked_until = 0.0
+        self.waiting_interactive = 0
+
+    def is_idle(self, now: float) -> bool:
+        """Fenêtre et blocage terminés, aucune attente : équivalent à un budget neuf"""
+        return self.reset_at <= now and self.blocked_until <= now and self.waiting_interactive == 0
+
+
+class RateLimitScheduler:
+    """
+    Ordonnanceur des requêtes GitHub tenant compte du rate limit, par token.
+
+    - suit X-RateLimit-Limit / Remaining / Reset renvoyés par GitHub ;
+    - lisse le débit avec un token bucket dès que le budget restant devient
+      faible (le reste du budget est réparti jusqu'au reset) ;
+    - applique Retry-After, ou un backoff exponentiel avec jitter, sur les
+      rate limits secondaires (403/429) ;
+    - fait passer les requêtes de fond derrière les requêtes interactives et
+      leur interdit d'entamer la réserve interactive du budget.
+
+    Les budgets sont gardés en LRU (au plus `max_budgets` tokens) : au-delà,
+    ceux dont la fenêtre est terminée sont oubliés, puis les moins récemment
+    utilisés parmi ceux qu'aucune requête n'attend.
+    """
+
+    def __init__(self, burst: int = DEFAULT_BURST, pace_below: float = DEFAULT_PACE_BELOW,
+                 background_reserve: float = DEFAULT_BACKGROUND_RESERVE,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, clock=time.time,
+                 max_budgets: int = DEFAULT_MAX_TOKEN_BUDGETS):
+        self.burst = burst
+        self.pace_below = pace_below
+        self.background_reserve = background_reserve
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.max_budgets = max_budgets
+        self._budgets: "OrderedDict[str, _TokenBudget]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    def _budget(self, key: str) -> _TokenBudget:
+        """Budget du token (créé au besoin) ; appelé sous self._cond"""
+        budget = self._budgets.get(key)
+        if budget is not None:
+            self._budgets.move_to_end(key)
+            return budget
+        now = self.clock()
+        if len(self._budgets) >= self.max_budgets:
+            self._evict(now)
+        budget = self._budgets[key] = _TokenBudget(self.burst, now)
+        return budget
+
+    def _evict(self, now: float):
+        """Libère de la place : budgets dont la fenêtre est terminée, puis LRU"""
+        for key in [key for key, budget in self._budgets.items() if budget.is_idle(now)]:
+            del self._budgets[key]
+        for key in list(self._budgets):
+            if len(self._budgets) < self.max_budgets:
+                break
+            if self._budgets[key].waiting_interactive == 0:
+                del self._budgets[key]
+
+    def __len__(self):
+        return len(self._budgets)
+
+    def _refill(self, budget: _TokenBudget, now: float):
+        """Recharge le bucket au débit permettant de finir la fenêtre avec le budget restant"""
+        if budget.remaining is None or budget.limit is None:
+            budget.tokens = float(self.burst)
+        elif budget.remaining >= budget.limit * self.pace_below:
+            budget.tokens = float(self.burst)
+        else:
+            rate = budget.remaining / max(budget.reset_at - now, 1.0)
+            budget.tokens = min(float(self.burst), budget.tokens + (now - budget.updated_at) * rate)
+        budget.updated_at = now
+
+    def _delay(self, budget: _TokenBudget, priority: int, now: float) -> float:
+        """Temps d'attente (secondes) avant qu'une requête de cette priorité puisse partir"""
+        self._refill(budget, now)
+        if budget.blocked_until > now:
+            return budget.blocked_until - now
+        if budget.remaining is not None and budget.remaining <= 0:
+            return max(budget.reset_at - now, 1.0)
+        if priority == PRIORITY_BACKGROUND:
+            if budget.waiting_interactive > 0:
+                return 0.1
+            if (budget.remaining is not None and budget.limit
+                    and budget.remaining <= budget.limit * self.background_reserve):
+                return max(budget.reset_at - now, 1.0)
+        if budget.tokens < 1:
+            rate = budget.remaining / max(budget.reset_at - now, 1.0)
+            return (1 - budget.tokens) / rate if rate > 0 else max(budget.reset_at - now, 1.0)
+        return 0.0
+
+    @staticmethod
+    def _consume(budget: _TokenBudget):
+        budget.tokens -= 1
+        if budget.remaining is not None:
+            budget.remaining -= 1
+
+    def try_acquire(self, token: str, priority: int = PRIORITY_INTERACTIVE) -> bool:
+        """
+        Version non bloquante d'acquire : consomme le budget et retourne True
+        si la requête peut partir tout de suite, sinon False sans attendre.
+        """
+        with self._cond:
+            budget = self._budget(token_fingerprint(token))
+            if self._delay(budget, priority, self.clock()) > 0:
+                return False
+            self._consume(budget)
+            return True
+
+    def acquire(self, token: str, priority: int = PRIORITY_INTERACTIVE,
+                max_wait: float = DEFAULT_INTERACTIVE_MAX_WAIT):
+        """Bloque jusqu'à ce que la requête puisse partir, ou lève RateLimitExceeded"""
+        key = token_fingerprint(token)
+        with self._cond:
+            budget = self._budget(key)
+            deadline = self.clock() + max_wait
+            if priority == PRIORITY_INTERACTIVE:
+                budget.waiting_interactive += 1
+            try:
+                while True:
+                    now = self.clock()
+                    delay = self._delay(budget, priority, now)
+                    if delay <= 0:
+                        self._consume(budget)
+                        return
+                    if now + delay > deadline:
+                        raise RateLimitExceeded(
+                            f"GitHub rate limit reached, retry in {int(math.ceil(delay))}s", delay
+                        )
+                    self._cond.wait(timeout=delay)
+            finally:
+                if priority == PRIORITY_INTERACTIVE:
+                    budget.waiting_interactive -= 1
+                    self._cond.notify_all()
+
+    def update(self, token: str, headers) -> None:
+        """Met à jour le budget depuis les en-têtes X-RateLimit-* d'une réponse"""
+        try:
+            remaining = int(headers.get('X-RateLimit-Remaining'))
+            limit = int(headers.get('X-RateLimit-Limit'))
+            reset_at = float(headers.get('X-RateLimit-Reset'))
+        except (TypeError, ValueError):
+            return
+        with self._cond:
+            budget = self._budget(token_fingerprint(token))
+            budget.remaining = remaining
+            budget.limit = limit
+            budget.reset_at = reset_at
+            self._cond.notify_all()
+
+    @staticmethod
+    def is_rate_limited(response: requests.Response) -> bool:
+        """Indique si la réponse signale un rate limit primaire ou secondaire"""
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        headers = response.headers
+        return (headers.get('Retry-After') is not None
+                or headers.get('X-RateLimit-Remaining') == '0'
+                or 'rate limit' in (response.text or '').lower())
+
+    def backoff(self, token: str, response: requests.Response, attempt: int) -> float:
+        """Bloque le token le temps indiqué par GitHub (ou backoff avec jitter) et retourne ce délai"""
+        now = self.clock()
+        headers = response.headers
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None and str(retry_after).isdigit():
+            delay = float(retry_after)
+        elif headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+            delay = max(float(headers['X-RateLimit-Reset']) - now, 1.0)
+        else:
+            delay = SECONDARY_RATE_LIMIT_BACKOFF * (2 ** attempt)
+        delay += random.uniform(0, delay * 0.1)
+        with self._cond:
+            budget = self._budget(token_fingerprint(token))
+            budget.blocked_until = max(budget.blocked_until, now + delay)
+            self._cond.notify_all()
+        logger.warning(f"GitHub rate limit hit ({response.status_code}), backing off {delay:.1f}s")
+        return delay
+
+
+_rate_limit_scheduler = RateLimitScheduler()
+
+
+CachedResponse = namedtuple('CachedResponse', ['etag', 'body', 'links', 'size'])
+
+
+def response_size(response, body) -> int:
+    """Taille du corps d'une réponse (octets reçus, sinon JSON estimé)"""
+    content = getattr(response, 'content', None)
+    return len(content) if isinstance(content, (bytes, bytearray)) else estimate_size(body)
+
+
+class ValidatorCache:
+    """
+    Cache LRU des validateurs ETag, clé (org, endpoint, params).
+
+    Conserve le corps déjà parsé : sur une réponse 304 le client le renvoie
+    tel quel, sans re-téléchargement ni re-parsing. Les corps renvoyés sont
+    partagés entre appelants et doivent être traités en lecture seule. Comme
+    ResponseCache, il est borné en entrées et en octets (taille des corps
+    reçus) : un corps plus grand que `max_bytes` n'est pas conservé.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_VALIDATOR_CACHE_SIZE,
+                 max_bytes: int = DEFAULT_VALIDATOR_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(org: str, endpoint: str, params: Optional[Dict]) -> Tuple:
+        return (org.lower(), endpoint, tuple(sorted((params or {}).items())))
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: Tuple, etag: str, body, links: Dict, size: int = 0):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.size
+            if size > self.max_bytes:
+                return
+            self._entries[key] = CachedResponse(etag, body, links, size)
+            self.current_bytes += size
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_validator_cache = ValidatorCache()
+
+
+class SingleFlight:
+    """
+    Coalescence des requêtes identiques en vol : le premier appelant d'une clé
+    exécute l'appel, ceux qui arrivent pendant ce temps attendent et
+    reçoivent le même résultat (ou la même exception). La clé est libérée dès
+    la fin de l'appel ; les résultats partagés doivent être traités en lecture seule.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
+
+
+_single_flight = SingleFlight()
+
+
 class GitHubCopilotAPIClient:
     """Client pour les APIs GitHub Copilot avec support des nouveaux endpoints"""
-    
-    def __init__(self, token: str, org: str):
+
+    def __init__(self, token: str, org: str, session: Optional[requests.Session] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 timeout: int = DEFAULT_TIMEOUT, page_workers: int = DEFAULT_PAGE_WORKERS,
+                 validator_cache: Optional[ValidatorCache] = None,
+                 scheduler: Optional[RateLimitScheduler] = None,
+                 priority: int = PRIORITY_INTERACTIVE, max_wait: Optional[float] = None,
+                 single_flight: Optional[SingleFlight] = None):
         self.token = token
         self.org = org
-        self.base_url = "https://api.github.com"
+        self.base_url = GITHUB_API_BASE
+        self.timeout = timeout
+        # Les workers de pagination ne doivent pas dépasser la taille du pool HTTP
+        self.page_workers = max(1, min(page_workers, pool_size))
+        self.session = session or get_shared_session(pool_size, max_retries)
+        self.validator_cache = validator_cache if validator_cache is not None else _validator_cache
+        self.single_flight = single_flight if single_flight is not None else _single_flight
+        self.scheduler = scheduler or _rate_limit_scheduler
+        self.priority = priority
+        if max_wait is None:
+            max_wait = (DEFAULT_INTERACTIVE_MAX_WAIT if priority == PRIORITY_INTERACTIVE
+                        else DEFAULT_BACKGROUND_MAX_WAIT)
+        self.max_wait = max_wait
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github+json",
             "X-GitHub-Api-Version": "2022-11-28"
         }
-    
+        self._org_url = f"{self.base_url}/orgs/{quote(org, safe='')}"
+        self._token_fp = token_fingerprint(token)
+
+    def _get(self, url: str, params: Optional[Dict] = None,
+             headers: Optional[Dict] = None, stream: bool = False) -> requests.Response:
+        """
+        Exécute un GET via la session partagée (sans suivre les redirections),
+        en passant par le scheduler de rate limit. Avec stream=True le corps
+        n'est pas lu : l'appelant doit fermer la réponse.
+        """
+        options = {'stream': True} if stream else {}
+        for attempt in range(self.scheduler.max_attempts):
+            self.scheduler.acquire(self.token, self.priority, self.max_wait)
+            response = self.session.get(
+                url,
+                headers=headers or self.headers,
+                params=params,
+                timeout=self.timeout,
+                allow_redirects=False,
+                **options
+            )
+            self.scheduler.update(self.token, response.headers)
+            if not self.scheduler.is_rate_limited(response):
+                if stream and not response.ok:
+                    response.close()
+                response.raise_for_status()
+                return response
+            if stream:
+                response.close()
+            delay = self.scheduler.backoff(self.token, response, attempt)
+        raise RateLimitExceeded(
+            f"GitHub rate limit still exceeded after {self.scheduler.max_attempts} attempts",
+            delay, response=response
+        )
+
+    def _get_json(self, url: str, params: Optional[Dict] = None) -> Tuple[object, Dict]:
+        """
+        GET conditionnel : envoie If-None-Match si un ETag est connu. Les
+        appels identiques simultanés (même token, organisation, endpoint et
+        paramètres) partagent une seule requête et son corps parsé.
+
+        Returns:
+            Tuple[body, links] — sur 304, le corps parsé mis en cache
+        """
+        key = ValidatorCache.make_key(self.org, url, params)
+        # Un résultat n'est partagé qu'entre appelants aux mêmes droits (token) et de même priorité
+        flight_key = (self._token_fp, self.priority) + key
+        return self.single_flight.do(flight_key, lambda: self._fetch_json(url, params, key))
+
+    def _fetch_json(self, url: str, params: Optional[Dict], key: Tuple) -> Tuple[object, Dict]:
+        cached = self.validator_cache.get(key)
+        headers = {**self.headers, "If-None-Match": cached.etag} if cached else None
+
+        response = self._get(url, params=params, headers=headers)
+        if response.status_code == 304:
+            if cached:
+                logger.debug(f"Not modified (304), serving cached body for {url}")
+                return cached.body, cached.links
+            # 304 sans corps connu (entrée évincée entre-temps) : une seule relance, inconditionnelle
+            response = self._get(url, params=params, headers=self.headers)
+
+        body = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            self.validator_cache.set(key, etag, body, response.links, response_size(response, body))
+        return body, response.links
+
+    @staticmethod
+    def _page_items(body, items_key: Optional[str]) -> List[Dict]:
+        """Extrait les éléments d'une page (liste brute ou clé d'enveloppe)"""
+        if items_key is None:
+            return body or []
+        return (body or {}).get(items_key) or []
+
+    @staticmethod
+    def _last_page(links: Dict, body, per_page: int, total_key: Optional[str]) -> int:
+        """Détermine le numéro de la dernière page via le total annoncé ou l'en-tête Link"""
+        if total_key and isinstance(body, dict) and body.get(total_key) is not None:
+            return max(1, math.ceil(int(body[total_key]) / per_page))
+        last = (links or {}).get('last')
+        if last:
+            page = parse_qs(urlparse(last.get('url', '')).query).get('page')
+            if page:
+                return int(page[0])
+        return 1
+
+    def _fetch_page(self, url: str, params: Dict, items_key: Optional[str]) -> List[Dict]:
+        """Récupère une page et retourne ses éléments"""
+        body, _ = self._get_json(url, params=params)
+        return self._page_items(body, items_key)
+
+    def _iter_pages(self, url: str, params: Dict, items_key: Optional[str] = None,
+                    total_key: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Itère sur tous les éléments d'un endpoint paginé.
+
+        La première page fournit le nombre total de pages ; les suivantes sont
+        récupérées en parallèle sur un pool borné et leurs éléments sont produits
+        dans l'ordre d'arrivée.
+        """
+        body, links = self._get_json(url, params={**params, "page": 1})
+        yield from self._page_items(body, items_key)
+
+        last_page = self._last_page(links, body, params["per_page"], total_key)
+        if last_page <= 1:
+            return
+
+        logger.info(f"Fetching {last_page - 1} more pages from {url} ({self.page_workers} workers)")
+        with ThreadPoolExecutor(max_workers=min(self.page_workers, last_page - 1)) as pool:
+            futures = [
+                pool.submit(self._fetch_page, url, {**params, "page": page}, items_key)
+                for page in range(2, last_page + 1)
+            ]
+            try:
+                for future in as_completed(futures):
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def get_organization(self) -> Dict:
+        """Récupère les informations de l'organisation (valide le token)"""
+        return self._get(self._org_url).json()
+
     def get_billing_info(self) -> Dict:
         """Récupère les informations de facturation Copilot"""
-        url = f"{self.base_url}/orgs/{self.org}/copilot/billing"
+        url = f"{self._org_url}/copilot/billing"
         logger.info(f"Fetching billing info from: {url}")
-        
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
-    
+
+        return self._get_json(url)[0]
+
     def get_seats_info(self, page: int = 1, per_page: int = 50) -> Dict:
         """Récupère les informations des sièges Copilot"""
-        url = f"{self.base_url}/orgs/{self.org}/copilot/billing/seats"
+        url = f"{self._org_url}/copilot/billing/seats"
         params = {"page": page, "per_page": per_page}
-        
+
         logger.info(f"Fetching seats info from: {url}")
-        
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        
-        return response.json()
-    
-    def get_metrics(self, since: Optional[str] = None, until: Optional[str] = None, 
+
+        return self._get_json(url, params=params)[0]
+
+    def iter_seats(self, per_page: int = 100) -> Iterator[Dict]:
+        """Itère sur tous les sièges Copilot de l'organisation (toutes pages)"""
+        url = f"{self._org_url}/copilot/billing/seats"
+        return self._iter_pages(url, {"per_page": per_page}, items_key="seats", total_key="total_seats")
+
+    def get_all_seats(self, per_page: int = 100) -> Dict:
+        """Récupère tous les sièges, au format de la réponse billing/seats"""
+        seats = list(self.iter_seats(per_page=per_page))
+        return {"total_seats": len(seats), "seats": seats}
+
+    def get_metrics(self, since: Optional[str] = None, until: Optional[str] = None,
                    page: int = 1, per_page: int = 100) -> List[Dict]:
         """Récupère les métriques Copilot avec le nouveau format"""
-        url = f"{self.base_url}/orgs/{self.org}/copilot/metrics"
-        
+        url = f"{self._org_url}/copilot/metrics"
+
         params = {"page": page, "per_page": per_page}
         if since:
             params["since"] = since
         if until:
             params["until"] = until
-            
+
         logger.info(f"Fetching metrics from: {url} with params: {params}")
-        
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        
-        return response.json()
-    
+
+        return self._get_json(url, params=params)[0]
+
+    def iter_metrics(self, since: Optional[str] = None, until: Optional[str] = None,
+                     per_page: int = 100) -> Iterator[Dict]:
+        """Itère sur tous les jours de métriques de la période (toutes pages)"""
+        url = f"{self._org_url}/copilot/metrics"
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        return self._iter_pages(url, params)
+
+    def get_all_metrics(self, since: Optional[str] = None, until: Optional[str] = None,
+                        per_page: int = 100) -> List[Dict]:
+        """Récupère tous les jours de métriques de la période, triés par date"""
+        days = list(self.iter_metrics(since=since, until=until, per_page=per_page))
+        days.sort(key=lambda day: day.get('date', ''))
+        return days
+
+    @staticmethod
+    def _iter_json_items(response: requests.Response) -> Iterator[Dict]:
+        """
+        Itère sur les éléments d'un tableau JSON au fil de la lecture du corps
+        (ijson) ; sans ijson, le corps est parsé d'un bloc.
+        """
+        if ijson is None:
+            yield from response.json() or []
+            return
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, 'item', use_float=True)
+
+    def stream_metrics(self, since: Optional[str] = None, until: Optional[str] = None,
+                       per_page: int = 100) -> Iterator[Dict]:
+        """
+        Produit les jours de métriques un par un pendant leur réception.
+
+        Les pages sont lues séquentiellement (en-tête Link rel="next") et
+        chaque jour est produit dès qu'il est parsé : la mémoire reste bornée
+        par un jour, quel que soit le nombre de jours demandés. Ce chemin ne
+        passe pas par le cache ETag, qui conserverait les corps complets.
+        """
+        url = f"{self._org_url}/copilot/metrics"
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+
+        while url:
+            response = self._get(url, params=params, stream=True)
+            try:
+                yield from self._iter_json_items(response)
+                url = (response.links.get('next') or {}).get('url')
+            finally:
+                response.close()
+            # L'URL "next" contient déjà les paramètres de la requête
+            params = None
+
+    def iter_teams(self, per_page: int = 100) -> Iterator[Dict]:
+        """Itère sur toutes les équipes de l'organisation"""
+        return self._iter_pages(f"{self._org_url}/teams", {"per_page": per_page})
+
+    def get_team_metrics(self, team_slug: str, since: Optional[str] = None,
+                         until: Optional[str] = None, per_page: int = 100) -> List[Dict]:
+        """Récupère les métriques Copilot d'une équipe, triées par date"""
+        url = f"{self._org_url}/team/{quote(team_slug, safe='')}/copilot/metrics"
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        days = list(self._iter_pages(url, params))
+        days.sort(key=lambda day: day.get('date', ''))
+        return days
+
     def get_metrics_for_period(self, days: int = 30) -> List[Dict]:
         """Récupère les métriques pour une période donnée"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
-        
+
         since = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
         until = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-        
-        return self.get_metrics(since=since, until=until)
-    
+
+        return self.get_all_metrics(since=since, until=until)
+
     def test_connection(self) -> bool:
         """Test la connexion à l'API GitHub"""
         try:
-            url = f"{self.base_url}/orgs/{self.org}"
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            self.get_organization()
             logger.info("GitHub API connection test successful")
             return True
         except Exception as e:
             logger.error(f"GitHub API connection test failed: {str(e)}")
             return False
-
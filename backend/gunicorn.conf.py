@@ -0,0 +1,89 @@
+"""
+Configuration gunicorn du mode production - gunicorn -c gunicorn.conf.py wsgi:app
+
+Les routes passent l'essentiel de leur temps à attendre GitHub : chaque
+worker (processus) sert GUNICORN_THREADS requêtes à la fois (worker gthread),
+et une attente de 20 s ne bloque plus que son propre thread. L'application
+est chargée une fois dans le master (`preload_app`) puis partagée par fork ;
+chaque worker garde son cache de réponses en mémoire, et tous partagent le
+stockage SQLite. Le worker de synchronisation est lancé une seule fois, dans
+un processus dédié, et non dans chaque worker ; le master le relance s'il
+s'arrête.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# L'application ne démarre pas son propre worker de synchronisation (voir when_ready)
+os.environ['SYNC_IN_PROCESS'] = 'false'
+SYNC_ENABLED = os.getenv('SYNC_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Délai avant de relancer le worker de synchronisation, doublé (jusqu'à 5 min) s'il s'arrête aussitôt
+SYNC_RESTART_DELAY = int(os.getenv('SYNC_RESTART_DELAY', 10))
+SYNC_RESTART_MAX_DELAY = 300
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = 'gthread'
+# Peu de processus (meilleur taux de succès du cache de chacun), beaucoup de threads
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+# Au-delà des 20 s d'une attente GitHub, retries et pagination compris
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+accesslog = '-'
+
+_sync_process = None
+_sync_stopping = threading.Event()
+
+
+def _start_sync_worker(server):
+    global _sync_process
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sync_worker.py')
+    _sync_process = subprocess.Popen([sys.executable, script])
+    server.log.info(f"[sync] Worker started in process {_sync_process.pid}")
+
+
+def _supervise_sync_worker(server):
+    """Journalise chaque arrêt du worker de synchronisation et le relance (sinon les données chaudes vieillissent)"""
+    delay = SYNC_RESTART_DELAY
+    while True:
+        started = time.monotonic()
+        code = _sync_process.wait()
+        if _sync_stopping.is_set():
+            return
+        if time.monotonic() - started >= 60:
+            delay = SYNC_RESTART_DELAY
+        server.log.error(f"[sync] Worker exited with code {code}, restarting in {delay}s")
+        if _sync_stopping.wait(delay):
+            return
+        _start_sync_worker(server)
+        # Arrêts répétés aussitôt après le démarrage (configuration, token) : relances espacées
+        delay = min(delay * 2, SYNC_RESTART_MAX_DELAY)
+
+
+def when_ready(server):
+    """Lance le worker de synchronisation (sync_worker.py) à côté des workers HTTP, sous surveillance"""
+    if not SYNC_ENABLED or not os.getenv('GITHUB_TOKEN'):
+        return
+    _start_sync_worker(server)
+    threading.Thread(target=_supervise_sync_worker, args=(server,), name='sync-supervisor', daemon=True).start()
+
+
+def post_fork(server, worker):
+    # La connexion SQLite ouverte au chargement dans le master n'est pas réutilisée après le fork
+    from app import metrics_store
+    metrics_store.reopen()
+
+
+def on_exit(server):
+    _sync_stopping.set()
+    if _sync_process is not None and _sync_process.poll() is None:
+        _sync_process.terminate()
+        _sync_process.wait(graceful_timeout)
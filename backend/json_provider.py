@@ -0,0 +1,105 @@
+"""
+Fournisseurs JSON de l'application Flask - Sérialisation rapide des réponses
+
+OrjsonProvider sérialise les réponses avec orjson (directement en octets,
+sans passer par une chaîne) ; StdlibJSONProvider est le repli sur le module
+json standard lorsque orjson n'est pas installé. Les deux produisent le même
+JSON pour les types du projet : dates et datetimes en ISO 8601, scalaires et
+tableaux NumPy (pipeline colonnaire) en nombres et listes, Decimal en nombre.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy est une dépendance du pipeline colonnaire
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_PROVIDERS = ('orjson', 'stdlib')
+
+
+def _default(obj):
+    """Conversion des types non natifs (commune aux deux fournisseurs)"""
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if np is not None:
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if hasattr(obj, 'to_dict'):
+        # Enregistrements compacts (records), sérialisés nativement par orjson
+        return obj.to_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Fournisseur Flask par défaut, avec les conversions du projet"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Fournisseur orjson. Les clés sont triées comme avec le fournisseur par
+    défaut (`sort_keys`) et la réponse est indentée en mode debug.
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    def _options(self, sort_keys: bool, indent) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, sort_keys=None, indent=None) -> bytes:
+        sort_keys = self.sort_keys if sort_keys is None else sort_keys
+        return orjson.dumps(obj, default=_default, option=self._options(sort_keys, indent))
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Les autres options de json.dumps (separators, ensure_ascii...) n'ont pas d'équivalent
+        return self.dumps_bytes(obj, kwargs.get('sort_keys'), kwargs.get('indent')).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self.dumps_bytes(obj, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def json_provider_class(name: str = 'orjson'):
+    """
+    Classe du fournisseur `name` ('orjson' ou 'stdlib') ; orjson se replie
+    sur la bibliothèque standard s'il n'est pas installé.
+
+    Raises:
+        ValueError: fournisseur inconnu
+    """
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON provider: {name} (expected: {', '.join(JSON_PROVIDERS)})")
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson n'est pas installé : sérialisation JSON standard")
+        return StdlibJSONProvider
+    return OrjsonProvider if name == 'orjson' else StdlibJSONProvider
@@ -0,0 +1,224 @@
+"""
+Pipeline colonnaire des métriques GitHub Copilot - Agrégations vectorisées (pandas/NumPy)
+
+La réponse /copilot/metrics est aplatie en deux tables longues :
+- une ligne par (date, editor, model, language) pour les complétions de code ;
+- une ligne par jour pour les utilisateurs actifs et le chat.
+Totaux quotidiens, totaux par langage, taux d'acceptation et maxima sont
+ensuite calculés par group-by, sans boucle Python sur des dicts. Le résultat
+est identique à celui de metrics_engine.process_dashboard_metrics.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics_cube import MetricsCube
+from records import DailyStats, LanguageStats
+
+logger = logging.getLogger(__name__)
+
+COMPLETION_COLUMNS = ['date', 'editor', 'model', 'language', 'suggestions', 'acceptances',
+                      'lines_suggested', 'lines_accepted', 'engaged_users']
+DAY_COLUMNS = ['date', 'active_users', 'engaged_users', 'chat_turns', 'chat_acceptances']
+CHAT_COLUMNS = ['date', 'editor', 'model', 'chat_turns', 'chat_acceptances']
+_COMPLETION_SUMS = ['suggestions', 'acceptances', 'lines_suggested', 'lines_accepted']
+
+
+def metrics_frames(daily_metrics: Optional[Iterable[Dict]]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Aplatit la réponse /copilot/metrics en tables longues.
+
+    Les compteurs sont accumulés dans un tableau plat converti en une seule
+    fois en int64 ; les dimensions (date, editor, model) sont enregistrées une
+    fois par bloc de langages puis répétées avec np.repeat.
+
+    Returns:
+        Tuple[completions, days, chats] : `completions` a une ligne par
+        (date, editor, model, language), `days` une ligne par jour et `chats`
+        une ligne par (date, editor, model).
+    """
+    counters = []
+    languages = []
+    blocks = []
+    block_sizes = []
+    day_rows = []
+    chat_rows = []
+    for day_data in daily_metrics or []:
+        date = day_data.get('date', day_data.get('day', 'Unknown'))
+        chat_turns = chat_acceptances = 0
+        chat = day_data.get('copilot_ide_chat') or {}
+        for editor in chat.get('editors') or []:
+            editor_name = editor.get('name', 'unknown')
+            for model in editor.get('models') or []:
+                model_turns = int(model.get('total_chats') or 0)
+                model_acceptances = (int(model.get('total_chat_insertion_events') or 0)
+                                     + int(model.get('total_chat_copy_events') or 0))
+                chat_rows.append((date, editor_name, model.get('name', 'unknown'), model_turns, model_acceptances))
+                chat_turns += model_turns
+                chat_acceptances += model_acceptances
+        day_rows.append((date, int(day_data.get('total_active_users') or 0),
+                         int(day_data.get('total_engaged_users') or 0), chat_turns, chat_acceptances))
+
+        completions = day_data.get('copilot_ide_code_completions') or {}
+        for editor in completions.get('editors') or []:
+            editor_name = editor.get('name', 'unknown')
+            for model in editor.get('models') or []:
+                model_languages = model.get('languages') or []
+                if not model_languages:
+                    continue
+                blocks.append((date, editor_name, model.get('name', 'unknown')))
+                block_sizes.append(len(model_languages))
+                for lang in model_languages:
+                    languages.append(lang.get('name', 'unknown'))
+                    counters += (lang.get('total_code_suggestions') or 0,
+                                 lang.get('total_code_acceptances') or 0,
+                                 lang.get('total_code_lines_suggested') or 0,
+                                 lang.get('total_code_lines_accepted') or 0,
+                                 lang.get('total_engaged_users') or 0)
+
+    values = np.array(counters, dtype=np.int64).reshape(-1, 5)
+    repeats = np.array(block_sizes, dtype=np.int64)
+    dimensions = np.array(blocks, dtype=object).reshape(-1, 3)
+    completions = pd.DataFrame({
+        'date': np.repeat(dimensions[:, 0], repeats),
+        'editor': np.repeat(dimensions[:, 1], repeats),
+        'model': np.repeat(dimensions[:, 2], repeats),
+        'language': np.array(languages, dtype=object),
+        **{column: values[:, i] for i, column in enumerate(COMPLETION_COLUMNS[4:])},
+    }, columns=COMPLETION_COLUMNS)
+    days = pd.DataFrame.from_records(day_rows, columns=DAY_COLUMNS)
+    days = days.astype({column: np.int64 for column in DAY_COLUMNS[1:]})
+    chats = pd.DataFrame.from_records(chat_rows, columns=CHAT_COLUMNS)
+    chats = chats.astype({column: np.int64 for column in CHAT_COLUMNS[3:]})
+    return completions, days, chats
+
+
+def _rate(acceptances: pd.Series, suggestions: pd.Series) -> pd.Series:
+    """Taux d'acceptation en pourcentage (NaN sans suggestion)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = acceptances / suggestions * 100
+    return rate.where(suggestions > 0)
+
+
+def _rate_values(rate: pd.Series) -> List:
+    # Sans suggestion le taux vaut l'entier 0, comme dans le moteur par reducers
+    return [0 if value != value else value for value in rate.tolist()]
+
+
+def daily_totals(completions: pd.DataFrame, days: pd.DataFrame) -> pd.DataFrame:
+    """Totaux quotidiens (une ligne par jour, dans l'ordre de la réponse)"""
+    sums = completions.groupby('date', sort=False)[_COMPLETION_SUMS].sum()
+    daily = days.join(sums, on='date')
+    daily[_COMPLETION_SUMS] = daily[_COMPLETION_SUMS].fillna(0).astype(np.int64)
+    daily['rejected'] = (daily['suggestions'] - daily['acceptances']).clip(lower=0)
+    daily['acceptance_rate'] = _rate(daily['acceptances'], daily['suggestions'])
+    return daily
+
+
+def language_totals(completions: pd.DataFrame) -> pd.DataFrame:
+    """Totaux par langage, triés par suggestions décroissantes (utilisateurs : maximum journalier)"""
+    grouped = completions.groupby('language', sort=False)
+    languages = grouped[_COMPLETION_SUMS].sum()
+    languages['active_users'] = grouped['engaged_users'].max()
+    languages['acceptance_rate'] = _rate(languages['acceptances'], languages['suggestions'])
+    return languages.sort_values('suggestions', ascending=False, kind='stable')
+
+
+def global_totals(daily: pd.DataFrame) -> Dict:
+    """Métriques globales du dashboard ; un jour compte comme actif s'il a des suggestions"""
+    active = daily[daily['suggestions'] > 0]
+    metrics = {
+        'total_lines_suggested': int(active['lines_suggested'].sum()),
+        'total_lines_accepted': int(active['lines_accepted'].sum()),
+        'active_days': len(active),
+        'total_suggestions': int(active['suggestions'].sum()),
+        'total_users': int(active['active_users'].max()) if len(active) else 0,
+        'total_chat_turns': int(active['chat_turns'].sum()),
+        'total_chat_acceptances': int(active['chat_acceptances'].sum()),
+    }
+    if metrics['active_days'] > 0:
+        all_suggestions = int(daily['suggestions'].sum())
+        all_acceptances = int(daily['acceptances'].sum())
+        max_active_users = int(daily['active_users'].max())
+        metrics['average_suggestions_per_day'] = round(
+            metrics['total_suggestions'] / metrics['active_days'], 2
+        )
+        metrics['average_acceptance_rate'] = round(
+            (all_acceptances / all_suggestions * 100), 2
+        ) if all_suggestions > 0 else 0
+        if metrics['total_users'] > 0:
+            metrics['average_suggestions_per_user'] = round(
+                metrics['total_suggestions'] / metrics['total_users'], 2
+            )
+        else:
+            metrics['average_suggestions_per_user'] = 0
+        metrics['seats_usage_rate'] = round(
+            (max_active_users / metrics['total_users'] * 100), 2
+        ) if metrics['total_users'] > 0 else 0
+    return metrics
+
+
+def _daily_records(daily: pd.DataFrame) -> List[DailyStats]:
+    """Conversion au format du dashboard (types Python natifs, sérialisables en JSON)"""
+    # Colonnes dans l'ordre des champs de DailyStats
+    columns = {
+        'day': daily['date'],
+        'accepted_suggestions': daily['acceptances'],
+        'rejected_suggestions': daily['rejected'],
+        'total_suggestions': daily['suggestions'],
+        'active_users': daily['active_users'],
+        'lines_suggested': daily['lines_suggested'],
+        'lines_accepted': daily['lines_accepted'],
+        'chat_turns': daily['chat_turns'],
+        'chat_acceptances': daily['chat_acceptances'],
+        'acceptance_rate': daily['acceptance_rate'],
+    }
+    values = [series.tolist() for series in columns.values()]
+    values[-1] = _rate_values(daily['acceptance_rate'])
+    return [DailyStats(*row) for row in zip(*values)]
+
+
+def _language_records(languages: pd.DataFrame) -> Dict[str, LanguageStats]:
+    # Colonnes dans l'ordre des champs de LanguageStats
+    values = ([languages[name].tolist() for name in _COMPLETION_SUMS + ['active_users']]
+              + [_rate_values(languages['acceptance_rate'])])
+    return {lang: LanguageStats(*row) for lang, *row in zip(languages.index.tolist(), *values)}
+
+
+def _cells(frame: pd.DataFrame, dimensions: List[str], sums: List[str], maxima: List[str] = ()) -> Dict:
+    """Cellules {clé de dimensions: [mesures...]} d'un group-by"""
+    if frame.empty:
+        return {}
+    grouped = frame.groupby(dimensions, sort=False)
+    table = grouped[sums].sum()
+    for column in maxima:
+        table[column] = grouped[column].max()
+    return dict(zip(table.index.tolist(), table.to_numpy().tolist()))
+
+
+def cube_from_frames(completions: pd.DataFrame, chats: pd.DataFrame) -> MetricsCube:
+    """Cube date × editor × model × language par group-by sur les tables longues"""
+    return MetricsCube(
+        _cells(completions, COMPLETION_COLUMNS[:4], _COMPLETION_SUMS, ['engaged_users']),
+        _cells(chats, CHAT_COLUMNS[:3], CHAT_COLUMNS[3:]),
+    )
+
+
+def _dashboard_results(completions: pd.DataFrame, days: pd.DataFrame) -> Tuple[List[Dict], Dict, Dict]:
+    daily = daily_totals(completions, days)
+    languages = language_totals(completions)
+    return _daily_records(daily), global_totals(daily), _language_records(languages)
+
+
+def process_dashboard_metrics_columnar(daily_metrics: Optional[Iterable[Dict]]) -> Tuple[List[Dict], Dict, Dict]:
+    """Pendant vectorisé de metrics_engine.process_dashboard_metrics (même format de sortie)"""
+    completions, days, _ = metrics_frames(daily_metrics)
+    return _dashboard_results(completions, days)
+
+
+def process_dashboard_metrics_with_cube_columnar(daily_metrics: Optional[Iterable[Dict]]) -> Tuple[Tuple, MetricsCube]:
+    """Pendant vectorisé de metrics_cube.process_dashboard_metrics_with_cube"""
+    completions, days, chats = metrics_frames(daily_metrics)
+    return _dashboard_results(completions, days), cube_from_frames(completions, chats)
@@ -0,0 +1,170 @@
+"""
+Cube des métriques GitHub Copilot - Ventilation date × editor × model × language
+
+Le cube est construit pendant le même parcours que les résultats du
+dashboard (CubeReducer) puis découpé à la demande (`slice`) selon n'importe
+quel sous-ensemble de dimensions, sans relire le payload.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics_engine import DayView, Reducer, process_dashboard_metrics
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('date', 'editor', 'model', 'language')
+CHAT_DIMENSIONS = ('date', 'editor', 'model')
+# Mesures des cellules de complétion ; engaged_users est agrégé par maximum
+MEASURES = ('suggestions', 'acceptances', 'lines_suggested', 'lines_accepted', 'engaged_users')
+CHAT_MEASURES = ('chat_turns', 'chat_acceptances')
+
+# Taille estimée d'une cellule pour le cache de réponses (clé + compteurs)
+_CELL_SIZE = 160
+
+
+def parse_group_by(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Dimensions d'un paramètre `group_by=editor,language` (ordre conservé).
+
+    Raises:
+        ValueError: dimension inconnue
+    """
+    if value is None:
+        return None
+    dimensions = tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by dimension(s): {', '.join(unknown)} "
+                         f"(expected: {', '.join(DIMENSIONS)})")
+    return dimensions
+
+
+class MetricsCube:
+    """
+    Cellules de complétion (date, editor, model, language) et de chat
+    (date, editor, model). Les valeurs sont partagées et en lecture seule.
+    """
+
+    def __init__(self, cells: Optional[Dict[Tuple, List[int]]] = None,
+                 chat_cells: Optional[Dict[Tuple, List[int]]] = None):
+        self.cells = cells if cells is not None else {}
+        self.chat_cells = chat_cells if chat_cells is not None else {}
+
+    def __len__(self):
+        return len(self.cells) + len(self.chat_cells)
+
+    def estimated_size(self) -> int:
+        return len(self) * _CELL_SIZE
+
+    @classmethod
+    def merge(cls, cubes: Iterable['MetricsCube']) -> 'MetricsCube':
+        """Additionne des cubes d'organisations distinctes (utilisateurs compris)"""
+        cells: Dict[Tuple, List[int]] = {}
+        chat_cells: Dict[Tuple, List[int]] = {}
+        for cube in cubes:
+            for target, source in ((cells, cube.cells), (chat_cells, cube.chat_cells)):
+                for key, values in source.items():
+                    merged = target.get(key)
+                    if merged is None:
+                        target[key] = list(values)
+                    else:
+                        for i, value in enumerate(values):
+                            merged[i] += value
+        return cls(cells, chat_cells)
+
+    def slice(self, group_by: Sequence[str] = ()) -> List[Dict]:
+        """
+        Agrège le cube sur les dimensions `group_by` (aucune : une ligne de total).
+
+        Les compteurs sont additionnés et engaged_users prend le maximum (un
+        même utilisateur peut apparaître dans plusieurs cellules). Le chat n'a
+        pas de dimension langage : ses mesures ne sont incluses que si
+        `language` n'est pas demandé. Les lignes sont triées par date si elle
+        est demandée, sinon par suggestions décroissantes.
+        """
+        group_by = tuple(group_by)
+        positions = [DIMENSIONS.index(d) for d in group_by]
+        groups: Dict[Tuple, List] = {}
+        for key, values in self.cells.items():
+            group_key = tuple(key[p] for p in positions)
+            group = groups.get(group_key)
+            if group is None:
+                groups[group_key] = [values[0], values[1], values[2], values[3], values[4], 0, 0]
+            else:
+                group[0] += values[0]
+                group[1] += values[1]
+                group[2] += values[2]
+                group[3] += values[3]
+                if values[4] > group[4]:
+                    group[4] = values[4]
+
+        with_chat = 'language' not in group_by
+        if with_chat:
+            for key, (chat_turns, chat_acceptances) in self.chat_cells.items():
+                group_key = tuple(key[p] for p in positions)
+                group = groups.get(group_key)
+                if group is None:
+                    group = groups[group_key] = [0, 0, 0, 0, 0, 0, 0]
+                group[5] += chat_turns
+                group[6] += chat_acceptances
+
+        rows = []
+        for group_key, group in groups.items():
+            row = dict(zip(group_by, group_key))
+            row.update(zip(MEASURES, group))
+            if with_chat:
+                row['chat_turns'] = group[5]
+                row['chat_acceptances'] = group[6]
+            row['acceptance_rate'] = (group[1] / group[0] * 100) if group[0] > 0 else 0
+            rows.append(row)
+
+        if 'date' in group_by:
+            rows.sort(key=lambda row: tuple(row[d] for d in group_by))
+        else:
+            rows.sort(key=lambda row: row['suggestions'], reverse=True)
+        return rows
+
+
+class CubeReducer(Reducer):
+    """Construit le cube à partir des lignes déjà aplaties de chaque jour"""
+
+    name = 'cube'
+
+    def __init__(self):
+        self.cells: Dict[Tuple, List[int]] = {}
+        self.chat_cells: Dict[Tuple, List[int]] = {}
+
+    def add(self, day: DayView) -> None:
+        date = day.date
+        cells = self.cells
+        for editor, model, language, suggestions, acceptances, lines_sugg, lines_acc, engaged in day.completion_rows:
+            key = (date, editor, model, language)
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [suggestions, acceptances, lines_sugg, lines_acc, engaged]
+            else:
+                cell[0] += suggestions
+                cell[1] += acceptances
+                cell[2] += lines_sugg
+                cell[3] += lines_acc
+                if engaged > cell[4]:
+                    cell[4] = engaged
+        chat_cells = self.chat_cells
+        for editor, model, chats, insertions, copies in day.chat_rows:
+            key = (date, editor, model)
+            cell = chat_cells.get(key)
+            if cell is None:
+                chat_cells[key] = [chats, insertions + copies]
+            else:
+                cell[0] += chats
+                cell[1] += insertions + copies
+
+    def result(self) -> MetricsCube:
+        return MetricsCube(self.cells, self.chat_cells)
+
+
+def process_dashboard_metrics_with_cube(daily_metrics: Optional[Iterable[Dict]]) -> Tuple[Tuple, MetricsCube]:
+    """Résultats du dashboard et cube, calculés dans le même parcours"""
+    cube = CubeReducer()
+    processed = process_dashboard_metrics(daily_metrics, [cube])
+    return processed, cube.result()
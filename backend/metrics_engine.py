@@ -0,0 +1,423 @@
+"""
+Moteur d'agrégation des métriques GitHub Copilot - Parcours unique et reducers enfichables
+
+Chaque jour de la réponse /copilot/metrics est aplati une seule fois
+(editors -> models -> languages) en un DayView ; chaque reducer consomme ce
+DayView pour produire son résultat (statistiques quotidiennes, métriques
+globales, statistiques par langage...). Ajouter un agrégat revient à ajouter
+un reducer, sans nouveau parcours de l'arbre JSON.
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from records import DailyStats, LanguageStats
+
+logger = logging.getLogger(__name__)
+
+
+def _int(value) -> int:
+    return int(value or 0)
+
+
+class DayView:
+    """Jour aplati : totaux du jour et lignes (editor, model, language)"""
+
+    __slots__ = ('date', 'active_users', 'engaged_users', 'suggestions', 'acceptances',
+                 'lines_suggested', 'lines_accepted', 'chat_turns', 'chat_insertions',
+                 'chat_copies', 'completion_rows', 'chat_rows')
+
+    @property
+    def chat_acceptances(self) -> int:
+        return self.chat_insertions + self.chat_copies
+
+
+def flatten_day(day_data: Dict) -> DayView:
+    """
+    Parcourt une seule fois l'arbre d'un jour.
+
+    completion_rows : (editor, model, language, suggestions, acceptances,
+                       lines_suggested, lines_accepted, engaged_users)
+    chat_rows       : (editor, model, chats, insertion_events, copy_events)
+    """
+    view = DayView()
+    view.date = day_data.get('date', day_data.get('day', 'Unknown'))
+    view.active_users = _int(day_data.get('total_active_users'))
+    view.engaged_users = _int(day_data.get('total_engaged_users'))
+
+    suggestions = acceptances = lines_suggested = lines_accepted = 0
+    completion_rows = []
+    completions = day_data.get('copilot_ide_code_completions') or {}
+    for editor in completions.get('editors') or []:
+        editor_name = editor.get('name', 'unknown')
+        for model in editor.get('models') or []:
+            model_name = model.get('name', 'unknown')
+            for lang in model.get('languages') or []:
+                row = (
+                    editor_name,
+                    model_name,
+                    lang.get('name', 'unknown'),
+                    _int(lang.get('total_code_suggestions')),
+                    _int(lang.get('total_code_acceptances')),
+                    _int(lang.get('total_code_lines_suggested')),
+                    _int(lang.get('total_code_lines_accepted')),
+                    _int(lang.get('total_engaged_users')),
+                )
+                suggestions += row[3]
+                acceptances += row[4]
+                lines_suggested += row[5]
+                lines_accepted += row[6]
+                completion_rows.append(row)
+
+    chat_turns = chat_insertions = chat_copies = 0
+    chat_rows = []
+    chat = day_data.get('copilot_ide_chat') or {}
+    for editor in chat.get('editors') or []:
+        editor_name = editor.get('name', 'unknown')
+        for model in editor.get('models') or []:
+            row = (
+                editor_name,
+                model.get('name', 'unknown'),
+                _int(model.get('total_chats')),
+                _int(model.get('total_chat_insertion_events')),
+                _int(model.get('total_chat_copy_events')),
+            )
+            chat_turns += row[2]
+            chat_insertions += row[3]
+            chat_copies += row[4]
+            chat_rows.append(row)
+
+    view.suggestions = suggestions
+    view.acceptances = acceptances
+    view.lines_suggested = lines_suggested
+    view.lines_accepted = lines_accepted
+    view.chat_turns = chat_turns
+    view.chat_insertions = chat_insertions
+    view.chat_copies = chat_copies
+    view.completion_rows = completion_rows
+    view.chat_rows = chat_rows
+    return view
+
+
+class Reducer(ABC):
+    """Agrégat alimenté jour par jour ; `name` sert de clé dans le résultat du moteur"""
+
+    name = 'reducer'
+
+    @abstractmethod
+    def add(self, day: DayView) -> None:
+        """Intègre un jour aplati"""
+
+    @abstractmethod
+    def result(self):
+        """Résultat de l'agrégat après le dernier jour"""
+
+
+def aggregate(daily_metrics: Optional[Iterable[Dict]], reducers: Sequence[Reducer]) -> Dict:
+    """Aplatit chaque jour une fois et le passe à tous les reducers"""
+    for day_data in daily_metrics or []:
+        day = flatten_day(day_data)
+        for reducer in reducers:
+            reducer.add(day)
+    return {reducer.name: reducer.result() for reducer in reducers}
+
+
+# --- Format du dashboard (app.process_daily_metrics) ---------------------------
+
+def dashboard_day_stats(day: DayView) -> DailyStats:
+    """Statistiques d'un jour au format du dashboard"""
+    return DailyStats(
+        day=day.date,
+        accepted_suggestions=day.acceptances,
+        rejected_suggestions=max(day.suggestions - day.acceptances, 0),
+        total_suggestions=day.suggestions,
+        active_users=day.active_users,
+        lines_suggested=day.lines_suggested,
+        lines_accepted=day.lines_accepted,
+        chat_turns=day.chat_turns,
+        chat_acceptances=day.chat_acceptances,
+        acceptance_rate=(day.acceptances / day.suggestions * 100) if day.suggestions > 0 else 0,
+    )
+
+
+class DailyStatsReducer(Reducer):
+    """Statistiques quotidiennes au format du dashboard"""
+
+    name = 'daily'
+
+    def __init__(self):
+        self.days: List = []
+
+    def add(self, day: DayView) -> None:
+        self.days.append(dashboard_day_stats(day))
+
+    def result(self) -> List[DailyStats]:
+        return self.days
+
+
+def dashboard_global_metrics(totals: Dict, all_suggestions: int, all_acceptances: int,
+                             max_active_users: int) -> Dict:
+    """
+    Complète les totaux des jours actifs avec les moyennes du dashboard.
+
+    `all_suggestions`, `all_acceptances` et `max_active_users` portent sur
+    tous les jours de la période, actifs ou non.
+    """
+    metrics = dict(totals)
+    # Calcul des métriques moyennes
+    if metrics['active_days'] > 0:
+        metrics['average_suggestions_per_day'] = round(
+            metrics['total_suggestions'] / metrics['active_days'], 2
+        )
+        metrics['average_acceptance_rate'] = round(
+            (all_acceptances / all_suggestions * 100), 2
+        ) if all_suggestions > 0 else 0
+        if metrics['total_users'] > 0:
+            metrics['average_suggestions_per_user'] = round(
+                metrics['total_suggestions'] / metrics['total_users'], 2
+            )
+        else:
+            metrics['average_suggestions_per_user'] = 0
+        metrics['seats_usage_rate'] = round(
+            (max_active_users / metrics['total_users'] * 100), 2
+        ) if metrics['total_users'] > 0 else 0
+    return metrics
+
+
+class GlobalMetricsReducer(Reducer):
+    """Métriques globales du dashboard ; un jour compte comme actif s'il a des suggestions"""
+
+    name = 'global'
+
+    def __init__(self):
+        self.metrics = {
+            'total_lines_suggested': 0,
+            'total_lines_accepted': 0,
+            'active_days': 0,
+            'total_suggestions': 0,
+            'total_users': 0,
+            'total_chat_turns': 0,
+            'total_chat_acceptances': 0,
+        }
+        self.all_suggestions = 0
+        self.all_acceptances = 0
+        self.max_active_users = 0
+
+    def add_totals(self, suggestions: int, acceptances: int, lines_suggested: int,
+                   lines_accepted: int, active_users: int, chat_turns: int,
+                   chat_acceptances: int) -> None:
+        """Ajoute les totaux d'un jour (DayView ou statistique quotidienne déjà traitée)"""
+        metrics = self.metrics
+        self.all_suggestions += suggestions
+        self.all_acceptances += acceptances
+        self.max_active_users = max(self.max_active_users, active_users)
+        if suggestions > 0:
+            metrics['active_days'] += 1
+            metrics['total_suggestions'] += suggestions
+            metrics['total_lines_suggested'] += lines_suggested
+            metrics['total_lines_accepted'] += lines_accepted
+            metrics['total_users'] = max(metrics['total_users'], active_users)
+            metrics['total_chat_turns'] += chat_turns
+            metrics['total_chat_acceptances'] += chat_acceptances
+
+    def add(self, day: DayView) -> None:
+        self.add_totals(day.suggestions, day.acceptances, day.lines_suggested, day.lines_accepted,
+                        day.active_users, day.chat_turns, day.chat_acceptances)
+
+    def result(self) -> Dict:
+        return dashboard_global_metrics(self.metrics, self.all_suggestions, self.all_acceptances,
+                                        self.max_active_users)
+
+
+def finalize_language_stats(language_stats: Dict, rounded: bool = False,
+                            rate_only_if_suggestions: bool = False) -> Dict:
+    """Ajoute les taux d'acceptation par langage et trie par nombre de suggestions"""
+    for stats in language_stats.values():
+        if stats['suggestions'] > 0:
+            rate = stats['acceptances'] / stats['suggestions'] * 100
+            stats['acceptance_rate'] = round(rate, 2) if rounded else rate
+        elif not rate_only_if_suggestions:
+            stats['acceptance_rate'] = 0
+    return dict(sorted(language_stats.items(), key=lambda x: x[1]['suggestions'], reverse=True))
+
+
+class LanguageStatsReducer(Reducer):
+    """Statistiques par langage sur la période (utilisateurs : maximum journalier)"""
+
+    name = 'languages'
+    users_key = 'active_users'
+
+    def __init__(self):
+        self.stats: Dict = {}
+
+    def _new_stats(self) -> LanguageStats:
+        return LanguageStats()
+
+    def add(self, day: DayView) -> None:
+        users_key = self.users_key
+        for _, _, lang_name, suggestions, acceptances, lines_sugg, lines_acc, engaged in day.completion_rows:
+            stats = self.stats.get(lang_name)
+            if stats is None:
+                stats = self.stats[lang_name] = self._new_stats()
+            stats['suggestions'] += suggestions
+            stats['acceptances'] += acceptances
+            stats['lines_suggested'] += lines_sugg
+            stats['lines_accepted'] += lines_acc
+            if engaged > stats[users_key]:
+                stats[users_key] = engaged
+
+    def result(self) -> Dict[str, LanguageStats]:
+        return finalize_language_stats(self.stats)
+
+
+def summarize_daily_stats(processed_data: Iterable[Dict]) -> Dict:
+    """Calcule les métriques globales du dashboard à partir de statistiques quotidiennes traitées"""
+    reducer = GlobalMetricsReducer()
+    for day in processed_data:
+        reducer.add_totals(day['total_suggestions'], day['accepted_suggestions'],
+                           day['lines_suggested'], day['lines_accepted'], day['active_users'],
+                           day['chat_turns'], day['chat_acceptances'])
+    return reducer.result()
+
+
+def dashboard_reducers() -> List[Reducer]:
+    """Reducers produisant (daily_metrics, global_metrics, language_stats) du dashboard"""
+    return [DailyStatsReducer(), GlobalMetricsReducer(), LanguageStatsReducer()]
+
+
+def process_dashboard_metrics(daily_metrics: Optional[Iterable[Dict]],
+                              extra_reducers: Sequence[Reducer] = ()) -> Tuple[List[Dict], Dict, Dict]:
+    """
+    Agrège la réponse /copilot/metrics au format du dashboard en un seul parcours.
+    Les `extra_reducers` éventuels sont alimentés pendant ce même parcours.
+    """
+    results = aggregate(daily_metrics, dashboard_reducers() + list(extra_reducers))
+    return results['daily'], results['global'], results['languages']
+
+
+# Section de la réponse /api/metrics -> reducer qui la produit
+DASHBOARD_SECTIONS = {
+    'users': DailyStatsReducer,
+    'global_metrics': GlobalMetricsReducer,
+    'language_stats': LanguageStatsReducer,
+}
+
+
+def process_dashboard_sections(daily_metrics: Optional[Iterable[Dict]],
+                               sections: Iterable[str]) -> Tuple[Optional[List], Optional[Dict], Optional[Dict]]:
+    """
+    Comme process_dashboard_metrics, en n'alimentant que les reducers des
+    `sections` demandées : les éléments du tuple non demandés valent None.
+    """
+    sections = set(sections)
+    results = aggregate(daily_metrics, [reducer() for section, reducer in DASHBOARD_SECTIONS.items()
+                                        if section in sections])
+    return results.get('daily'), results.get('global'), results.get('languages')
+
+
+# --- Format détaillé (metrics_processor.CopilotMetricsProcessor) ---------------
+
+def detailed_day_stats(day: DayView) -> Dict:
+    """Statistiques d'un jour au format détaillé"""
+    return {
+        'day': day.date,
+        'total_active_users': day.active_users,
+        'total_engaged_users': day.engaged_users,
+        'total_suggestions': day.suggestions,
+        'total_acceptances': day.acceptances,
+        'lines_suggested': day.lines_suggested,
+        'lines_accepted': day.lines_accepted,
+        'chat_turns': day.chat_turns,
+        'chat_insertions': day.chat_insertions,
+        'chat_copies': day.chat_copies,
+        'acceptance_rate': round(day.acceptances / day.suggestions * 100, 2) if day.suggestions > 0 else 0,
+        'rejected_suggestions': day.suggestions - day.acceptances,
+    }
+
+
+class DetailedDailyStatsReducer(DailyStatsReducer):
+    """Statistiques quotidiennes au format détaillé"""
+
+    def add(self, day: DayView) -> None:
+        self.days.append(detailed_day_stats(day))
+
+
+class DetailedGlobalMetricsReducer(Reducer):
+    """Métriques globales détaillées ; un jour compte comme actif s'il a des utilisateurs actifs"""
+
+    name = 'global'
+
+    def __init__(self):
+        self.metrics = {
+            'total_active_users': 0,
+            'total_engaged_users': 0,
+            'active_days': 0,
+            'total_suggestions': 0,
+            'total_acceptances': 0,
+            'total_lines_suggested': 0,
+            'total_lines_accepted': 0,
+            'total_chat_turns': 0,
+            'total_chat_insertions': 0,
+            'total_chat_copies': 0
+        }
+        self.max_active_users = 0
+
+    def add(self, day: DayView) -> None:
+        metrics = self.metrics
+        self.max_active_users = max(self.max_active_users, day.active_users)
+        if day.active_users > 0:
+            metrics['active_days'] += 1
+            metrics['total_active_users'] = max(metrics['total_active_users'], day.active_users)
+            metrics['total_engaged_users'] = max(metrics['total_engaged_users'], day.engaged_users)
+            metrics['total_suggestions'] += day.suggestions
+            metrics['total_acceptances'] += day.acceptances
+            metrics['total_lines_suggested'] += day.lines_suggested
+            metrics['total_lines_accepted'] += day.lines_accepted
+            metrics['total_chat_turns'] += day.chat_turns
+            metrics['total_chat_insertions'] += day.chat_insertions
+            metrics['total_chat_copies'] += day.chat_copies
+
+    def result(self) -> Dict:
+        metrics = dict(self.metrics)
+        if metrics['active_days'] > 0:
+            metrics['average_suggestions_per_day'] = round(
+                metrics['total_suggestions'] / metrics['active_days'], 2
+            )
+            if metrics['total_suggestions'] > 0:
+                metrics['average_acceptance_rate'] = round(
+                    (metrics['total_acceptances'] / metrics['total_suggestions']) * 100, 2
+                )
+            if metrics['total_engaged_users'] > 0:
+                metrics['average_suggestions_per_user'] = round(
+                    metrics['total_suggestions'] / metrics['total_engaged_users'], 2
+                )
+            # Calcul du taux d'utilisation des sièges
+            if metrics['total_active_users'] > 0:
+                metrics['seats_usage_rate'] = round(
+                    (self.max_active_users / metrics['total_active_users']) * 100, 2
+                )
+        return metrics
+
+
+class DetailedLanguageStatsReducer(LanguageStatsReducer):
+    """Statistiques par langage au format détaillé (engaged_users, taux arrondi)"""
+
+    users_key = 'engaged_users'
+
+    def _new_stats(self) -> Dict:
+        return {
+            'suggestions': 0,
+            'acceptances': 0,
+            'lines_suggested': 0,
+            'lines_accepted': 0,
+            self.users_key: 0,
+            'acceptance_rate': 0,
+        }
+
+    def result(self) -> Dict[str, Dict]:
+        return finalize_language_stats(self.stats, rounded=True, rate_only_if_suggestions=True)
+
+
+def detailed_reducers() -> List[Reducer]:
+    """Reducers produisant (daily_stats, global_metrics, language_stats) au format détaillé"""
+    return [DetailedDailyStatsReducer(), DetailedGlobalMetricsReducer(), DetailedLanguageStatsReducer()]
@@ -0,0 +1,152 @@
+"""
+Agrégats hebdomadaires et mensuels des métriques GitHub Copilot
+
+Chaque période (semaine ISO ou mois civil) est résumée une fois, lors de
+l'écriture de ses jours dans metrics_store, en un document compact : totaux,
+totaux des jours actifs, maxima et statistiques par langage. Les résultats du
+dashboard d'une longue période se calculent ensuite à partir de ces quelques
+résumés au lieu des documents quotidiens.
+"""
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from metrics_engine import dashboard_global_metrics, finalize_language_stats, flatten_day
+from records import LanguageStats, PeriodStats
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ('week', 'month')
+GRANULARITY_DAYS = {'day': 1, 'week': 7, 'month': 30}
+DEFAULT_MAX_POINTS = 120
+
+_LANGUAGE_SUMS = ('suggestions', 'acceptances', 'lines_suggested', 'lines_accepted')
+
+
+def period_of(day: str, granularity: str) -> Tuple[str, str, str]:
+    """
+    Période contenant le jour 'YYYY-MM-DD'.
+
+    Returns:
+        Tuple[période ('2024-W05' ou '2024-01'), premier jour, dernier jour]
+    """
+    current = date.fromisoformat(day[:10])
+    if granularity == 'week':
+        year, week, weekday = current.isocalendar()
+        start = current - timedelta(days=weekday - 1)
+        return f"{year}-W{week:02d}", start.isoformat(), (start + timedelta(days=6)).isoformat()
+    if granularity == 'month':
+        start = current.replace(day=1)
+        following = (start + timedelta(days=32)).replace(day=1)
+        return f"{current.year}-{current.month:02d}", start.isoformat(), (following - timedelta(days=1)).isoformat()
+    raise ValueError(f"Unknown rollup granularity: {granularity}")
+
+
+def choose_granularity(days: int, max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """Granularité la plus fine dont la série tient en `max_points` points"""
+    for granularity in ('day',) + ROLLUP_GRANULARITIES:
+        if days / GRANULARITY_DAYS[granularity] <= max_points:
+            return granularity
+    return ROLLUP_GRANULARITIES[-1]
+
+
+def summarize_period(period: str, start: str, end: str, daily_metrics: Iterable[Dict]) -> Dict:
+    """
+    Résumé d'une période. Les totaux `active_*` ne portent que sur les jours
+    avec suggestions, comme les métriques globales du dashboard.
+    """
+    summary = {
+        'period': period, 'start': start, 'end': end,
+        'days': 0, 'active_days': 0,
+        'suggestions': 0, 'acceptances': 0, 'lines_suggested': 0, 'lines_accepted': 0,
+        'chat_turns': 0, 'chat_acceptances': 0, 'max_active_users': 0,
+        'active_lines_suggested': 0, 'active_lines_accepted': 0,
+        'active_chat_turns': 0, 'active_chat_acceptances': 0, 'active_max_users': 0,
+        'languages': {},
+    }
+    languages = summary['languages']
+    for day_data in daily_metrics:
+        view = flatten_day(day_data)
+        summary['days'] += 1
+        summary['suggestions'] += view.suggestions
+        summary['acceptances'] += view.acceptances
+        summary['lines_suggested'] += view.lines_suggested
+        summary['lines_accepted'] += view.lines_accepted
+        summary['chat_turns'] += view.chat_turns
+        summary['chat_acceptances'] += view.chat_acceptances
+        summary['max_active_users'] = max(summary['max_active_users'], view.active_users)
+        if view.suggestions > 0:
+            summary['active_days'] += 1
+            summary['active_lines_suggested'] += view.lines_suggested
+            summary['active_lines_accepted'] += view.lines_accepted
+            summary['active_chat_turns'] += view.chat_turns
+            summary['active_chat_acceptances'] += view.chat_acceptances
+            summary['active_max_users'] = max(summary['active_max_users'], view.active_users)
+        for _, _, lang_name, suggestions, acceptances, lines_sugg, lines_acc, engaged in view.completion_rows:
+            stats = languages.get(lang_name)
+            if stats is None:
+                stats = languages[lang_name] = dict.fromkeys(_LANGUAGE_SUMS + ('active_users',), 0)
+            stats['suggestions'] += suggestions
+            stats['acceptances'] += acceptances
+            stats['lines_suggested'] += lines_sugg
+            stats['lines_accepted'] += lines_acc
+            stats['active_users'] = max(stats['active_users'], engaged)
+    return summary
+
+
+def rollups_to_dashboard(summaries: List[Dict]) -> Tuple[List[PeriodStats], Dict, Dict]:
+    """
+    Résultats du dashboard (series, global_metrics, language_stats) à partir
+    de résumés de périodes. Chaque point de la série reprend les clés des
+    statistiques quotidiennes ('day' = premier jour de la période) ; les
+    métriques globales sont identiques à celles calculées jour par jour.
+    """
+    series = []
+    totals = {
+        'total_lines_suggested': 0,
+        'total_lines_accepted': 0,
+        'active_days': 0,
+        'total_suggestions': 0,
+        'total_users': 0,
+        'total_chat_turns': 0,
+        'total_chat_acceptances': 0,
+    }
+    all_acceptances = 0
+    max_active_users = 0
+    language_stats: Dict[str, LanguageStats] = {}
+    for summary in summaries:
+        suggestions, acceptances = summary['suggestions'], summary['acceptances']
+        series.append(PeriodStats(
+            day=summary['start'],
+            period=summary['period'],
+            accepted_suggestions=acceptances,
+            rejected_suggestions=max(suggestions - acceptances, 0),
+            total_suggestions=suggestions,
+            active_users=summary['max_active_users'],
+            lines_suggested=summary['lines_suggested'],
+            lines_accepted=summary['lines_accepted'],
+            chat_turns=summary['chat_turns'],
+            chat_acceptances=summary['chat_acceptances'],
+            acceptance_rate=(acceptances / suggestions * 100) if suggestions > 0 else 0,
+        ))
+        totals['active_days'] += summary['active_days']
+        totals['total_suggestions'] += suggestions
+        totals['total_lines_suggested'] += summary['active_lines_suggested']
+        totals['total_lines_accepted'] += summary['active_lines_accepted']
+        totals['total_chat_turns'] += summary['active_chat_turns']
+        totals['total_chat_acceptances'] += summary['active_chat_acceptances']
+        totals['total_users'] = max(totals['total_users'], summary['active_max_users'])
+        all_acceptances += acceptances
+        max_active_users = max(max_active_users, summary['max_active_users'])
+
+        for lang_name, stats in summary['languages'].items():
+            merged = language_stats.get(lang_name)
+            if merged is None:
+                merged = language_stats[lang_name] = LanguageStats()
+            for field in _LANGUAGE_SUMS:
+                merged[field] += stats[field]
+            merged['active_users'] = max(merged['active_users'], stats['active_users'])
+
+    global_metrics = dashboard_global_metrics(totals, totals['total_suggestions'], all_acceptances,
+                                              max_active_users)
+    return series, global_metrics, finalize_language_stats(language_stats)
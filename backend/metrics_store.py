@@ -0,0 +1,334 @@
+"""
+Stockage local des métriques GitHub Copilot - Historique quotidien par organisation
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics_rollups import ROLLUP_GRANULARITIES, period_of, summarize_period
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = 'copilot_metrics.db'
+# Nombre de jours écrits ou décodés par lot
+DEFAULT_BATCH_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics_days (
+    org TEXT NOT NULL,
+    day TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (org, day)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    org TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    token_fp TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (org, kind)
+);
+CREATE TABLE IF NOT EXISTS metrics_rollups (
+    org TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    period TEXT NOT NULL,
+    start_day TEXT NOT NULL,
+    end_day TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (org, granularity, period)
+);
+CREATE TABLE IF NOT EXISTS metrics_coverage (
+    org TEXT NOT NULL PRIMARY KEY,
+    first_day TEXT NOT NULL,
+    last_day TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics_access (
+    org TEXT NOT NULL,
+    token_fp TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (org, token_fp)
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_rollups_start ON metrics_rollups (org, granularity, start_day);
+"""
+
+
+class MetricsStore:
+    """
+    Stockage SQLite des jours bruts renvoyés par /copilot/metrics.
+
+    Une ligne par (organisation, jour) : seuls les jours postérieurs au dernier
+    jour stocké sont redemandés à GitHub, et l'historique est conservé au-delà
+    de la fenêtre de rétention de l'API. La plage de jours déjà synchronisée
+    sans trou (metrics_coverage) indique si une fenêtre plus longue doit
+    d'abord être récupérée en entier. Les résumés hebdomadaires et mensuels
+    (metrics_rollups) des périodes touchées sont recalculés à chaque écriture.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        # Une seule connexion partagée, sérialisée par un verrou (compatible ':memory:')
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+            needs_backfill = (
+                self._conn.execute('SELECT 1 FROM metrics_days LIMIT 1').fetchone() is not None
+                and self._conn.execute('SELECT 1 FROM metrics_rollups LIMIT 1').fetchone() is None
+            )
+        if needs_backfill:
+            # Base créée avant l'ajout des résumés : ils sont calculés une fois
+            for org in self.orgs():
+                self.rebuild_rollups(org)
+
+    def reopen(self) -> None:
+        """
+        Ouvre une nouvelle connexion, par exemple dans un worker gunicorn juste
+        après le fork : une connexion SQLite ne doit pas être partagée entre
+        processus. Sans effet sur une base ':memory:', propre au processus.
+        """
+        if self.path == ':memory:':
+            return
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+
+    @staticmethod
+    def _org_key(org: str) -> str:
+        return org.lower()
+
+    def upsert_days(self, org: str, days: Iterable[Dict]) -> int:
+        """
+        Insère ou remplace les jours fournis ; retourne le nombre de lignes écrites.
+        `days` peut être un flux (stream_metrics) : il est écrit par lots de
+        DEFAULT_BATCH_SIZE jours sans être matérialisé.
+        """
+        fetched_at = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        org_key = self._org_key(org)
+        written = 0
+        batch = []
+        for day in days:
+            if day.get('date'):
+                batch.append((org_key, day['date'], json.dumps(day, separators=(',', ':')), fetched_at))
+            if len(batch) >= DEFAULT_BATCH_SIZE:
+                written += self._write_days(org_key, batch)
+                batch = []
+        if batch:
+            written += self._write_days(org_key, batch)
+        if written:
+            logger.debug(f"Stored {written} metrics days for {org}")
+        return written
+
+    def _write_days(self, org_key: str, rows: List[tuple]) -> int:
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO metrics_days (org, day, payload, fetched_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._update_rollups(org_key, {day for _, day, _, _ in rows})
+            self._conn.commit()
+        return len(rows)
+
+    def get_days(self, org: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Retourne les jours stockés (bornes 'YYYY-MM-DD' incluses), triés par date"""
+        return list(self.iter_days(org, since, until))
+
+    def iter_days(self, org: str, since: Optional[str] = None, until: Optional[str] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        Itère sur les jours stockés, triés par date, en les lisant par lots :
+        un seul lot de documents est décodé à la fois et le verrou n'est tenu
+        que le temps de lire ce lot.
+        """
+        org_key = self._org_key(org)
+        until_clause = ' AND day <= ?' if until else ''
+        bound, operator = (since[:10], '>=') if since else ('', '>')
+        while True:
+            # Pagination par clé : le lot suivant repart après le dernier jour lu
+            params = [org_key, bound] + ([until[:10]] if until else []) + [batch_size]
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT day, payload FROM metrics_days WHERE org = ? AND day {operator} ?'
+                    f'{until_clause} ORDER BY day LIMIT ?',
+                    params
+                ).fetchall()
+            for _, payload in rows:
+                yield json.loads(payload)
+            if len(rows) < batch_size:
+                return
+            bound, operator = rows[-1][0], '>'
+
+    def _update_rollups(self, org_key: str, days: Iterable[str]) -> None:
+        """Recalcule les résumés des périodes contenant `days` (appelé sous le verrou)"""
+        periods = {(granularity,) + period_of(day, granularity)
+                   for day in days for granularity in ROLLUP_GRANULARITIES}
+        rows = []
+        for granularity, period, start, end in periods:
+            payloads = self._conn.execute(
+                'SELECT payload FROM metrics_days WHERE org = ? AND day >= ? AND day <= ? ORDER BY day',
+                (org_key, start, end)
+            ).fetchall()
+            summary = summarize_period(period, start, end, (json.loads(payload) for (payload,) in payloads))
+            rows.append((org_key, granularity, period, start, end, json.dumps(summary, separators=(',', ':'))))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO metrics_rollups (org, granularity, period, start_day, end_day, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+
+    def rebuild_rollups(self, org: str) -> None:
+        """Recalcule tous les résumés hebdomadaires et mensuels d'une organisation"""
+        with self._lock:
+            days = [day for (day,) in self._conn.execute(
+                'SELECT day FROM metrics_days WHERE org = ?', (self._org_key(org),)
+            )]
+            self._update_rollups(self._org_key(org), days)
+            self._conn.commit()
+
+    def get_rollups(self, org: str, granularity: str, since: Optional[str] = None,
+                    until: Optional[str] = None) -> List[Dict]:
+        """
+        Résumés des périodes qui recoupent [since, until] (bornes 'YYYY-MM-DD'
+        incluses), triés par date : la période est prise en entier.
+        """
+        query = 'SELECT payload FROM metrics_rollups WHERE org = ? AND granularity = ?'
+        params = [self._org_key(org), granularity]
+        if since:
+            query += ' AND end_day >= ?'
+            params.append(since[:10])
+        if until:
+            query += ' AND start_day <= ?'
+            params.append(until[:10])
+        query += ' ORDER BY start_day'
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def last_date(self, org: str) -> Optional[str]:
+        """Dernier jour stocké pour l'organisation ('YYYY-MM-DD') ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(day) FROM metrics_days WHERE org = ?', (self._org_key(org),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def coverage(self, org: str) -> Optional[Tuple[str, str]]:
+        """Plage (premier jour, dernier jour) synchronisée sans trou, ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT first_day, last_day FROM metrics_coverage WHERE org = ?', (self._org_key(org),)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def mark_synced(self, org: str, since: str, until: Optional[str] = None) -> None:
+        """
+        Enregistre qu'une synchronisation de `since` à `until` (aujourd'hui
+        par défaut) a réussi : la plage couverte est étendue si elle la
+        recoupe, remplacée sinon (un trou ne doit pas passer pour couvert).
+        """
+        first = since[:10]
+        last = (until or datetime.utcnow().strftime('%Y-%m-%d'))[:10]
+        covered = self.coverage(org)
+        if covered and first <= covered[1] and last >= covered[0]:
+            first, last = min(first, covered[0]), max(last, covered[1])
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metrics_coverage (org, first_day, last_day) VALUES (?, ?, ?)',
+                (self._org_key(org), first, last)
+            )
+            self._conn.commit()
+
+    def sync_since(self, org: str, window_since: str) -> str:
+        """
+        Paramètre `since` à demander à GitHub pour compléter le stockage.
+
+        Si la plage synchronisée couvre le début de la fenêtre, seul le
+        dernier jour stocké est redemandé (c'est le seul qui peut encore
+        évoluer) ; sinon, par exemple après une fenêtre plus courte, toute la
+        fenêtre demandée est récupérée.
+        """
+        last = self.last_date(org)
+        covered = self.coverage(org)
+        start = window_since[:10]
+        if last and last >= start and covered and covered[0] <= start <= covered[1]:
+            return f"{last}T00:00:00Z"
+        return window_since
+
+    def put_snapshot(self, org: str, kind: str, token_fp: str, payload) -> None:
+        """Enregistre le dernier état connu d'une ressource (billing, seats...)"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO snapshots (org, kind, token_fp, payload, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self._org_key(org), kind, token_fp, json.dumps(payload, separators=(',', ':')), time.time())
+            )
+            self._conn.commit()
+
+    def get_snapshot(self, org: str, kind: str, token_fp: str, max_age: float) -> Optional[Dict]:
+        """
+        Retourne le snapshot s'il a été produit avec le même token et a moins
+        de `max_age` secondes, sinon None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT token_fp, payload, fetched_at FROM snapshots WHERE org = ? AND kind = ?',
+                (self._org_key(org), kind)
+            ).fetchone()
+        if not row or row[0] != token_fp or time.time() - row[2] > max_age:
+            return None
+        return {'payload': json.loads(row[1]), 'fetched_at': row[2]}
+
+    def grant_access(self, org: str, token_fp: str) -> None:
+        """Enregistre que ce token vient de synchroniser les métriques de l'organisation"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metrics_access (org, token_fp, synced_at) VALUES (?, ?, ?)',
+                (self._org_key(org), token_fp, time.time())
+            )
+            self._conn.commit()
+
+    def revoke_access(self, org: str, token_fp: str) -> None:
+        """Oublie l'accès du token (GitHub vient de lui refuser les métriques)"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM metrics_access WHERE org = ? AND token_fp = ?', (self._org_key(org), token_fp)
+            )
+            self._conn.commit()
+
+    def has_access(self, org: str, token_fp: str, max_age: float) -> bool:
+        """
+        Indique si ce token a synchronisé les métriques de l'organisation il y
+        a moins de `max_age` secondes : l'historique stocké est partagé par
+        tous les tokens et ne doit être lu que par ceux que GitHub autorise.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT synced_at FROM metrics_access WHERE org = ? AND token_fp = ?',
+                (self._org_key(org), token_fp)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= max_age
+
+    def snapshot_fetched_at(self, org: str, token_fp: str) -> Optional[float]:
+        """Date du snapshot le plus récent produit avec ce token (sans relire les payloads)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(fetched_at) FROM snapshots WHERE org = ? AND token_fp = ?',
+                (self._org_key(org), token_fp)
+            ).fetchone()
+        return row[0] if row else None
+
+    def orgs(self) -> List[str]:
+        """Organisations présentes dans le stockage"""
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT org FROM metrics_days ORDER BY org').fetchall()
+        return [org for (org,) in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
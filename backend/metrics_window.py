@@ -0,0 +1,286 @@
+"""
+Agrégats glissants des métriques GitHub Copilot - Mise à jour incrémentale par jour
+
+Un SlidingWindowAggregator maintient les résultats du dashboard sur une
+fenêtre de jours : ajouter le jour le plus récent ou retirer le plus ancien
+coûte O(taille de ce jour) ; les sommes sont mises à jour par différence et
+les maxima par des files monotones. Le résultat est identique à
+process_dashboard_metrics appliqué aux jours de la fenêtre.
+"""
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics_engine import DayView, dashboard_day_stats, dashboard_global_metrics, flatten_day
+from records import LanguageStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROLLUP_WINDOWS = (28, 90)
+
+_GLOBAL_TOTALS = ('total_lines_suggested', 'total_lines_accepted', 'active_days', 'total_suggestions',
+                  'total_chat_turns', 'total_chat_acceptances')
+
+
+class MonotonicMax:
+    """Maximum glissant : file de (séquence, valeur) à valeurs strictement décroissantes"""
+
+    __slots__ = ('_items',)
+
+    def __init__(self):
+        self._items = deque()
+
+    def push(self, seq: int, value: int) -> None:
+        items = self._items
+        while items and items[-1][1] <= value:
+            items.pop()
+        items.append((seq, value))
+
+    def retire(self, seq: int) -> None:
+        """Retire la valeur de la séquence `seq` si elle est en tête (la plus ancienne)"""
+        if self._items and self._items[0][0] == seq:
+            self._items.popleft()
+
+    def max(self, default: int = 0) -> int:
+        return self._items[0][1] if self._items else default
+
+
+class _WindowDay:
+    """Jour de la fenêtre : vue aplatie, statistiques du dashboard et contributions par langage"""
+
+    __slots__ = ('seq', 'view', 'stats', 'languages')
+
+    def __init__(self, seq: int, view: DayView):
+        self.seq = seq
+        self.view = view
+        self.stats = dashboard_day_stats(view)
+        # langage -> [suggestions, acceptances, lines_suggested, lines_accepted, max engaged, position]
+        languages: Dict[str, List[int]] = {}
+        for position, row in enumerate(view.completion_rows):
+            contribution = languages.get(row[2])
+            if contribution is None:
+                languages[row[2]] = [row[3], row[4], row[5], row[6], row[7], position]
+            else:
+                contribution[0] += row[3]
+                contribution[1] += row[4]
+                contribution[2] += row[5]
+                contribution[3] += row[6]
+                if row[7] > contribution[4]:
+                    contribution[4] = row[7]
+        self.languages = languages
+
+
+class SlidingWindowAggregator:
+    """
+    Résultats du dashboard maintenus sur une fenêtre glissante de jours.
+
+    Les jours sont ajoutés dans l'ordre chronologique (`push`) ; un jour de même
+    date que le plus récent le remplace (GitHub peut encore compléter le
+    dernier jour). Les jours antérieurs à une date sont retirés par
+    `retire_before`.
+    """
+
+    def __init__(self, days: Optional[int] = None):
+        self.days = days
+        self._window: "deque[_WindowDay]" = deque()
+        self._seq = 0
+        self._totals = dict.fromkeys(_GLOBAL_TOTALS, 0)
+        self._all_suggestions = 0
+        self._all_acceptances = 0
+        self._active_users = MonotonicMax()      # jours actifs (avec suggestions)
+        self._max_active_users = MonotonicMax()  # tous les jours
+        self._language_sums: Dict[str, List[int]] = {}
+        self._language_users: Dict[str, MonotonicMax] = {}
+        # langage -> (séquence, position) de ses apparitions, pour l'ordre d'affichage
+        self._language_seen: Dict[str, deque] = {}
+
+    def __len__(self):
+        return len(self._window)
+
+    @property
+    def newest_date(self) -> Optional[str]:
+        return self._window[-1].view.date if self._window else None
+
+    @property
+    def oldest_date(self) -> Optional[str]:
+        return self._window[0].view.date if self._window else None
+
+    def _apply(self, day: _WindowDay, sign: int) -> None:
+        """Ajoute (sign=1) ou retire (sign=-1) les sommes d'un jour"""
+        view = day.view
+        self._all_suggestions += sign * view.suggestions
+        self._all_acceptances += sign * view.acceptances
+        if view.suggestions > 0:
+            totals = self._totals
+            totals['active_days'] += sign
+            totals['total_suggestions'] += sign * view.suggestions
+            totals['total_lines_suggested'] += sign * view.lines_suggested
+            totals['total_lines_accepted'] += sign * view.lines_accepted
+            totals['total_chat_turns'] += sign * view.chat_turns
+            totals['total_chat_acceptances'] += sign * view.chat_acceptances
+
+        for lang_name, contribution in day.languages.items():
+            sums = self._language_sums.get(lang_name)
+            if sums is None:
+                sums = self._language_sums[lang_name] = [0, 0, 0, 0]
+            for i in range(4):
+                sums[i] += sign * contribution[i]
+
+    def _add(self, day: _WindowDay) -> None:
+        self._window.append(day)
+        self._apply(day, 1)
+        view = day.view
+        self._max_active_users.push(day.seq, view.active_users)
+        if view.suggestions > 0:
+            self._active_users.push(day.seq, view.active_users)
+        for lang_name, contribution in day.languages.items():
+            users = self._language_users.get(lang_name)
+            if users is None:
+                users = self._language_users[lang_name] = MonotonicMax()
+                self._language_seen[lang_name] = deque()
+            users.push(day.seq, contribution[4])
+            self._language_seen[lang_name].append((day.seq, contribution[5]))
+
+    def _retire_oldest(self) -> None:
+        day = self._window.popleft()
+        self._apply(day, -1)
+        self._max_active_users.retire(day.seq)
+        self._active_users.retire(day.seq)
+        for lang_name in day.languages:
+            self._language_users[lang_name].retire(day.seq)
+            seen = self._language_seen[lang_name]
+            seen.popleft()
+            if not seen:
+                del self._language_sums[lang_name]
+                del self._language_users[lang_name]
+                del self._language_seen[lang_name]
+
+    def _replace_newest(self, day: _WindowDay) -> None:
+        """
+        Remplace le jour le plus récent. Les sommes sont corrigées par
+        différence ; les files monotones ont pu perdre des valeurs masquées par
+        l'ancien jour et sont reconstruites (O(taille de la fenêtre)).
+        """
+        old = self._window.pop()
+        self._apply(old, -1)
+        for lang_name in old.languages:
+            seen = self._language_seen[lang_name]
+            seen.pop()
+            if not seen:
+                del self._language_sums[lang_name]
+                del self._language_users[lang_name]
+                del self._language_seen[lang_name]
+        self._window.append(day)
+        self._apply(day, 1)
+        for lang_name, contribution in day.languages.items():
+            if lang_name not in self._language_seen:
+                self._language_seen[lang_name] = deque()
+            self._language_seen[lang_name].append((day.seq, contribution[5]))
+
+        self._active_users = MonotonicMax()
+        self._max_active_users = MonotonicMax()
+        self._language_users = {lang_name: MonotonicMax() for lang_name in self._language_seen}
+        for window_day in self._window:
+            view = window_day.view
+            self._max_active_users.push(window_day.seq, view.active_users)
+            if view.suggestions > 0:
+                self._active_users.push(window_day.seq, view.active_users)
+            for lang_name, contribution in window_day.languages.items():
+                self._language_users[lang_name].push(window_day.seq, contribution[4])
+
+    def push_view(self, view: DayView) -> None:
+        """Ajoute un jour déjà aplati (voir `push`)"""
+        newest = self.newest_date
+        if newest is not None and view.date < newest:
+            raise ValueError(f"Days must be pushed in chronological order ({view.date} < {newest})")
+        self._seq += 1
+        day = _WindowDay(self._seq, view)
+        if view.date == newest:
+            self._replace_newest(day)
+        else:
+            self._add(day)
+
+    def push(self, day_data: Dict) -> None:
+        """Ajoute le jour le plus récent (ou remplace le jour de même date)"""
+        self.push_view(flatten_day(day_data))
+
+    def extend(self, daily_metrics: Iterable[Dict]) -> None:
+        for day_data in daily_metrics:
+            self.push(day_data)
+
+    def retire_before(self, since: str) -> int:
+        """Retire les jours antérieurs à `since` ('YYYY-MM-DD...') ; retourne leur nombre"""
+        since_day = since[:10]
+        retired = 0
+        while self._window and self._window[0].view.date[:10] < since_day:
+            self._retire_oldest()
+            retired += 1
+        return retired
+
+    def global_metrics(self) -> Dict:
+        totals = self._totals
+        metrics = {
+            'total_lines_suggested': totals['total_lines_suggested'],
+            'total_lines_accepted': totals['total_lines_accepted'],
+            'active_days': totals['active_days'],
+            'total_suggestions': totals['total_suggestions'],
+            'total_users': self._active_users.max(),
+            'total_chat_turns': totals['total_chat_turns'],
+            'total_chat_acceptances': totals['total_chat_acceptances'],
+        }
+        return dashboard_global_metrics(metrics, self._all_suggestions, self._all_acceptances,
+                                        self._max_active_users.max())
+
+    def language_stats(self) -> Dict[str, LanguageStats]:
+        sums = self._language_sums
+        order = sorted(sums, key=lambda name: (-sums[name][0], self._language_seen[name][0]))
+        language_stats = {}
+        for lang_name in order:
+            suggestions, acceptances, lines_suggested, lines_accepted = sums[lang_name]
+            language_stats[lang_name] = LanguageStats(
+                suggestions=suggestions,
+                acceptances=acceptances,
+                lines_suggested=lines_suggested,
+                lines_accepted=lines_accepted,
+                active_users=self._language_users[lang_name].max(),
+                acceptance_rate=(acceptances / suggestions * 100) if suggestions > 0 else 0,
+            )
+        return language_stats
+
+    def result(self) -> Tuple[List[Dict], Dict, Dict]:
+        """(daily_metrics, global_metrics, language_stats) au format de process_dashboard_metrics"""
+        return [day.stats for day in self._window], self.global_metrics(), self.language_stats()
+
+
+class RollingWindows:
+    """
+    Plusieurs fenêtres glissantes (28 et 90 jours par défaut) alimentées par
+    le même aplatissement de chaque jour.
+    """
+
+    def __init__(self, windows: Sequence[int] = DEFAULT_ROLLUP_WINDOWS):
+        self.windows = {days: SlidingWindowAggregator(days) for days in sorted(set(windows))}
+
+    @property
+    def newest_date(self) -> Optional[str]:
+        return max((w.newest_date for w in self.windows.values() if w.newest_date), default=None)
+
+    def push(self, day_data: Dict) -> None:
+        view = flatten_day(day_data)
+        for window in self.windows.values():
+            window.push_view(view)
+
+    def extend(self, daily_metrics: Iterable[Dict]) -> None:
+        for day_data in daily_metrics:
+            self.push(day_data)
+
+    def retire_before(self, since_by_window: Dict[int, str]) -> None:
+        """Retire, pour chaque fenêtre, les jours antérieurs à sa date de début"""
+        for days, window in self.windows.items():
+            window.retire_before(since_by_window[days])
+
+    def result(self, days: int) -> Tuple[List[Dict], Dict, Dict]:
+        return self.windows[days].result()
+
+    def results(self) -> Dict[int, Tuple[List[Dict], Dict, Dict]]:
+        return {days: window.result() for days, window in self.windows.items()}
@@ -0,0 +1,139 @@
+"""
+Enregistrements compacts des résultats traités - Statistiques et lignes utilisateurs
+
+Les statistiques quotidiennes, par langage et les lignes utilisateurs sont des
+dataclasses à `__slots__` : pas de dict par instance ni de clés répétées, ce
+qui réduit fortement la mémoire des résultats gardés en cache (un
+enregistrement par jour, par langage et par siège). Ils restent accessibles
+comme des dicts (`record['day']`, `get`, `keys`) et ne sont convertis en JSON
+qu'à la frontière de la réponse (json_provider).
+"""
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+
+class Record:
+    """
+    Accès de type dict aux champs d'une dataclass à slots. Les noms des champs
+    (hérités compris, dans l'ordre) sont ceux de `__match_args__`, généré par
+    @dataclass.
+    """
+
+    __slots__ = ()
+    __match_args__: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str):
+        if key not in self.__match_args__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self.__match_args__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__match_args__
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__match_args__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__match_args__
+
+    def values(self) -> List:
+        return [getattr(self, name) for name in self.__match_args__]
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        return ((name, getattr(self, name)) for name in self.__match_args__)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__match_args__}
+
+
+@dataclass(slots=True, eq=False)
+class DailyStats(Record):
+    """Statistiques d'un jour au format du dashboard"""
+
+    day: str
+    accepted_suggestions: int
+    rejected_suggestions: int
+    total_suggestions: int
+    active_users: int
+    lines_suggested: int
+    lines_accepted: int
+    chat_turns: int
+    chat_acceptances: int
+    acceptance_rate: float
+
+
+@dataclass(slots=True, eq=False)
+class PeriodStats(DailyStats):
+    """Point d'une série hebdomadaire ou mensuelle ('day' = premier jour de la période)"""
+
+    period: str
+
+
+@dataclass(slots=True, eq=False)
+class LanguageStats(Record):
+    """Statistiques d'un langage sur la période (utilisateurs : maximum journalier)"""
+
+    suggestions: int = 0
+    acceptances: int = 0
+    lines_suggested: int = 0
+    lines_accepted: int = 0
+    active_users: int = 0
+    acceptance_rate: float = 0
+
+
+@dataclass(slots=True, eq=False)
+class SeatUser(Record):
+    """Utilisateur de /api/users, tel que décrit par son siège"""
+
+    login: Optional[str]
+    name: Optional[str]
+    avatar_url: Optional[str]
+    last_activity: Optional[str]
+    last_editor: Optional[str]
+    created_at: Optional[str]
+    is_active: bool
+    activity_status: str = 'never_active'
+    days_since_last_activity: Optional[int] = None
+
+
+@dataclass(slots=True, eq=False)
+class UserRow(Record):
+    """Siège et statistiques d'utilisation d'un utilisateur (CopilotUserManager)"""
+
+    login: str
+    name: Optional[str]
+    avatar_url: Optional[str]
+    last_activity: Optional[str]
+    last_activity_editor: Optional[str]
+    last_authenticated_at: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+    pending_cancellation_date: Optional[str]
+    plan_type: str
+    days_since_last_activity: Optional[int]
+    total_suggestions: int = 0
+    accepted_suggestions: int = 0
+    rejected_suggestions: int = 0
+    acceptance_rate: float = 0
+    languages: List[str] = field(default_factory=list)
+    active_days: int = 0
+    lines_suggested: int = 0
+    lines_accepted: int = 0
+    chat_turns: int = 0
+    chat_acceptances: int = 0
+    is_active: bool = False
+    activity_status: str = 'never_active'
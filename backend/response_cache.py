@@ -0,0 +1,113 @@
+"""
+Cache de réponses en mémoire - TTL + éviction LRU bornée en entrées et en octets
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _encode(value):
+    # Enregistrements à slots (records) : mesurés comme le JSON de la réponse
+    return value.to_dict() if hasattr(value, 'to_dict') else str(value)
+
+
+def estimate_size(value) -> int:
+    """Taille approximative d'une valeur, mesurée sur sa sérialisation JSON compacte"""
+    try:
+        return len(json.dumps(value, separators=(',', ':'), default=_encode))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ResponseCache:
+    """
+    Cache clé/valeur thread-safe avec durée de vie et éviction LRU.
+
+    Les entrées expirent après `ttl` secondes ; au-delà de `max_entries`
+    entrées ou de `max_bytes` octets estimés, les moins récemment utilisées
+    sont évincées. Les valeurs sont partagées entre appelants et doivent être
+    traitées en lecture seule.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, sizer: Callable = estimate_size,
+                 clock: Callable = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        self.clock = clock
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # clé -> (expiration, taille, valeur)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key: Hashable):
+        """Retourne la valeur en cache (non expirée) ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= self.clock():
+                self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None, size: Optional[int] = None):
+        """Ajoute ou remplace une valeur ; les valeurs plus grandes que max_bytes ne sont pas gardées"""
+        size = self.sizer(value) if size is None else size
+        if size > self.max_bytes:
+            logger.debug(f"Value too large for response cache ({size} bytes), not cached")
+            return
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (expires_at, size, value)
+            self.current_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self.current_bytes > self.max_bytes):
+                self._evict(next(iter(self._entries)))
+
+    def get_or_set(self, key: Hashable, factory: Callable, ttl: Optional[float] = None):
+        """Retourne la valeur en cache ou la calcule via `factory()` et la mémorise"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Supprime les entrées dont la clé satisfait `predicate` ; retourne leur nombre"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._evict(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,129 @@
+"""
+Encodage des réponses de l'API - ETag fort, requêtes conditionnelles (304) et compression
+
+Chaque réponse JSON réussie d'un GET /api/* reçoit un ETag fort calculé sur
+son corps : les données traitées sont sérialisées avec des clés triées, un
+même résultat donne donc toujours les mêmes octets et le même ETag. Si le
+navigateur renvoie cet ETag dans If-None-Match, la réponse devient un 304
+sans corps. Sinon le corps est compressé en brotli (si le module est
+installé) ou gzip selon Accept-Encoding ; les corps compressés sont gardés
+en cache par ETag, un rafraîchissement renvoyant les mêmes données ne
+recompresse donc rien.
+"""
+import gzip
+import hashlib
+import logging
+from typing import Optional
+
+from flask import Flask, Request, Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    """Encodages proposés, par ordre de préférence"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def body_etag(body: bytes) -> str:
+    """Empreinte du corps (ETag fort, sans guillemets)"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Vrai si If-None-Match contient `etag` ('*' compris). Le suffixe
+    d'encodage ('-br', '-gzip') ajouté à l'ETag des variantes compressées et
+    le préfixe faible 'W/' (ajouté par certains proxys) sont ignorés.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        candidate = candidate.removeprefix('W/').strip('"')
+        for encoding in available_encodings():
+            candidate = candidate.removesuffix(f'-{encoding}')
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseEncoder:
+    """
+    Hook after_request des routes `prefix` : ETag, 304 et compression.
+
+    Seules les réponses 200 à un GET, en JSON et déjà en mémoire sont
+    traitées (les exports de fichiers, envoyés en flux, ne le sont pas). Les
+    corps compressés sont gardés dans `cache` (un ResponseCache) sous la clé
+    (ETag, encodage).
+    """
+
+    def __init__(self, cache=None, min_size: int = DEFAULT_MIN_SIZE, compression: bool = True,
+                 prefix: str = '/api/'):
+        self.cache = cache
+        self.min_size = min_size
+        self.compression = compression
+        self.prefix = prefix
+
+    def init_app(self, app: Flask) -> None:
+        app.after_request(self.process)
+
+    def _eligible(self, request: Request, response: Response) -> bool:
+        return (
+            request.method == 'GET'
+            and request.path.startswith(self.prefix)
+            and response.status_code == 200
+            and response.mimetype == 'application/json'
+            and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+        )
+
+    def _encoded(self, body: bytes, etag: str, encoding: str) -> bytes:
+        key = ('encoded', etag, encoding)
+        encoded = self.cache.get(key) if self.cache is not None else None
+        if encoded is None:
+            encoded = compress(body, encoding)
+            if self.cache is not None:
+                self.cache.set(key, encoded, size=len(encoded))
+        return encoded
+
+    def process(self, response: Response) -> Response:
+        if not self._eligible(request, response):
+            return response
+        body = response.get_data()
+        etag = body_etag(body)
+        encoding = None
+        if self.compression and len(body) >= self.min_size:
+            encoding = request.accept_encodings.best_match(available_encodings())
+        # Variante compressée : ETag distinct (un ETag fort désigne des octets précis)
+        response.headers['ETag'] = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Accept-Encoding')
+
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Type', None)
+            response.headers.pop('Content-Length', None)
+            return response
+        if encoding:
+            response.set_data(self._encoded(body, etag, encoding))
+            response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Worker de synchronisation GitHub Copilot - Pré-chauffe des données en arrière-plan
+
+Peut tourner dans le processus Flask (SYNC_ENABLED=true) ou comme commande
+séparée : `python sync_worker.py [--once] [--org ORG ...] [--interval SECONDES]`.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+import requests
+from dotenv import load_dotenv
+
+from copilot_api_client import GitHubCopilotAPIClient, PRIORITY_BACKGROUND, token_fingerprint
+from metrics_store import MetricsStore, DEFAULT_STORE_PATH
+from metrics_window import RollingWindows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_INTERVAL = 900
+DEFAULT_SYNC_DAYS = 90
+
+BILLING_UNAVAILABLE = {'seat_breakdown': {}, 'warning': 'billing_unavailable'}
+
+# Données chaudes du processus : org -> entrée produite par le dernier cycle
+_warm_data: Dict[str, Dict] = {}
+_warm_data_lock = threading.Lock()
+
+
+def window_since(days: int) -> str:
+    """Début de la fenêtre de synchronisation, aligné sur minuit UTC"""
+    start = (datetime.utcnow() - timedelta(days=days)).date()
+    return start.strftime('%Y-%m-%dT00:00:00Z')
+
+
+def get_warm_data(store: MetricsStore, org: str, token: str, max_age: float,
+                  processor: Optional[Callable] = None, days: int = DEFAULT_SYNC_DAYS,
+                  rollup_windows: Sequence[int] = ()) -> Optional[Dict]:
+    """
+    Retourne les données pré-chauffées d'une organisation, ou None.
+
+    Les données ne sont servies qu'au token qui les a produites (même empreinte)
+    et tant qu'elles ont moins de `max_age` secondes. À défaut d'entrée en
+    mémoire à jour (worker lancé dans un autre processus, qui a pu écrire
+    depuis des snapshots plus récents), les snapshots du stockage sont
+    utilisés et les résultats traités sont recalculés puis mémorisés ;
+    avec `rollup_windows`, les fenêtres glissantes sont recalculées en une
+    seule lecture des jours stockés.
+
+    Returns:
+        Dict {'billing', 'seats', 'processed', 'synced_at', 'snapshot_at'[, 'rollups']} ou None
+    """
+    token_fp = token_fingerprint(token)
+    key = org.lower()
+    with _warm_data_lock:
+        entry = _warm_data.get(key)
+    if entry and entry['token_fp'] == token_fp and time.time() - entry['synced_at'] <= max_age:
+        if (entry['processed'] is not None or processor is None) and (not rollup_windows or 'rollups' in entry):
+            latest = store.snapshot_fetched_at(org, token_fp)
+            if latest is None or latest <= entry['snapshot_at']:
+                return entry
+
+    billing = store.get_snapshot(org, 'billing', token_fp, max_age)
+    seats = store.get_snapshot(org, 'seats', token_fp, max_age)
+    if billing is None or seats is None:
+        return None
+    entry = {
+        'token_fp': token_fp,
+        'billing': billing['payload'],
+        'seats': seats['payload'],
+        'processed': None,
+        'synced_at': min(billing['fetched_at'], seats['fetched_at']),
+        'snapshot_at': max(billing['fetched_at'], seats['fetched_at']),
+    }
+    if rollup_windows:
+        windows = tuple(sorted(set(rollup_windows) | {days}))
+        rollups = RollingWindows(windows)
+        rollups.extend(store.iter_days(org, window_since(max(windows))))
+        rollups.retire_before({window: window_since(window) for window in windows})
+        entry['rollups'] = rollups.results()
+        entry['processed'] = entry['rollups'][days]
+    elif processor:
+        entry['processed'] = processor(store.iter_days(org, window_since(days)))
+    with _warm_data_lock:
+        _warm_data[key] = entry
+    return entry
+
+
+class SyncWorker:
+    """
+    Synchronise périodiquement billing, seats et metrics de chaque organisation
+    configurée via GitHubCopilotAPIClient (priorité de fond), alimente le
+    stockage local et pré-calcule les résultats traités.
+
+    Avec `rollup_windows`, les résultats sont maintenus par des fenêtres
+    glissantes (une par durée, plus celle de `days`) : chaque cycle n'ajoute que
+    les nouveaux jours et retire ceux sortis de la fenêtre, au lieu de
+    retraiter toute la période avec `processor`.
+    """
+
+    def __init__(self, token: str, orgs: List[str], store: MetricsStore,
+                 interval: int = DEFAULT_SYNC_INTERVAL, days: int = DEFAULT_SYNC_DAYS,
+                 processor: Optional[Callable] = None,
+                 client_factory: Callable = GitHubCopilotAPIClient,
+                 rollup_windows: Sequence[int] = ()):
+        self.token = token
+        self.orgs = orgs
+        self.store = store
+        self.interval = interval
+        self.days = days
+        self.processor = processor
+        self.client_factory = client_factory
+        self.rollup_windows = tuple(sorted(set(rollup_windows) | {days})) if rollup_windows else ()
+        self._rollups: Dict[str, RollingWindows] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync_org(self, org: str) -> Dict:
+        """Exécute un cycle de synchronisation pour une organisation"""
+        client = self.client_factory(self.token, org, priority=PRIORITY_BACKGROUND)
+        token_fp = token_fingerprint(self.token)
+        since_iso = window_since(self.days)
+
+        try:
+            billing = client.get_billing_info()
+        except requests.exceptions.HTTPError as e:
+            logger.warning(f"[sync] Billing unavailable for {org} ({e.response.status_code})")
+            billing = BILLING_UNAVAILABLE
+        seats = client.get_all_seats()
+        # Les jours sont écrits au fil du parsing, sans matérialiser la réponse
+        since = self.store.sync_since(org, since_iso)
+        try:
+            fetched = self.store.upsert_days(org, client.stream_metrics(since=since))
+        except requests.exceptions.HTTPError:
+            self.store.revoke_access(org, token_fp)
+            raise
+        self.store.mark_synced(org, since)
+        self.store.grant_access(org, token_fp)
+        self.store.put_snapshot(org, 'billing', token_fp, billing)
+        self.store.put_snapshot(org, 'seats', token_fp, seats)
+
+        synced_at = time.time()
+        entry = {
+            'token_fp': token_fp,
+            'billing': billing,
+            'seats': seats,
+            'synced_at': synced_at,
+            'snapshot_at': synced_at,
+        }
+        if self.rollup_windows:
+            rollups = self.update_rollups(org)
+            entry['rollups'] = rollups.results()
+            entry['processed'] = entry['rollups'][self.days]
+        else:
+            entry['processed'] = self.processor(self.store.iter_days(org, since_iso)) if self.processor else None
+        with _warm_data_lock:
+            _warm_data[org.lower()] = entry
+        logger.info(f"[sync] {org}: {fetched} days fetched, {seats['total_seats']} seats")
+        return entry
+
+    def update_rollups(self, org: str) -> RollingWindows:
+        """
+        Met à jour les fenêtres glissantes de l'organisation depuis le stockage :
+        seuls les jours à partir du plus récent déjà agrégé sont relus.
+        """
+        key = org.lower()
+        rollups = self._rollups.get(key)
+        if rollups is None:
+            rollups = self._rollups[key] = RollingWindows(self.rollup_windows)
+            since = window_since(max(self.rollup_windows))
+        else:
+            since = rollups.newest_date or window_since(max(self.rollup_windows))
+        rollups.extend(self.store.iter_days(org, since))
+        rollups.retire_before({days: window_since(days) for days in self.rollup_windows})
+        return rollups
+
+    def run_once(self) -> Dict[str, bool]:
+        """Synchronise toutes les organisations ; retourne le succès par organisation"""
+        status = {}
+        for org in self.orgs:
+            try:
+                self.sync_org(org)
+                status[org] = True
+            except Exception as e:
+                logger.error(f"[sync] Échec de synchronisation pour {org}: {str(e)}")
+                status[org] = False
+        return status
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            self.run_once()
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def start(self):
+        """Démarre la boucle de synchronisation dans un thread daemon"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='copilot-sync-worker', daemon=True)
+        self._thread.start()
+        logger.info(f"[sync] Worker started for {len(self.orgs)} orgs (interval={self.interval}s)")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def configured_orgs() -> List[str]:
+    """Organisations à synchroniser : SYNC_ORGS (liste séparée par des virgules) ou GITHUB_ORG"""
+    value = os.getenv('SYNC_ORGS') or os.getenv('GITHUB_ORG') or ''
+    return [org.strip() for org in value.split(',') if org.strip()]
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Synchronise les données GitHub Copilot en arrière-plan")
+    parser.add_argument('--org', action='append', help="Organisation à synchroniser (répétable)")
+    parser.add_argument('--interval', type=int,
+                        default=int(os.getenv('SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL)))
+    parser.add_argument('--days', type=int, default=int(os.getenv('SYNC_DAYS', DEFAULT_SYNC_DAYS)))
+    parser.add_argument('--once', action='store_true', help="Un seul cycle puis sortie")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    token = os.getenv('GITHUB_TOKEN')
+    orgs = args.org or configured_orgs()
+    if not token or not orgs:
+        parser.error("GITHUB_TOKEN et au moins une organisation (--org, SYNC_ORGS ou GITHUB_ORG) sont requis")
+
+    store = MetricsStore(os.getenv('METRICS_STORE_PATH', DEFAULT_STORE_PATH))
+    worker = SyncWorker(token, orgs, store, interval=args.interval, days=args.days)
+    if args.once:
+        status = worker.run_once()
+        for org, ok in status.items():
+            print(f"{'✓' if ok else '✗'} {org}")
+        return 0 if all(status.values()) else 1
+
+    worker._run()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
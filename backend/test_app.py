@@ -0,0 +1,586 @@
+"""
+Tests unitaires pour les routes et traitements de l'application Flask
+"""
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, Mock, patch
+
+import requests
+
+os.environ.setdefault('METRICS_STORE_PATH', ':memory:')
+
+import app as app_module
+from app import merge_processed_metrics, process_daily_metrics
+import sync_worker
+import user_index
+from json_provider import OrjsonProvider, StdlibJSONProvider, json_provider_class
+from metrics_store import MetricsStore
+from user_index import SORT_FIELDS, USER_STATUSES, UserIndex
+
+
+def make_day(date, language, suggestions, acceptances, active_users):
+    """Construit un jour au format de l'API Copilot Metrics"""
+    return {
+        "date": date,
+        "total_active_users": active_users,
+        "copilot_ide_code_completions": {
+            "editors": [{
+                "name": "vscode",
+                "models": [{
+                    "name": "default",
+                    "languages": [{
+                        "name": language,
+                        "total_engaged_users": active_users,
+                        "total_code_suggestions": suggestions,
+                        "total_code_acceptances": acceptances,
+                        "total_code_lines_suggested": suggestions * 2,
+                        "total_code_lines_accepted": acceptances * 2
+                    }]
+                }]
+            }]
+        },
+        "copilot_ide_chat": {
+            "editors": [{"name": "vscode", "models": [{"name": "default", "total_chats": 3}]}]
+        }
+    }
+
+
+class TestMultiOrgMetrics(unittest.TestCase):
+    """Tests pour le fan-out multi-organisations"""
+    
+    def setUp(self):
+        app_module.response_cache.clear()
+        self.org_a = [make_day("2024-01-01", "python", 100, 50, 4),
+                      make_day("2024-01-02", "python", 10, 5, 2)]
+        self.org_b = [make_day("2024-01-02", "go", 30, 30, 3)]
+    
+    def test_merge_processed_metrics(self):
+        """Test la fusion des agrégats de plusieurs organisations"""
+        daily, global_metrics, language_stats = merge_processed_metrics([
+            process_daily_metrics(self.org_a), process_daily_metrics(self.org_b)
+        ])
+        
+        self.assertEqual([day['day'] for day in daily], ["2024-01-01", "2024-01-02"])
+        self.assertEqual(daily[1]['total_suggestions'], 40)
+        self.assertEqual(daily[1]['active_users'], 5)
+        self.assertEqual(global_metrics['total_suggestions'], 140)
+        self.assertEqual(global_metrics['total_chat_turns'], 9)
+        self.assertEqual(global_metrics['total_users'], 5)
+        self.assertEqual(list(language_stats), ["python", "go"])
+        self.assertEqual(language_stats['go']['acceptance_rate'], 100)
+    
+    def test_metrics_route_fans_out_over_orgs(self):
+        """Test la route /api/metrics avec plusieurs organisations"""
+        usage = {"org-a": self.org_a, "org-b": self.org_b}
+        
+        async def fake_fetch(token, org, days=90, include_metrics=True, include_billing=True):
+            return {"seat_breakdown": {}}, usage[org] if include_metrics else None, None
+        
+        with patch.object(app_module, 'fetch_org_metrics_async', fake_fetch):
+            response = app_module.app.test_client().get(
+                '/api/metrics?orgs=org-a,org-b', headers={'Authorization': 'Bearer t'}
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(set(data['organizations']), {"org-a", "org-b"})
+        self.assertEqual(data['organizations']['org-b']['usage']['global_metrics']['total_suggestions'], 30)
+        self.assertEqual(data['usage']['global_metrics']['total_suggestions'], 140)
+
+class TestResponseCaching(unittest.TestCase):
+    """Tests pour le cache de réponses partagé entre routes"""
+    
+    def setUp(self):
+        app_module.response_cache.clear()
+    
+    def test_dashboard_refresh_reuses_the_processed_tuple(self):
+        """Test qu'un rafraîchissement du dashboard ne redemande pas les métriques"""
+        usage = [make_day("2024-01-01", "python", 10, 5, 2)]
+        calls = []
+        
+        async def fake_fetch(token, org, days=90, include_metrics=True, include_billing=True):
+            calls.append(include_metrics)
+            return {"seat_breakdown": {}}, usage if include_metrics else None, None
+        
+        with patch.object(app_module, 'fetch_org_metrics_async', fake_fetch), \
+                patch.object(app_module, 'get_org_warm_data', return_value=None):
+            client = app_module.app.test_client()
+            first = client.get('/api/metrics?org=acme', headers={'Authorization': 'Bearer t'})
+            second = client.get('/api/metrics?org=acme', headers={'Authorization': 'Bearer t'})
+        
+        self.assertEqual(calls, [True, False])
+        self.assertEqual(first.get_json()['usage'], second.get_json()['usage'])
+        self.assertEqual(first.get_json()['usage']['global_metrics']['total_suggestions'], 10)
+
+    def test_days_window_served_from_warm_rollups(self):
+        """Test que ?days= est servi par les fenêtres glissantes pré-chauffées"""
+        rollup = process_daily_metrics([make_day("2024-01-01", "go", 4, 1, 1)])
+        warm = {'billing': {"seat_breakdown": {}}, 'processed': None, 'rollups': {28: rollup}}
+        
+        with patch.object(app_module, 'get_org_warm_data', return_value=warm), \
+                patch.object(app_module, 'fetch_org_metrics_async') as fetch:
+            client = app_module.app.test_client()
+            response = client.get('/api/metrics?org=acme&days=28', headers={'Authorization': 'Bearer t'})
+            invalid = client.get('/api/metrics?org=acme&days=5000', headers={'Authorization': 'Bearer t'})
+        
+        fetch.assert_not_called()
+        self.assertEqual(response.get_json()['usage']['global_metrics']['total_suggestions'], 4)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_days_window_served_from_store_snapshots(self):
+        """Test que ?days=28 est servi depuis les snapshots d'un worker lancé dans un autre processus"""
+        recent = (datetime.utcnow() - timedelta(days=10)).strftime('%Y-%m-%d')
+        older = (datetime.utcnow() - timedelta(days=40)).strftime('%Y-%m-%d')
+        client = Mock()
+        client.get_billing_info.return_value = {"seat_breakdown": {}}
+        client.get_all_seats.return_value = {"total_seats": 0, "seats": []}
+        client.stream_metrics.side_effect = lambda **kwargs: iter([
+            make_day(older, "go", 7, 1, 1), make_day(recent, "go", 4, 1, 1)
+        ])
+        store = MetricsStore(':memory:')
+        # Comme `python sync_worker.py` : ni processor ni fenêtres glissantes
+        sync_worker.SyncWorker("t", ["snapshot-org"], store, client_factory=Mock(return_value=client)).run_once()
+        sync_worker._warm_data.clear()
+        
+        with patch.object(app_module, 'metrics_store', store), \
+                patch.object(app_module, 'fetch_org_metrics_async') as fetch:
+            response = app_module.app.test_client().get(
+                '/api/metrics?org=snapshot-org&days=28', headers={'Authorization': 'Bearer t'}
+            )
+        sync_worker._warm_data.clear()
+        store.close()
+        
+        fetch.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['usage']['global_metrics']['total_suggestions'], 4)
+
+    def test_group_by_slices_the_cached_cube(self):
+        """Test que group_by découpe le cube construit lors du premier traitement"""
+        usage = [make_day("2024-01-01", "python", 10, 5, 2), make_day("2024-01-02", "go", 4, 1, 1)]
+        calls = []
+        
+        async def fake_fetch(token, org, days=90, include_metrics=True, include_billing=True):
+            calls.append(include_metrics)
+            return {"seat_breakdown": {}}, usage if include_metrics else None, None
+        
+        with patch.object(app_module, 'fetch_org_metrics_async', fake_fetch), \
+                patch.object(app_module, 'get_org_warm_data', return_value=None), \
+                patch.object(app_module, 'analyze_daily_metrics', wraps=app_module.analyze_daily_metrics) as analyze:
+            client = app_module.app.test_client()
+            headers = {'Authorization': 'Bearer t'}
+            client.get('/api/metrics?org=acme', headers=headers)
+            by_language = client.get('/api/metrics?org=acme&group_by=editor,language', headers=headers)
+            invalid = client.get('/api/metrics?org=acme&group_by=team', headers=headers)
+        
+        self.assertEqual(calls, [True, False])
+        self.assertEqual(analyze.call_count, 1)
+        breakdown = by_language.get_json()['breakdown']
+        self.assertEqual(breakdown['group_by'], ['editor', 'language'])
+        self.assertEqual([(r['editor'], r['language'], r['suggestions']) for r in breakdown['rows']],
+                         [('vscode', 'python', 10), ('vscode', 'go', 4)])
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_sections_compute_only_requested_reducers(self):
+        """Test qu'une tuile ne calcule et ne renvoie que les sections et champs demandés"""
+        usage = [make_day("2024-01-01", "python", 10, 5, 2), make_day("2024-01-02", "go", 4, 1, 1)]
+        calls = []
+
+        async def fake_fetch(token, org, days=90, include_metrics=True, include_billing=True):
+            calls.append((include_metrics, include_billing))
+            return None, usage if include_metrics else None, None
+
+        with patch.object(app_module, 'fetch_org_metrics_async', fake_fetch), \
+                patch.object(app_module, 'get_org_warm_data', return_value=None), \
+                patch.object(app_module, 'process_dashboard_sections',
+                             wraps=app_module.process_dashboard_sections) as process, \
+                patch('metrics_engine.LanguageStatsReducer.add') as language_add:
+            client = app_module.app.test_client()
+            headers = {'Authorization': 'Bearer t'}
+            tile = client.get('/api/metrics?org=acme&fields=global_metrics.total_suggestions', headers=headers)
+            again = client.get('/api/metrics?org=acme&sections=global_metrics', headers=headers)
+            again_tile = client.get('/api/metrics?org=acme&fields=global_metrics.total_suggestions',
+                                    headers=headers)
+            unknown = client.get('/api/metrics?org=acme&sections=seats', headers=headers)
+            bad_field = client.get('/api/metrics?org=acme&fields=users.seats', headers=headers)
+
+        self.assertEqual(tile.get_json(),
+                         {'granularity': 'day', 'usage': {'global_metrics': {'total_suggestions': 14}}})
+        self.assertEqual(again.get_json()['usage']['global_metrics']['active_days'], 2)
+        self.assertEqual(again_tile.get_json(), tile.get_json())
+        self.assertEqual(calls, [(True, False)])
+        self.assertEqual(process.call_count, 1)
+        language_add.assert_not_called()
+        self.assertEqual(unknown.status_code, 400)
+        self.assertEqual(bad_field.status_code, 400)
+
+    def test_long_range_reads_weekly_rollups(self):
+        """Test qu'une période de deux ans est servie depuis les résumés hebdomadaires"""
+        store = app_module.MetricsStore(':memory:')
+        store.upsert_days('acme', [make_day("2024-01-01", "python", 10, 5, 2),
+                                   make_day("2024-01-03", "python", 6, 3, 4),
+                                   make_day("2024-01-08", "go", 4, 1, 1)])
+        # Synchronisation réussie pour ce token (fake_fetch ne passe pas par sync_org_usage)
+        store.grant_access('acme', app_module.token_fingerprint('t'))
+        
+        async def fake_fetch(token, org, days=90, include_metrics=True, include_billing=True):
+            return {"seat_breakdown": {}}, [], None
+        
+        with patch.object(app_module, 'metrics_store', store), \
+                patch.object(app_module, 'window_since', return_value='2023-12-01T00:00:00Z'), \
+                patch.object(app_module, 'fetch_org_metrics_async', fake_fetch):
+            client = app_module.app.test_client()
+            data = client.get('/api/metrics?org=acme&days=730', headers={'Authorization': 'Bearer t'}).get_json()
+        
+        self.assertEqual(data['granularity'], 'week')
+        self.assertEqual([(p['period'], p['total_suggestions']) for p in data['usage']['users']],
+                         [('2024-W01', 16), ('2024-W02', 4)])
+        self.assertEqual(data['usage']['global_metrics']['active_days'], 3)
+        self.assertEqual(data['usage']['global_metrics']['total_users'], 4)
+
+class TestMetricsSync(unittest.TestCase):
+    """Tests pour la synchronisation des métriques de /api/metrics"""
+
+    def setUp(self):
+        self.store = app_module.MetricsStore(':memory:')
+        self.async_client = Mock()
+        self.async_client.get_dashboard_data = AsyncMock(
+            return_value={'billing': {"seat_breakdown": {}}, 'seats': None, 'metrics': None}
+        )
+        self.client = Mock()
+
+    def _fetch(self, days=90):
+        with patch.object(app_module, 'metrics_store', self.store), \
+                patch.object(app_module, 'window_since', return_value='2023-12-01T00:00:00Z'), \
+                patch.object(app_module, 'get_api_client', return_value=self.client), \
+                patch.object(app_module, 'get_async_api_client', return_value=self.async_client):
+            return app_module.fetch_org_metrics('t', 'acme', days)
+
+    def test_metrics_are_streamed_into_the_store(self):
+        """Test que les pages sont parsées en flux et la fenêtre relue par lots"""
+        days = [make_day("2024-01-01", "python", 10, 5, 2), make_day("2024-01-02", "go", 4, 1, 1)]
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter(days)
+
+        billing, usage, notice = self._fetch()
+
+        self.assertEqual(self.client.stream_metrics.call_args.kwargs['since'], '2023-12-01T00:00:00Z')
+        self.assertEqual(self.async_client.get_dashboard_data.call_args.kwargs['include_metrics'], False)
+        self.assertNotIsInstance(usage, list)
+        self.assertEqual(process_daily_metrics(usage)[1]['total_suggestions'], 14)
+        self.assertEqual(billing, {"seat_breakdown": {}})
+        self.assertIsNone(notice)
+
+    def test_metrics_error_becomes_a_notice(self):
+        """Test qu'un refus de l'API metrics renvoie une fenêtre vide et un avertissement"""
+        error = requests.exceptions.HTTPError(response=Mock(status_code=403, text="Forbidden"))
+        self.client.stream_metrics.side_effect = error
+
+        billing, usage, notice = self._fetch()
+
+        self.assertEqual(usage, [])
+        self.assertIn("403", notice)
+
+    def test_long_window_after_short_one_fetches_the_whole_window(self):
+        """Test qu'une fenêtre de 90 jours après une de 7 jours redemande toute la fenêtre"""
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter(
+            [make_day(kwargs['since'][:10], "go", 1, 1, 1)]
+        )
+        with patch.object(app_module, 'metrics_store', self.store), \
+                patch.object(app_module, 'get_api_client', return_value=self.client):
+            for days in (7, 90, 90):
+                app_module.sync_org_usage('t', 'acme', app_module.window_since(days))
+
+        sinces = [call.kwargs['since'][:10] for call in self.client.stream_metrics.call_args_list]
+        self.assertEqual(sinces, [app_module.window_since(7)[:10], app_module.window_since(90)[:10],
+                                  app_module.window_since(7)[:10]])
+
+    def _get(self, query, token):
+        with patch.object(app_module, 'metrics_store', self.store), \
+                patch.object(app_module, 'get_api_client', return_value=self.client), \
+                patch.object(app_module, 'get_async_api_client', return_value=self.async_client):
+            return app_module.app.test_client().get(
+                f'/api/metrics?org=acme&{query}', headers={'Authorization': f'Bearer {token}'}
+            )
+
+    def test_long_range_is_not_served_to_a_refused_token(self):
+        """Test qu'un token refusé par l'API metrics ne lit pas l'historique stocké par un autre"""
+        app_module.response_cache.clear()
+        recent = (datetime.utcnow() - timedelta(days=200)).strftime('%Y-%m-%d')
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter([make_day(recent, "go", 999, 1, 1)])
+        allowed = self._get('days=365', 'allowed')
+        self.client.stream_metrics.side_effect = requests.exceptions.HTTPError(
+            response=Mock(status_code=404, text="Not Found")
+        )
+        refused = self._get('days=365', 'intruder')
+        refused_again = self._get('days=365', 'intruder')
+
+        self.assertEqual(allowed.get_json()['usage']['global_metrics']['total_suggestions'], 999)
+        for response in (refused, refused_again):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['usage']['global_metrics']['total_suggestions'], 0)
+            self.assertIn("404", response.get_json()['notice'])
+
+    def test_breakdown_is_not_served_to_a_refused_token(self):
+        """Test que ?group_by= ne reconstruit pas le cube de l'historique d'un autre token"""
+        app_module.response_cache.clear()
+        recent = (datetime.utcnow() - timedelta(days=200)).strftime('%Y-%m-%d')
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter([make_day(recent, "go", 999, 1, 1)])
+        allowed = self._get('days=365&group_by=language', 'allowed')
+        self.client.stream_metrics.side_effect = requests.exceptions.HTTPError(
+            response=Mock(status_code=404, text="Not Found")
+        )
+        refused = self._get('days=365&group_by=language', 'intruder')
+
+        self.assertEqual([row['language'] for row in allowed.get_json()['breakdown']['rows']], ["go"])
+        self.assertEqual(refused.status_code, 200)
+        self.assertEqual(refused.get_json()['breakdown']['rows'], [])
+
+class TestResponseEncoding(unittest.TestCase):
+    """Tests pour l'ETag, les requêtes conditionnelles et la compression des réponses"""
+
+    def setUp(self):
+        app_module.response_cache.clear()
+        self.warm = {'billing': {"seat_breakdown": {}},
+                     'processed': process_daily_metrics([make_day("2024-01-01", "go", 4, 1, 1)]),
+                     'rollups': {28: process_daily_metrics([make_day("2024-01-01", "go", 6, 1, 1)])}}
+
+    def test_identical_refresh_is_not_modified(self):
+        """Test qu'un rafraîchissement aux données identiques reçoit un 304 sans corps"""
+        with patch.object(app_module, 'get_org_warm_data', return_value=self.warm), \
+                patch.object(app_module.response_encoder, 'min_size', 0):
+            client = app_module.app.test_client()
+            headers = {'Authorization': 'Bearer t', 'Accept-Encoding': 'gzip'}
+            first = client.get('/api/metrics?org=acme', headers=headers)
+            etag = first.headers['ETag']
+            refresh = client.get('/api/metrics?org=acme', headers={**headers, 'If-None-Match': etag})
+            plain = client.get('/api/metrics?org=acme',
+                               headers={'Authorization': 'Bearer t', 'If-None-Match': etag})
+            other = client.get('/api/metrics?org=acme&days=28', headers={**headers, 'If-None-Match': etag})
+
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(etag.endswith('-gzip"'))
+        data = json.loads(gzip.decompress(first.get_data()))
+        self.assertEqual(data['usage']['global_metrics']['total_suggestions'], 4)
+        self.assertEqual(refresh.status_code, 304)
+        self.assertEqual(refresh.get_data(), b'')
+        self.assertEqual(refresh.headers['ETag'], etag)
+        # Même représentation non compressée : ETag sans suffixe, toujours valide
+        self.assertEqual(plain.status_code, 304)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        # Données différentes : réponse complète
+        self.assertEqual(other.status_code, 200)
+        self.assertNotEqual(other.headers['ETag'], etag)
+
+    def test_errors_and_small_bodies_are_left_as_is(self):
+        """Test que les erreurs et les petits corps ne sont ni compressés ni validés"""
+        client = app_module.app.test_client()
+        error = client.get('/api/metrics?org=acme', headers={'Accept-Encoding': 'gzip'})
+        with patch.object(app_module, 'get_org_warm_data', return_value=self.warm), \
+                patch.object(app_module.response_encoder, 'min_size', 1 << 20):
+            small = client.get('/api/metrics?org=acme',
+                               headers={'Authorization': 'Bearer t', 'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(error.status_code, 401)
+        self.assertNotIn('ETag', error.headers)
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertEqual(small.headers['ETag'].count('-'), 0)
+
+class TestTeamMetrics(unittest.TestCase):
+    """Tests pour le classement des équipes"""
+    
+    def setUp(self):
+        app_module.response_cache.clear()
+        self.teams = [{"slug": "core", "name": "Core"}, {"slug": "web", "name": "Web"},
+                      {"slug": "tiny", "name": "Tiny"}]
+        self.results = [
+            [make_day("2024-01-01", "python", 10, 9, 5)],
+            [make_day("2024-01-01", "typescript", 50, 10, 6)],
+            Exception("422 Unprocessable Entity"),
+        ]
+    
+    def test_leaderboard_is_ranked_and_cached(self):
+        """Test le classement, les équipes indisponibles et le cache"""
+        with patch.object(app_module, 'fetch_teams_metrics', return_value=(self.teams, self.results)) as fetch:
+            client = app_module.app.test_client()
+            headers = {'Authorization': 'Bearer t'}
+            by_suggestions = client.get('/api/teams/metrics?org=acme', headers=headers).get_json()
+            by_rate = client.get('/api/teams/metrics?org=acme&sort=acceptance_rate', headers=headers).get_json()
+        
+        fetch.assert_called_once()
+        self.assertEqual([t['team'] for t in by_suggestions['teams']], ["web", "core"])
+        self.assertEqual(by_suggestions['teams'][0]['rank'], 1)
+        self.assertEqual([t['team'] for t in by_rate['teams']], ["core", "web"])
+        self.assertEqual(by_suggestions['unavailable'][0]['team'], "tiny")
+
+class TestUserExports(unittest.TestCase):
+    """Tests pour les utilisateurs des exports"""
+    
+    def test_users_are_built_from_seats(self):
+        """Test que les exports listent les sièges réels (et non des utilisateurs fictifs)"""
+        seats = {"total_seats": 2, "seats": [
+            {"assignee": {"login": "alice"}, "last_activity_at": "2024-01-01T00:00:00Z"},
+            {"assignee": {"login": "bob"}, "last_activity_at": None},
+        ]}
+        warm = {'seats': seats, 'processed': None, 'synced_at': 1.0}
+        
+        with patch.object(app_module, 'get_org_warm_data', return_value=warm):
+            users, user_metrics = app_module.load_org_users('t', 'acme')
+        
+        self.assertEqual([user.login for user in users], ["alice", "bob"])
+        self.assertEqual(users[1].activity_status, "never_active")
+        self.assertEqual(user_metrics['total_users'], 2)
+    
+    def test_exports_reuse_the_cached_user_index(self):
+        """Test que les exports et /api/users partagent l'index en cache : un seul appel aux sièges"""
+        app_module.response_cache.clear()
+        client = Mock()
+        client.get_all_seats.return_value = {"total_seats": 1, "seats": [
+            {"assignee": {"login": "alice"}, "last_activity_at": "2024-01-01T00:00:00Z"}
+        ]}
+        
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(app_module, 'GITHUB_TOKEN', 't'), patch.object(app_module, 'GITHUB_ORG', 'acme'), \
+                patch.object(app_module, 'get_org_warm_data', return_value=None), \
+                patch.object(app_module, 'get_api_client', return_value=client), \
+                patch.object(app_module.app, 'root_path', directory):
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                test_client = app_module.app.test_client()
+                excel = test_client.get('/api/export/excel')
+                pdf = test_client.get('/api/export/pdf')
+                page = test_client.get('/api/users').get_json()
+            finally:
+                os.chdir(cwd)
+        
+        self.assertEqual((excel.status_code, pdf.status_code), (200, 200))
+        self.assertEqual([user['login'] for user in page['users']], ["alice"])
+        client.get_all_seats.assert_called_once()
+
+class TestUsersPagination(unittest.TestCase):
+    """Tests pour la pagination, le tri et les filtres de /api/users"""
+    
+    def setUp(self):
+        app_module.response_cache.clear()
+        seats = [
+            {"assignee": {"login": f"user{i}"}, "created_at": f"2023-01-0{i}T00:00:00Z",
+             "last_activity_at": f"2024-01-0{i}T00:00:00Z" if i % 2 else None,
+             "last_activity_editor": "vscode/1.85.0" if i < 4 else "JetBrains-IC/2023.3"}
+            for i in range(1, 6)
+        ]
+        self.warm = {'seats': {"total_seats": 5, "seats": seats}, 'processed': None, 'synced_at': 1.0}
+    
+    def get(self, client, query):
+        return client.get(f'/api/users?{query}').get_json()
+    
+    def test_cursor_pages_follow_sort_and_filters(self):
+        """Test la pagination par curseur, l'ordre des dates et les filtres"""
+        with patch.object(app_module, 'GITHUB_TOKEN', 't'), patch.object(app_module, 'GITHUB_ORG', 'acme'), \
+                patch.object(app_module, 'get_org_warm_data', return_value=self.warm), \
+                patch.object(app_module.CopilotUserManager, 'process_users_data',
+                             wraps=app_module.CopilotUserManager.process_users_data) as process:
+            client = app_module.app.test_client()
+            first = self.get(client, 'limit=2')
+            second = self.get(client, f"limit=2&cursor={first['next_cursor']}")
+            recent = self.get(client, 'sort=last_activity&limit=5')
+            jetbrains = self.get(client, 'editor=jetbrains-ic')
+            never = self.get(client, 'status=never_active&sort=login&order=desc')
+            invalid = client.get('/api/users?status=sleepy')
+            mismatch = client.get(f"/api/users?sort=created_at&cursor={first['next_cursor']}")
+        
+        process.assert_called_once()
+        self.assertEqual([u['login'] for u in first['users'] + second['users']], ["user1", "user2", "user3", "user4"])
+        self.assertEqual((first['total'], first['total_seats'], first['active_users']), (5, 5, 3))
+        self.assertEqual([u['login'] for u in recent['users']], ["user5", "user3", "user1", "user4", "user2"])
+        self.assertIsNone(recent['next_cursor'])
+        self.assertEqual([u['login'] for u in jetbrains['users']], ["user4", "user5"])
+        self.assertEqual([u['login'] for u in never['users']], ["user4", "user2"])
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(mismatch.status_code, 400)
+
+    def test_cursor_pages_cover_seats_without_assignee(self):
+        """Test que les sièges sans assignee (login vide) sont tous parcourus page après page"""
+        seats = [{"assignee": {"login": f"user{i}"} if i % 2 else None, "created_at": "2023-01-01T00:00:00Z"}
+                 for i in range(8)]
+        warm = {'seats': {"total_seats": 8, "seats": seats}, 'processed': None, 'synced_at': 1.0}
+        
+        with patch.object(app_module, 'GITHUB_TOKEN', 't'), patch.object(app_module, 'GITHUB_ORG', 'acme'), \
+                patch.object(app_module, 'get_org_warm_data', return_value=warm):
+            client = app_module.app.test_client()
+            for query in ('sort=login', 'sort=login&order=desc', 'sort=created_at', 'sort=last_activity'):
+                pages = [self.get(client, f'{query}&limit=2')]
+                while pages[-1]['next_cursor']:
+                    pages.append(self.get(client, f"{query}&limit=2&cursor={pages[-1]['next_cursor']}"))
+                
+                users = [u for page in pages for u in page['users']]
+                self.assertEqual(len(users), 8, query)
+                self.assertEqual(len(pages), 4, query)
+    
+    def test_index_is_rebuilt_after_a_new_sync_without_keeping_seats(self):
+        """Test que l'index en cache ne garde pas les sièges bruts et suit les nouvelles synchronisations"""
+        with patch.object(app_module, 'GITHUB_TOKEN', 't'), patch.object(app_module, 'GITHUB_ORG', 'acme'), \
+                patch.object(app_module, 'get_org_warm_data', return_value=self.warm):
+            client = app_module.app.test_client()
+            self.get(client, 'limit=1')
+            cached = app_module.response_cache.get(app_module.user_index_key('acme', 't'))
+            self.warm = dict(self.warm, synced_at=2.0, seats={"total_seats": 1, "seats": [
+                {"assignee": {"login": "zoe"}}
+            ]})
+        with patch.object(app_module, 'GITHUB_TOKEN', 't'), patch.object(app_module, 'GITHUB_ORG', 'acme'), \
+                patch.object(app_module, 'get_org_warm_data', return_value=self.warm):
+            refreshed = self.get(client, 'limit=1')
+        
+        self.assertEqual(cached[0], 1.0)
+        self.assertEqual([u['login'] for u in refreshed['users']], ["zoe"])
+
+    def test_filtered_indexes_are_bounded(self):
+        """Test que les éditeurs inconnus ne sont pas mémorisés et que la mémoire des filtres est bornée"""
+        rows = app_module.CopilotUserManager.process_users_data(self.warm['seats'])
+        index = UserIndex.from_user_rows(rows)
+        size = index.estimated_size()
+        
+        for i in range(100):
+            self.assertEqual(index.page(editors=frozenset({f"editor{i}"}))['total'], 0)
+        self.assertEqual(len(index._filtered), 0)
+        
+        statuses = [frozenset({status}) for status in USER_STATUSES]
+        for sort in SORT_FIELDS:
+            for order in ('asc', 'desc'):
+                for status in statuses:
+                    index.page(sort=sort, order=order, statuses=status, editors=frozenset({'vscode'}))
+        self.assertLessEqual(len(index._filtered), user_index._MAX_FILTERED_INDEXES)
+        self.assertEqual(index.estimated_size(), size)
+        self.assertEqual(index.page(editors=frozenset({'vscode', 'emacs'}))['total'], 3)
+
+class TestJsonProvider(unittest.TestCase):
+    """Tests pour la sérialisation JSON des réponses"""
+    
+    def test_providers_serialize_project_types_identically(self):
+        """Test dates, scalaires NumPy et Decimal avec orjson et la bibliothèque standard"""
+        import numpy as np
+        from datetime import date, datetime
+        from decimal import Decimal
+        payload = {'day': date(2024, 1, 2), 'at': datetime(2024, 1, 2, 3, 4, 5),
+                   'total': np.int64(7), 'rate': np.float64(12.5), 'values': np.array([1, 2]),
+                   'cost': Decimal('19.5')}
+        expected = {'day': '2024-01-02', 'at': '2024-01-02T03:04:05', 'total': 7, 'rate': 12.5,
+                    'values': [1, 2], 'cost': 19.5}
+        
+        for provider_class in (OrjsonProvider, StdlibJSONProvider):
+            provider = provider_class(app_module.app)
+            with app_module.app.app_context():
+                response = provider.response(payload)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(provider.loads(response.get_data()), expected)
+    
+    def test_unknown_provider_is_rejected(self):
+        """Test le choix du fournisseur"""
+        self.assertIs(json_provider_class('stdlib'), StdlibJSONProvider)
+        with self.assertRaises(ValueError):
+            json_provider_class('ujson')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,19 +2,47 @@
 Tests unitaires pour les APIs GitHub Copilot corrigées
 """
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch
+import io
+import os
+import tempfile
+import asyncio
+import httpx
+import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-from copilot_api_client import GitHubCopilotAPIClient
+from copilot_api_client import (
+    GitHubCopilotAPIClient, ValidatorCache, RateLimitScheduler, RateLimitExceeded, SingleFlight,
+    PRIORITY_BACKGROUND, get_shared_session, token_fingerprint
+)
+from async_copilot_api_client import AsyncGitHubCopilotAPIClient, AsyncSingleFlight, run_async
+from metrics_store import MetricsStore
+from response_cache import ResponseCache
+import sync_worker
+from sync_worker import SyncWorker, get_warm_data
+from metrics_engine import (
+    Reducer, aggregate, flatten_day, process_dashboard_metrics, summarize_daily_stats
+)
+from metrics_columnar import metrics_frames, process_dashboard_metrics_columnar
+from metrics_cube import parse_group_by, process_dashboard_metrics_with_cube
+from metrics_rollups import choose_granularity, rollups_to_dashboard
+from metrics_window import SlidingWindowAggregator
+from records import DailyStats
 from metrics_processor import CopilotMetricsProcessor
-from user_manager import CopilotUserManager
+from user_manager import CopilotUserManager, classify_seat_activity
 
 class TestGitHubCopilotAPIClient(unittest.TestCase):
     """Tests pour le client API GitHub Copilot"""
     
     def setUp(self):
-        self.client = GitHubCopilotAPIClient("test_token", "test_org")
+        self.session = Mock()
+        self.client = GitHubCopilotAPIClient(
+            "test_token", "test_org", session=self.session, validator_cache=ValidatorCache()
+        )
     
     def test_initialization(self):
         """Test l'initialisation du client"""
@@ -25,55 +53,731 @@ class TestGitHubCopilotAPIClient(unittest.TestCase):
         self.assertEqual(self.client.headers["Accept"], "application/vnd.github+json")
         self.assertEqual(self.client.headers["X-GitHub-Api-Version"], "2022-11-28")
     
-    @patch('copilot_api_client.requests.get')
-    def test_get_billing_info_success(self, mock_get):
+    def test_shared_session_is_reused(self):
+        """Test que les clients partagent le même pool de connexions"""
+        client_a = GitHubCopilotAPIClient("token_a", "org_a", pool_size=4, max_retries=1)
+        client_b = GitHubCopilotAPIClient("token_b", "org_b", pool_size=4, max_retries=1)
+        
+        self.assertIs(client_a.session, client_b.session)
+        self.assertIs(client_a.session, get_shared_session(4, 1))
+        adapter = client_a.session.get_adapter("https://api.github.com")
+        self.assertEqual(adapter.max_retries.total, 1)
+        self.assertEqual(adapter._pool_maxsize, 4)
+    
+    def test_get_billing_info_success(self):
         """Test la récupération des informations de facturation"""
         mock_response = Mock()
         mock_response.json.return_value = {"seat_breakdown": {"total": 10}}
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        self.session.get.return_value = mock_response
         
         result = self.client.get_billing_info()
         
         self.assertEqual(result, {"seat_breakdown": {"total": 10}})
-        mock_get.assert_called_once_with(
+        self.session.get.assert_called_once_with(
             "https://api.github.com/orgs/test_org/copilot/billing",
-            headers=self.client.headers
+            headers=self.client.headers,
+            params=None,
+            timeout=self.client.timeout,
+            allow_redirects=False
         )
     
-    @patch('copilot_api_client.requests.get')
-    def test_get_metrics_success(self, mock_get):
+    def test_get_metrics_success(self):
         """Test la récupération des métriques"""
         mock_response = Mock()
         mock_response.json.return_value = [{"date": "2024-01-01", "total_active_users": 5}]
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        self.session.get.return_value = mock_response
         
         result = self.client.get_metrics()
         
         self.assertEqual(result, [{"date": "2024-01-01", "total_active_users": 5}])
-        mock_get.assert_called_once()
+        self.session.get.assert_called_once()
+    
+    def test_iter_seats_fetches_all_pages(self):
+        """Test l'auto-pagination des sièges via total_seats"""
+        def fake_get(url, params=None, **kwargs):
+            page = params["page"]
+            response = Mock()
+            response.links = {}
+            response.raise_for_status.return_value = None
+            response.json.return_value = {
+                "total_seats": 5,
+                "seats": [{"assignee": {"login": f"user{page}_{i}"}} for i in range(2 if page < 3 else 1)]
+            }
+            return response
+        self.session.get.side_effect = fake_get
+        
+        result = self.client.get_all_seats(per_page=2)
+        
+        self.assertEqual(result["total_seats"], 5)
+        logins = sorted(seat["assignee"]["login"] for seat in result["seats"])
+        self.assertEqual(logins, ["user1_0", "user1_1", "user2_0", "user2_1", "user3_0"])
+        pages = sorted(call.kwargs["params"]["page"] for call in self.session.get.call_args_list)
+        self.assertEqual(pages, [1, 2, 3])
+    
+    def test_get_all_metrics_follows_link_header(self):
+        """Test l'auto-pagination des métriques via l'en-tête Link"""
+        def fake_get(url, params=None, **kwargs):
+            page = params["page"]
+            response = Mock()
+            response.raise_for_status.return_value = None
+            response.links = {"last": {"url": f"{url}?per_page=1&page=3"}} if page == 1 else {}
+            response.json.return_value = [{"date": f"2024-01-0{4 - page}"}]
+            return response
+        self.session.get.side_effect = fake_get
+        
+        result = self.client.get_all_metrics(per_page=1)
+        
+        self.assertEqual([day["date"] for day in result], ["2024-01-01", "2024-01-02", "2024-01-03"])
     
-    @patch('copilot_api_client.requests.get')
-    def test_test_connection_success(self, mock_get):
+    def test_stream_metrics_yields_days_across_pages(self):
+        """Test le parsing en flux des pages de métriques (Link rel="next")"""
+        bodies = [b'[{"date": "2024-01-01"}, {"date": "2024-01-02"}]', b'[{"date": "2024-01-03"}]']
+        def fake_get(url, params=None, **kwargs):
+            response = Mock(status_code=200, headers={})
+            response.raise_for_status.return_value = None
+            response.raw = io.BytesIO(bodies.pop(0))
+            response.json.side_effect = lambda: json.loads(response.raw.getvalue())
+            response.links = {"next": {"url": f"{url}?page=2"}} if bodies else {}
+            return response
+        self.session.get.side_effect = fake_get
+        
+        days = list(self.client.stream_metrics(since="2024-01-01T00:00:00Z"))
+        
+        self.assertEqual([day["date"] for day in days], ["2024-01-01", "2024-01-02", "2024-01-03"])
+        first, second = self.session.get.call_args_list
+        self.assertTrue(first.kwargs["stream"])
+        self.assertEqual(first.kwargs["params"]["since"], "2024-01-01T00:00:00Z")
+        self.assertIsNone(second.kwargs["params"])
+    
+    def test_conditional_request_serves_cached_body_on_304(self):
+        """Test l'envoi de If-None-Match et la réutilisation du corps sur 304"""
+        fresh = Mock(status_code=200, headers={"ETag": '"abc"'}, links={})
+        fresh.json.return_value = {"seat_breakdown": {"total": 10}}
+        not_modified = Mock(status_code=304, headers={}, links={})
+        self.session.get.side_effect = [fresh, not_modified]
+        
+        first = self.client.get_billing_info()
+        second = self.client.get_billing_info()
+        
+        self.assertIs(second, first)
+        not_modified.json.assert_not_called()
+        second_headers = self.session.get.call_args_list[1].kwargs["headers"]
+        self.assertEqual(second_headers["If-None-Match"], '"abc"')
+        self.assertNotIn("If-None-Match", self.client.headers)
+    
+    def test_304_without_cached_body_is_fetched_again(self):
+        """Test qu'un 304 sans corps en cache est suivi d'une seule relance inconditionnelle"""
+        not_modified = Mock(status_code=304, headers={}, links={})
+        fresh = Mock(status_code=200, headers={}, links={}, content=b'{"seat_breakdown":{}}')
+        fresh.json.return_value = {"seat_breakdown": {}}
+        self.session.get.side_effect = [not_modified, fresh]
+        
+        self.assertEqual(self.client.get_billing_info(), {"seat_breakdown": {}})
+        not_modified.json.assert_not_called()
+        self.assertNotIn("If-None-Match", self.session.get.call_args_list[1].kwargs["headers"])
+    
+    def test_validator_cache_is_bounded_in_bytes(self):
+        """Test l'éviction LRU au-delà de max_bytes et le refus des corps trop grands"""
+        cache = ValidatorCache(max_entries=10, max_bytes=100)
+        cache.set("a", '"a"', {}, {}, size=60)
+        cache.set("b", '"b"', {}, {}, size=60)
+        cache.set("c", '"c"', {}, {}, size=500)
+        cache.set("b", '"b2"', {}, {}, size=30)
+        
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.get("b").etag, '"b2"')
+        self.assertEqual(cache.current_bytes, 30)
+    
+    def test_concurrent_identical_requests_share_one_call(self):
+        """Test que des appels identiques simultanés partagent une seule requête"""
+        release = threading.Event()
+        def slow_get(url, **kwargs):
+            release.wait(1)
+            response = Mock(status_code=200, headers={}, links={})
+            response.json.return_value = {"seat_breakdown": {"total": 10}}
+            return response
+        self.session.get.side_effect = slow_get
+        single_flight = SingleFlight()
+        clients = [
+            GitHubCopilotAPIClient("test_token", "test_org", session=self.session,
+                                   validator_cache=ValidatorCache(), single_flight=single_flight)
+            for _ in range(4)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(client.get_billing_info) for client in clients]
+            while single_flight.shared < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+        other_token = GitHubCopilotAPIClient("other_token", "test_org", session=self.session,
+                                             single_flight=single_flight).get_billing_info()
+        
+        self.assertEqual(self.session.get.call_count, 2)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(other_token, results[0])
+        self.assertEqual(len(single_flight), 0)
+    
+    def test_test_connection_success(self):
         """Test la vérification de connexion"""
         mock_response = Mock()
         mock_response.raise_for_status.return_value = None
-        mock_get.return_value = mock_response
+        self.session.get.return_value = mock_response
         
         result = self.client.test_connection()
         
         self.assertTrue(result)
     
-    @patch('copilot_api_client.requests.get')
-    def test_test_connection_failure(self, mock_get):
+    def test_test_connection_failure(self):
         """Test l'échec de vérification de connexion"""
-        mock_get.side_effect = Exception("Connection failed")
+        self.session.get.side_effect = Exception("Connection failed")
         
         result = self.client.test_connection()
         
         self.assertFalse(result)
 
+class TestRateLimitScheduler(unittest.TestCase):
+    """Tests pour le scheduler de rate limit"""
+    
+    def setUp(self):
+        self.scheduler = RateLimitScheduler()
+        self.session = Mock()
+        self.client = GitHubCopilotAPIClient(
+            "test_token", "test_org", session=self.session,
+            validator_cache=ValidatorCache(), scheduler=self.scheduler
+        )
+    
+    def _response(self, status_code, headers=None, body=None):
+        response = Mock(status_code=status_code, headers=headers or {}, links={}, text="")
+        response.json.return_value = body
+        if status_code >= 400:
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+        else:
+            response.raise_for_status.return_value = None
+        return response
+    
+    def test_exhausted_budget_raises_instead_of_waiting(self):
+        """Test qu'un budget épuisé lève RateLimitExceeded avec le délai de reset"""
+        reset = str(int(time.time()) + 600)
+        self.scheduler.update("tok", {
+            "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset
+        })
+        
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            self.scheduler.acquire("tok", max_wait=1)
+        self.assertGreater(ctx.exception.retry_after, 500)
+    
+    def test_token_budgets_are_bounded(self):
+        """Test que les budgets terminés puis les moins récents sont oubliés au-delà de max_budgets"""
+        scheduler = RateLimitScheduler(clock=lambda: 1000.0, max_budgets=2)
+        exhausted = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1600"}
+        scheduler.update("done", dict(exhausted, **{"X-RateLimit-Reset": "900"}))
+        scheduler.update("blocked", exhausted)
+        
+        for i in range(50):
+            scheduler.acquire(f"tok{i}")
+        
+        self.assertEqual(len(scheduler), 2)
+        with self.assertRaises(RateLimitExceeded):
+            scheduler.acquire("blocked", max_wait=1)
+        
+        scheduler.update("other", exhausted)
+        scheduler.update("last", exhausted)
+        
+        self.assertEqual(len(scheduler), 2)
+        scheduler.acquire("blocked", max_wait=1)
+    
+    def test_retry_after_is_honoured(self):
+        """Test la relance après un rate limit secondaire (429 + Retry-After)"""
+        self.session.get.side_effect = [
+            self._response(429, {"Retry-After": "0"}),
+            self._response(200, body={"seat_breakdown": {}}),
+        ]
+        
+        result = self.client.get_billing_info()
+        
+        self.assertEqual(result, {"seat_breakdown": {}})
+        self.assertEqual(self.session.get.call_count, 2)
+    
+    def test_persistent_rate_limit_is_reported(self):
+        """Test qu'un rate limit persistant remonte en RateLimitExceeded"""
+        self.session.get.return_value = self._response(403, {"Retry-After": "0"})
+        
+        with self.assertRaises(RateLimitExceeded):
+            self.client.get_billing_info()
+        self.assertEqual(self.session.get.call_count, self.scheduler.max_attempts)
+    
+    def test_background_requests_keep_interactive_reserve(self):
+        """Test que les requêtes de fond n'entament pas la réserve interactive"""
+        reset = str(int(time.time()) + 600)
+        self.scheduler.update("tok", {
+            "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "400", "X-RateLimit-Reset": reset
+        })
+        
+        self.scheduler.acquire("tok", max_wait=0)
+        with self.assertRaises(RateLimitExceeded):
+            self.scheduler.acquire("tok", priority=PRIORITY_BACKGROUND, max_wait=0)
+
+class TestAsyncGitHubCopilotAPIClient(unittest.TestCase):
+    """Tests pour le client API asynchrone"""
+    
+    def _client(self, handler):
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return AsyncGitHubCopilotAPIClient(
+            "test_token", "test_org", http_client=http_client,
+            validator_cache=ValidatorCache(), scheduler=RateLimitScheduler()
+        )
+    
+    def test_dashboard_calls_run_concurrently(self):
+        """Test que billing, seats et metrics partent en parallèle"""
+        async def handler(request):
+            await asyncio.sleep(0.2)
+            path = request.url.path
+            if path.endswith("/copilot/billing"):
+                return httpx.Response(200, json={"seat_breakdown": {"total": 3}})
+            if path.endswith("/copilot/billing/seats"):
+                return httpx.Response(200, json={"total_seats": 1, "seats": [{"assignee": {"login": "a"}}]})
+            return httpx.Response(200, json=[{"date": "2024-01-02"}, {"date": "2024-01-01"}])
+        client = self._client(handler)
+        
+        started = time.perf_counter()
+        data = asyncio.run(client.get_dashboard_data())
+        elapsed = time.perf_counter() - started
+        
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(data["billing"], {"seat_breakdown": {"total": 3}})
+        self.assertEqual(data["seats"]["total_seats"], 1)
+        self.assertEqual([day["date"] for day in data["metrics"]], ["2024-01-01", "2024-01-02"])
+    
+    def test_dashboard_reports_errors_per_source(self):
+        """Test qu'une source en échec n'empêche pas les autres"""
+        def handler(request):
+            if request.url.path.endswith("/copilot/billing"):
+                return httpx.Response(404, json={"message": "Not Found"})
+            return httpx.Response(200, json=[])
+        client = self._client(handler)
+        
+        data = asyncio.run(client.get_dashboard_data(include_seats=False))
+        
+        self.assertIsInstance(data["billing"], httpx.HTTPStatusError)
+        self.assertEqual(data["metrics"], [])
+        self.assertIsNone(data["seats"])
+    
+    def test_scheduler_waits_off_the_loop_only_when_needed(self):
+        """Test que acquire ne passe par un thread que si le budget impose d'attendre"""
+        client = self._client(lambda request: httpx.Response(200, json={"seat_breakdown": {}}))
+        
+        with patch.object(asyncio, 'to_thread', wraps=asyncio.to_thread) as to_thread:
+            asyncio.run(client.get_billing_info())
+            self.assertEqual(to_thread.call_count, 0)
+            client.scheduler.update(client.token, {
+                "X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + 600)
+            })
+            client.max_wait = 0
+            with self.assertRaises(RateLimitExceeded):
+                asyncio.run(client.get_team_metrics("core"))
+        
+        self.assertEqual(to_thread.call_count, 1)
+    
+    def test_background_loop_has_its_own_executor(self):
+        """Test que les appels bloquants de la boucle de fond passent par son pool dédié"""
+        async def blocking_thread_name():
+            return await asyncio.to_thread(lambda: threading.current_thread().name)
+        
+        self.assertTrue(run_async(blocking_thread_name()).startswith('github-async-io'))
+    
+    def test_concurrent_identical_metrics_requests_are_coalesced(self):
+        """Test que les tableaux de bord ouverts en même temps ne demandent les métriques qu'une fois"""
+        requests_seen = []
+        async def handler(request):
+            requests_seen.append(request.headers["Authorization"])
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=[{"date": "2024-01-01"}])
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        single_flight = AsyncSingleFlight()
+        def client(token):
+            return AsyncGitHubCopilotAPIClient(
+                token, "test_org", http_client=http_client, validator_cache=ValidatorCache(),
+                scheduler=RateLimitScheduler(), single_flight=single_flight
+            )
+        
+        async def open_dashboards():
+            calls = [client("test_token").get_all_metrics(since="2024-01-01T00:00:00Z") for _ in range(5)]
+            calls.append(client("other_token").get_all_metrics(since="2024-01-01T00:00:00Z"))
+            return await asyncio.gather(*calls)
+        results = asyncio.run(open_dashboards())
+        
+        self.assertEqual(sorted(requests_seen), ["Bearer other_token", "Bearer test_token"])
+        self.assertTrue(all(result == [{"date": "2024-01-01"}] for result in results))
+        self.assertEqual(single_flight.shared, 4)
+        self.assertEqual(len(single_flight), 0)
+
+class TestMetricsStore(unittest.TestCase):
+    """Tests pour le stockage local des métriques"""
+    
+    def setUp(self):
+        self.store = MetricsStore(':memory:')
+    
+    def tearDown(self):
+        self.store.close()
+    
+    def test_upsert_and_read_window(self):
+        """Test l'écriture idempotente et la lecture d'une fenêtre"""
+        self.store.upsert_days("Acme", [{"date": "2024-01-01", "v": 1}, {"date": "2024-01-02", "v": 1}])
+        self.store.upsert_days("acme", [{"date": "2024-01-02", "v": 2}, {"date": "2024-01-03", "v": 1}])
+        
+        days = self.store.get_days("ACME", since="2024-01-02T00:00:00Z")
+        
+        self.assertEqual(days, [{"date": "2024-01-02", "v": 2}, {"date": "2024-01-03", "v": 1}])
+        self.assertEqual(self.store.last_date("acme"), "2024-01-03")
+        self.assertEqual(self.store.orgs(), ["acme"])
+    
+    def test_iter_days_reads_in_batches(self):
+        """Test la lecture par lots d'une fenêtre (bornes incluses)"""
+        self.store.upsert_days("acme", ({"date": f"2024-01-{day:02d}"} for day in range(1, 8)))
+        
+        days = self.store.iter_days("acme", since="2024-01-02", until="2024-01-06", batch_size=2)
+        
+        self.assertEqual([day["date"] for day in days],
+                         ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-06"])
+    
+    def test_sync_since_only_requests_new_days(self):
+        """Test que seule la fin de la fenêtre est redemandée"""
+        window = "2024-01-01T00:00:00Z"
+        self.assertEqual(self.store.sync_since("acme", window), window)
+        
+        self.store.upsert_days("acme", [{"date": "2024-02-10"}])
+        self.store.mark_synced("acme", window, "2024-02-10")
+        
+        self.assertEqual(self.store.sync_since("acme", window), "2024-02-10T00:00:00Z")
+        self.assertEqual(self.store.sync_since("acme", "2024-03-01T00:00:00Z"), "2024-03-01T00:00:00Z")
+    
+    def test_longer_window_is_fetched_after_a_short_one(self):
+        """Test qu'une fenêtre plus longue que la plage synchronisée est récupérée en entier"""
+        short, long = "2024-02-03T00:00:00Z", "2023-11-12T00:00:00Z"
+        self.store.upsert_days("acme", [{"date": "2024-02-03"}, {"date": "2024-02-10"}])
+        self.store.mark_synced("acme", short, "2024-02-10")
+        
+        self.assertEqual(self.store.sync_since("acme", long), long)
+        
+        self.store.mark_synced("acme", long, "2024-02-10")
+        
+        self.assertEqual(self.store.coverage("acme"), ("2023-11-12", "2024-02-10"))
+        self.assertEqual(self.store.sync_since("acme", long), "2024-02-10T00:00:00Z")
+        self.assertEqual(self.store.sync_since("acme", short), "2024-02-10T00:00:00Z")
+        # Synchronisation disjointe : l'ancienne plage n'est pas étendue par-dessus le trou
+        self.store.mark_synced("acme", "2024-06-01", "2024-06-10")
+        self.assertEqual(self.store.coverage("acme"), ("2024-06-01", "2024-06-10"))
+    
+    def test_reopen_keeps_file_database(self):
+        """Test qu'une nouvelle connexion (worker gunicorn après fork) relit la même base"""
+        with tempfile.TemporaryDirectory() as directory:
+            store = MetricsStore(os.path.join(directory, 'metrics.db'))
+            store.upsert_days("acme", [{"date": "2024-01-01"}])
+            store.reopen()
+            store.upsert_days("acme", [{"date": "2024-01-02"}])
+            
+            self.assertEqual(store.last_date("acme"), "2024-01-02")
+            self.assertEqual(len(store.get_days("acme")), 2)
+            store.close()
+
+class TestMetricsRollups(unittest.TestCase):
+    """Tests pour les résumés hebdomadaires et mensuels du stockage"""
+
+    def test_rollups_match_daily_processing(self):
+        store = MetricsStore(':memory:')
+        days = [
+            {"date": "2024-01-30", "total_active_users": 3, "copilot_ide_code_completions": {"editors": [{
+                "name": "vscode", "models": [{"name": "default", "languages": [
+                    {"name": "python", "total_code_suggestions": 10, "total_code_acceptances": 4,
+                     "total_engaged_users": 3}]}]}]}},
+            {"date": "2024-02-02", "total_active_users": 5},
+        ]
+        store.upsert_days("acme", days[:1])
+        store.upsert_days("acme", days[1:])
+
+        self.assertEqual([r['period'] for r in store.get_rollups("acme", "week")], ["2024-W05"])
+        months = store.get_rollups("acme", "month", since="2024-01-15")
+        self.assertEqual([(r['period'], r['days']) for r in months], [("2024-01", 1), ("2024-02", 1)])
+        _, global_metrics, language_stats = rollups_to_dashboard(store.get_rollups("acme", "week"))
+        _, expected_global, expected_languages = process_dashboard_metrics(days)
+        self.assertEqual(global_metrics, expected_global)
+        self.assertEqual(language_stats, expected_languages)
+        store.close()
+
+    def test_choose_granularity(self):
+        self.assertEqual(choose_granularity(90), 'day')
+        self.assertEqual(choose_granularity(730), 'week')
+        self.assertEqual(choose_granularity(1095), 'month')
+
+class TestSyncWorker(unittest.TestCase):
+    """Tests pour le worker de synchronisation"""
+    
+    def setUp(self):
+        sync_worker._warm_data.clear()
+        self.store = MetricsStore(':memory:')
+        self.client = Mock()
+        self.client.get_billing_info.return_value = {"seat_breakdown": {"total": 2}}
+        self.client.get_all_seats.return_value = {"total_seats": 1, "seats": [{"assignee": {"login": "a"}}]}
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter([{"date": today}])
+        self.factory = Mock(return_value=self.client)
+        self.processor = Mock(side_effect=lambda days: ("processed", len(list(days))))
+    
+    def tearDown(self):
+        self.store.close()
+    
+    def test_run_once_prewarms_data(self):
+        """Test qu'un cycle alimente le stockage et les données chaudes"""
+        worker = SyncWorker("tok", ["acme"], self.store, processor=self.processor,
+                            client_factory=self.factory)
+        
+        self.assertEqual(worker.run_once(), {"acme": True})
+        
+        self.assertEqual(self.factory.call_args.kwargs["priority"], PRIORITY_BACKGROUND)
+        warm = get_warm_data(self.store, "acme", "tok", max_age=60, processor=self.processor)
+        self.assertEqual(warm["processed"], ("processed", 1))
+        self.assertEqual(warm["seats"]["total_seats"], 1)
+        self.assertIsNone(get_warm_data(self.store, "acme", "other", max_age=60))
+        self.assertTrue(self.store.has_access("acme", token_fingerprint("tok"), max_age=60))
+        self.assertFalse(self.store.has_access("acme", token_fingerprint("other"), max_age=60))
+    
+    def test_warm_data_from_store_snapshots(self):
+        """Test la relecture des snapshots écrits par un autre processus"""
+        SyncWorker("tok", ["acme"], self.store, client_factory=self.factory).run_once()
+        sync_worker._warm_data.clear()
+        
+        warm = get_warm_data(self.store, "acme", "tok", max_age=60, processor=self.processor)
+        
+        self.assertEqual(warm["billing"], {"seat_breakdown": {"total": 2}})
+        self.assertEqual(warm["processed"], ("processed", 1))
+    
+    def test_newer_snapshots_replace_the_warm_entry(self):
+        """Test qu'un worker web relit les snapshots plus récents écrits par le processus de synchronisation"""
+        SyncWorker("tok", ["acme"], self.store, client_factory=self.factory).run_once()
+        sync_worker._warm_data.clear()
+        first = get_warm_data(self.store, "acme", "tok", max_age=60, processor=self.processor)
+        self.assertIs(get_warm_data(self.store, "acme", "tok", max_age=60, processor=self.processor), first)
+        
+        with patch('time.time', return_value=time.time() + 5):
+            self.store.put_snapshot("acme", "seats", token_fingerprint("tok"), {"total_seats": 2, "seats": []})
+        warm = get_warm_data(self.store, "acme", "tok", max_age=60, processor=self.processor)
+        
+        self.assertIsNot(warm, first)
+        self.assertEqual(warm["seats"]["total_seats"], 2)
+    
+    def test_rollup_windows_are_updated_incrementally(self):
+        """Test que les fenêtres glissantes ne relisent que les nouveaux jours"""
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter([{"date": yesterday}])
+        worker = SyncWorker("tok", ["acme"], self.store, client_factory=self.factory,
+                            rollup_windows=(28,))
+        worker.run_once()
+        self.client.stream_metrics.side_effect = lambda **kwargs: iter([{"date": today, "total_active_users": 3}])
+        
+        with patch.object(self.store, "iter_days", wraps=self.store.iter_days) as iter_days:
+            entry = worker.sync_org("acme")
+        
+        self.assertEqual(iter_days.call_args.args[1], yesterday)
+        self.assertEqual(sorted(entry["rollups"]), [28, 90])
+        self.assertEqual(entry["processed"], entry["rollups"][90])
+        self.assertEqual(len(entry["rollups"][28][0]), 2)
+
+class TestResponseCache(unittest.TestCase):
+    """Tests pour le cache de réponses TTL + LRU"""
+    
+    def setUp(self):
+        self.now = 0
+        self.cache = ResponseCache(ttl=10, max_entries=2, max_bytes=100, clock=lambda: self.now)
+    
+    def test_entries_expire_after_ttl(self):
+        """Test l'expiration des entrées"""
+        self.cache.set("a", {"v": 1})
+        self.now = 9
+        self.assertEqual(self.cache.get("a"), {"v": 1})
+        self.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.current_bytes, 0)
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test l'éviction LRU sur le nombre d'entrées"""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.get("c"), 3)
+    
+    def test_byte_budget_is_enforced(self):
+        """Test l'éviction sur la taille cumulée"""
+        self.cache.set("a", "x" * 60)
+        self.cache.set("b", "y" * 60)
+        self.cache.set("huge", "z" * 500)
+        
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("huge"))
+        self.assertEqual(len(self.cache), 1)
+        self.assertLessEqual(self.cache.current_bytes, 100)
+
+class TestMetricsEngine(unittest.TestCase):
+    """Tests pour le moteur d'agrégation en un seul parcours"""
+
+    def setUp(self):
+        def day(date, languages, chats=0):
+            return {
+                "date": date,
+                "total_active_users": 5,
+                "copilot_ide_code_completions": {"editors": [{"name": "vscode", "models": [{
+                    "name": "default",
+                    "languages": [
+                        {"name": name, "total_code_suggestions": sugg, "total_code_acceptances": acc,
+                         "total_engaged_users": users}
+                        for name, sugg, acc, users in languages
+                    ]
+                }]}]},
+                "copilot_ide_chat": {"editors": [{"name": "vscode", "models": [
+                    {"name": "default", "total_chats": chats, "total_chat_insertion_events": 1}
+                ]}]}
+            }
+
+        self.days = [
+            day("2024-01-01", [("python", 10, 4, 3), ("go", 5, 5, 1)], chats=2),
+            day("2024-01-02", [("python", 20, 6, 2)]),
+        ]
+
+    def test_results_are_slotted_records(self):
+        daily, _, language_stats = process_dashboard_metrics(self.days)
+        day = daily[0]
+        self.assertIsInstance(day, DailyStats)
+        self.assertFalse(hasattr(day, "__dict__"))
+        self.assertEqual(day["total_suggestions"], 15)
+        self.assertEqual(day.get("missing", 0), 0)
+        self.assertEqual(day, dict(day))
+        self.assertEqual(language_stats["go"].to_dict()["acceptance_rate"], 100.0)
+        with self.assertRaises(KeyError):
+            day["missing"]
+
+    def test_flatten_day(self):
+        view = flatten_day(self.days[0])
+        self.assertEqual(view.date, "2024-01-01")
+        self.assertEqual(view.suggestions, 15)
+        self.assertEqual(view.acceptances, 9)
+        self.assertEqual(view.chat_acceptances, 1)
+        self.assertEqual([row[:3] for row in view.completion_rows],
+                         [("vscode", "default", "python"), ("vscode", "default", "go")])
+
+    def test_dashboard_metrics(self):
+        daily, global_metrics, languages = process_dashboard_metrics(self.days)
+        self.assertEqual([d['total_suggestions'] for d in daily], [15, 20])
+        self.assertEqual(global_metrics['active_days'], 2)
+        self.assertEqual(global_metrics['average_acceptance_rate'], 42.86)
+        self.assertEqual(list(languages), ["python", "go"])
+        self.assertEqual(languages["python"]["active_users"], 3)
+        self.assertEqual(summarize_daily_stats(daily), global_metrics)
+
+    def test_cube_slices(self):
+        processed, cube = process_dashboard_metrics_with_cube(self.days)
+        self.assertEqual(processed, process_dashboard_metrics(self.days))
+
+        total, = cube.slice(())
+        self.assertEqual((total['suggestions'], total['chat_turns']), (35, 2))
+        by_date = cube.slice(parse_group_by("date"))
+        self.assertEqual([(r['date'], r['suggestions']) for r in by_date], [("2024-01-01", 15), ("2024-01-02", 20)])
+        by_language = cube.slice(["language"])
+        self.assertEqual([(r['language'], r['engaged_users']) for r in by_language], [("python", 3), ("go", 1)])
+        self.assertNotIn('chat_turns', by_language[0])
+        with self.assertRaises(ValueError):
+            parse_group_by("date,team")
+
+    def test_extra_reducer_shares_the_pass(self):
+        class DaysSeen(Reducer):
+            name = 'seen'
+
+            def __init__(self):
+                self.dates = []
+
+            def add(self, day):
+                self.dates.append(day.date)
+
+            def result(self):
+                return self.dates
+
+        results = aggregate(self.days, [DaysSeen()])
+        self.assertEqual(results, {'seen': ["2024-01-01", "2024-01-02"]})
+
+        class Incomplete(Reducer):
+            def add(self, day):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_columnar_pipeline_matches_reducers(self):
+        self.days.append({"date": "2024-01-03", "total_active_users": 1})
+        self.assertEqual(process_dashboard_metrics_columnar(self.days), process_dashboard_metrics(self.days))
+
+    def test_metrics_frames_long_format(self):
+        completions, days, chats = metrics_frames(self.days)
+        self.assertEqual(len(completions), 3)
+        self.assertEqual(list(completions['language']), ["python", "go", "python"])
+        self.assertEqual(list(completions['editor'].unique()), ["vscode"])
+        self.assertEqual(list(days['chat_turns']), [2, 0])
+        self.assertEqual(list(chats['chat_acceptances']), [1, 1])
+
+class TestSlidingWindowAggregator(unittest.TestCase):
+    """Tests pour les agrégats glissants"""
+
+    @staticmethod
+    def day(date, language, suggestions, active_users):
+        return {
+            "date": date,
+            "total_active_users": active_users,
+            "copilot_ide_code_completions": {"editors": [{"name": "vscode", "models": [{
+                "name": "default",
+                "languages": [{"name": language, "total_code_suggestions": suggestions,
+                               "total_code_acceptances": suggestions // 2,
+                               "total_engaged_users": active_users}]
+            }]}]}
+        }
+
+    def test_matches_full_recompute(self):
+        days = [
+            self.day("2024-01-01", "python", 10, 9),
+            self.day("2024-01-02", "go", 4, 2),
+            self.day("2024-01-03", "python", 6, 5),
+            self.day("2024-01-04", "rust", 0, 7),
+        ]
+        window = SlidingWindowAggregator()
+        for i, day in enumerate(days):
+            window.push(day)
+            window.retire_before(days[max(0, i - 1)]["date"])
+            self.assertEqual(window.result(), process_dashboard_metrics(days[max(0, i - 1):i + 1]))
+        self.assertEqual(len(window), 2)
+
+    def test_newest_day_is_replaced(self):
+        window = SlidingWindowAggregator()
+        window.push(self.day("2024-01-01", "python", 10, 4))
+        window.push(self.day("2024-01-02", "python", 10, 8))
+        window.push(self.day("2024-01-02", "go", 2, 1))
+
+        expected = process_dashboard_metrics([self.day("2024-01-01", "python", 10, 4),
+                                              self.day("2024-01-02", "go", 2, 1)])
+        self.assertEqual(window.result(), expected)
+        self.assertEqual(window.global_metrics()["total_users"], 4)
+
+    def test_rejects_out_of_order_days(self):
+        window = SlidingWindowAggregator()
+        window.push(self.day("2024-01-02", "python", 1, 1))
+        with self.assertRaises(ValueError):
+            window.push(self.day("2024-01-01", "python", 1, 1))
+
 class TestCopilotMetricsProcessor(unittest.TestCase):
     """Tests pour le processeur de métriques"""
     
@@ -220,6 +924,44 @@ class TestCopilotUserManager(unittest.TestCase):
         self.assertIsNone(user2['days_since_last_activity'])
         self.assertEqual(user2['activity_status'], 'never_active')
     
+    def test_join_seats_with_user_activity_by_login(self):
+        """Test la jointure par login (casse ignorée) avec une source d'activité par utilisateur"""
+        activity = [
+            {"login": "USER1", "date": "2024-01-01", "language": "python",
+             "total_suggestions": 10, "accepted_suggestions": 4},
+            {"login": "user1", "date": "2024-01-02", "languages": ["go"],
+             "total_suggestions": 10, "accepted_suggestions": 6, "chat_turns": 2},
+            {"login": "ghost", "total_suggestions": 99},
+            {"date": "2024-01-01", "copilot_ide_code_completions": {}},
+        ]
+        
+        users = CopilotUserManager.process_users_data(self.sample_seats_data, activity)
+        
+        user1, user2 = users
+        self.assertEqual(user1.total_suggestions, 20)
+        self.assertEqual(user1.rejected_suggestions, 10)
+        self.assertEqual(user1.acceptance_rate, 50.0)
+        self.assertEqual(user1.languages, ["go", "python"])
+        self.assertEqual(user1.active_days, 2)
+        self.assertEqual(user1.chat_turns, 2)
+        self.assertEqual(user2.total_suggestions, 0)
+        self.assertEqual(CopilotUserManager.summarize_users(users)["total_users"], 2)
+    
+    def test_classify_seat_activity_in_batch(self):
+        """Test le classement vectorisé (seuils inclus, décalages horaires, valeurs invalides)"""
+        now = datetime(2024, 6, 1, 12, 0, 0)
+        values = [(now - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+                  for days in (0, 7, 8, 30, 31, 90, 91)]
+        values += ["2024-05-31T23:00:00+02:00", None, "", "not-a-date"]
+        
+        days_since, statuses = classify_seat_activity(values, now=now)
+        
+        self.assertEqual(days_since, [0, 7, 8, 30, 31, 90, 91, 0, None, None, None])
+        self.assertEqual(statuses, ["very_active", "very_active", "active", "active", "inactive",
+                                    "inactive", "very_inactive", "very_active", "never_active",
+                                    "never_active", "never_active"])
+        self.assertEqual(statuses, [CopilotUserManager._get_activity_status(d) for d in days_since])
+    
     def test_get_activity_status(self):
         """Test la détermination du statut d'activité"""
         self.assertEqual(
@@ -0,0 +1,206 @@
+"""
+Index des utilisateurs de /api/users - Pagination par curseur, tri et filtres côté serveur
+
+L'index est construit une fois par liste de sièges, sur les lignes de
+CopilotUserManager (que les exports réutilisent) : une permutation triée par
+clé de tri (login, dernière activité, création), puis, à la demande et
+mémorisée, la sous-séquence correspondant à chaque combinaison de filtres
+(statut d'activité, éditeur). Une page coûte alors une recherche
+dichotomique du curseur et `limit` lectures, quel que soit le nombre de
+sièges.
+"""
+import base64
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from records import SeatUser, UserRow
+from user_manager import ACTIVITY_STATUSES, NEVER_ACTIVE
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = {
+    'login': None,
+    'last_activity': 'last_activity',
+    'created_at': 'created_at',
+}
+# Ordre par défaut : alphabétique pour le login, plus récent d'abord pour les dates
+DEFAULT_ORDERS = {'login': 'asc', 'last_activity': 'desc', 'created_at': 'desc'}
+USER_STATUSES = ACTIVITY_STATUSES + (NEVER_ACTIVE,)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Taille estimée d'un utilisateur indexé (UserRow) pour le cache de réponses
+_USER_SIZE = 600
+# Index filtrés mémorisés par liste de sièges (LRU) et taille d'un élément de chacun
+_MAX_FILTERED_INDEXES = 16
+_FILTERED_ENTRY_SIZE = 16
+
+
+def editor_name(last_activity_editor: Optional[str]) -> Optional[str]:
+    """Nom de l'éditeur ('vscode/1.85.0/copilot/1.150.0' -> 'vscode')"""
+    if not last_activity_editor:
+        return None
+    return last_activity_editor.split('/', 1)[0].strip().lower() or None
+
+
+def seat_user(row: UserRow) -> SeatUser:
+    """Utilisateur de /api/users décrit par une ligne de CopilotUserManager"""
+    return SeatUser(
+        login=row.login,
+        name=row.name,
+        avatar_url=row.avatar_url,
+        last_activity=row.last_activity,
+        last_editor=row.last_activity_editor,
+        created_at=row.created_at,
+        is_active=row.last_activity is not None,
+        activity_status=row.activity_status,
+        days_since_last_activity=row.days_since_last_activity,
+    )
+
+
+def encode_cursor(sort: str, order: str, key: Tuple) -> str:
+    payload = json.dumps([sort, order, list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple:
+    """
+    Clé de tri du dernier élément de la page précédente.
+
+    Raises:
+        ValueError: curseur illisible ou émis pour un autre tri
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_order, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        missing, value, login, position = key
+        position = int(position)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor does not match the requested sort")
+    return bool(missing), str(value), str(login), position
+
+
+class UserIndex:
+    """
+    Utilisateurs d'une organisation (une ligne UserRow par siège) et leurs
+    index triés ; seuls les utilisateurs d'une page sont convertis en SeatUser.
+
+    Les clés de tri sont (valeur absente, valeur, login, position) : les
+    utilisateurs sans date sont en fin de liste dans les deux ordres, le login
+    puis la position du siège départagent les égalités (sièges sans assignee
+    au login vide compris), ce qui rend les clés uniques et les curseurs
+    stables. Chaque ordre a son index ; l'ordre décroissant parcourt le sien
+    à l'envers.
+    """
+
+    def __init__(self, users: Sequence[UserRow], total_seats: Optional[int] = None):
+        self.users = list(users)
+        self.total_seats = total_seats if total_seats is not None else len(self.users)
+        self.active_users = sum(1 for user in self.users if user.last_activity is not None)
+        self._editors = [editor_name(user.last_activity_editor) for user in self.users]
+        self._known_editors = frozenset(editor for editor in self._editors if editor)
+        self._sorted: Dict[Tuple[str, str], Tuple[List[Tuple], List[int]]] = {}
+        for sort, field in SORT_FIELDS.items():
+            keys = [self._key(user, field, position) for position, user in enumerate(self.users)]
+            positions = sorted(range(len(self.users)), key=keys.__getitem__)
+            keys = [keys[i] for i in positions]
+            self._sorted[sort, 'asc'] = (keys, positions)
+            # Index décroissant (parcouru à l'envers) : mêmes clés, valeurs absentes en tête
+            missing = bisect_left(keys, (True,))
+            self._sorted[sort, 'desc'] = (
+                [(False,) + key[1:] for key in keys[missing:]] + [(True,) + key[1:] for key in keys[:missing]],
+                positions[missing:] + positions[:missing],
+            )
+        self._filtered: "OrderedDict[Tuple, Tuple[List[Tuple], List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_user_rows(cls, rows: Sequence[UserRow], total_seats: Optional[int] = None) -> 'UserIndex':
+        """Construit l'index à partir des lignes de CopilotUserManager.process_users_data"""
+        return cls(rows, total_seats)
+
+    @staticmethod
+    def _key(user: SeatUser, field: Optional[str], position: int) -> Tuple:
+        login = (user.login or '').lower()
+        if field is None:
+            return False, login, login, position
+        value = getattr(user, field)
+        return value is None, value or '', login, position
+
+    def __len__(self):
+        return len(self.users)
+
+    def estimated_size(self) -> int:
+        """Utilisateurs et index filtrés mémorisés (au plus _MAX_FILTERED_INDEXES)"""
+        return len(self.users) * (_USER_SIZE + _MAX_FILTERED_INDEXES * _FILTERED_ENTRY_SIZE)
+
+    def _index(self, sort: str, order: str, statuses: Optional[FrozenSet[str]],
+               editors: Optional[FrozenSet[str]]) -> Tuple[List[Tuple], List[int]]:
+        """
+        Index trié restreint aux filtres, mémorisé pour les combinaisons les
+        plus récentes. Les éditeurs absents des sièges sont ignorés : ils ne
+        créent pas d'entrée, quelle que soit la valeur demandée.
+        """
+        keys, positions = self._sorted[sort, order]
+        if editors:
+            editors = editors & self._known_editors
+            if not editors:
+                return [], []
+        if not statuses and not editors:
+            return keys, positions
+        cache_key = (sort, order, statuses, editors)
+        with self._lock:
+            index = self._filtered.get(cache_key)
+            if index is not None:
+                self._filtered.move_to_end(cache_key)
+        if index is None:
+            kept = [
+                i for i, position in enumerate(positions)
+                if (not statuses or self.users[position].activity_status in statuses)
+                and (not editors or self._editors[position] in editors)
+            ]
+            index = ([keys[i] for i in kept], [positions[i] for i in kept])
+            with self._lock:
+                self._filtered[cache_key] = index
+                while len(self._filtered) > _MAX_FILTERED_INDEXES:
+                    self._filtered.popitem(last=False)
+        return index
+
+    def page(self, sort: str = 'login', order: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: Optional[str] = None, statuses: Optional[FrozenSet[str]] = None,
+             editors: Optional[FrozenSet[str]] = None) -> Dict:
+        """
+        Page d'utilisateurs suivant `cursor` (première page sans curseur).
+
+        Returns:
+            Dict avec `users`, `next_cursor` (None sur la dernière page) et
+            `total` (nombre d'utilisateurs correspondant aux filtres)
+
+        Raises:
+            ValueError: tri, ordre ou curseur invalide
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort: {sort} (expected: {', '.join(SORT_FIELDS)})")
+        order = order or DEFAULT_ORDERS[sort]
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unknown order: {order} (expected: asc, desc)")
+        keys, positions = self._index(sort, order, statuses, editors)
+
+        if order == 'asc':
+            start = bisect_right(keys, decode_cursor(cursor, sort, order)) if cursor else 0
+            selected = range(start, min(start + limit, len(keys)))
+            has_more = start + limit < len(keys)
+        else:
+            end = bisect_left(keys, decode_cursor(cursor, sort, order)) if cursor else len(keys)
+            selected = range(end - 1, max(end - limit, 0) - 1, -1)
+            has_more = end - limit > 0
+
+        users = [seat_user(self.users[positions[i]]) for i in selected]
+        next_cursor = encode_cursor(sort, order, keys[selected[-1]]) if has_more and users else None
+        return {'users': users, 'next_cursor': next_cursor, 'total': len(keys)}
@@ -2,84 +2,172 @@
 Gestionnaire d'utilisateurs GitHub Copilot - Traitement des données de sièges
 """
 import logging
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from records import UserRow
+
 logger = logging.getLogger(__name__)
 
+# Seuils (en jours depuis la dernière activité, inclus) et statuts correspondants
+ACTIVITY_BOUNDS = (7, 30, 90)
+ACTIVITY_STATUSES = ('very_active', 'active', 'inactive', 'very_inactive')
+NEVER_ACTIVE = 'never_active'
+# Un utilisateur est actif s'il a utilisé Copilot dans les 30 derniers jours
+ACTIVE_WITHIN_DAYS = 30
+
+# Compteurs additionnés par utilisateur dans les enregistrements d'activité
+USER_ACTIVITY_FIELDS = ('total_suggestions', 'accepted_suggestions', 'lines_suggested', 'lines_accepted',
+                        'chat_turns', 'chat_acceptances')
+
+_STATUS_LABELS = np.array(ACTIVITY_STATUSES + (NEVER_ACTIVE,), dtype=object)
+
+
+def _parse_timestamps(values: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    Horodatages ISO 8601 -> datetime64[s] UTC (NaT si absent ou invalide).
+    La forme renvoyée par GitHub ('2024-01-01T10:00:00Z') est parsée en bloc
+    par NumPy ; les autres (décalage horaire, fractions de seconde) par pandas.
+    """
+    utc = [value[:19] if value and len(value) == 20 and value[-1] == 'Z' else 'NaT' for value in values]
+    try:
+        timestamps = np.array(utc, dtype='datetime64[s]')
+    except ValueError:
+        timestamps = np.full(len(utc), np.datetime64('NaT'), dtype='datetime64[s]')
+        utc = ['NaT'] * len(utc)
+    others = [i for i, (value, fast) in enumerate(zip(values, utc)) if value and fast == 'NaT']
+    if others:
+        parsed = pd.to_datetime(pd.Series([values[i] for i in others], dtype=object), utc=True,
+                                errors='coerce', format='ISO8601')
+        timestamps[others] = parsed.dt.tz_convert(None).to_numpy(dtype='datetime64[s]')
+    return timestamps
+
+
+def classify_seat_activity(last_activity: Sequence[Optional[str]],
+                           now: Optional[datetime] = None) -> Tuple[List[Optional[int]], List[str]]:
+    """
+    Jours depuis la dernière activité et statut d'activité de tous les sièges
+    en une fois : les horodatages ISO 8601 sont parsés en un tableau
+    datetime64, comparés à une seule heure de référence (UTC) et répartis
+    entre les seuils ACTIVITY_BOUNDS par searchsorted.
+
+    Args:
+        last_activity: `last_activity_at` de chaque siège (None ou invalide : jamais actif)
+        now: heure de référence UTC naïve (maintenant par défaut)
+
+    Returns:
+        Tuple[jours depuis la dernière activité (None si inconnue), statuts]
+    """
+    timestamps = _parse_timestamps(last_activity)
+    reference = np.datetime64(now or datetime.utcnow(), 's')
+
+    known = ~np.isnat(timestamps)
+    days = np.zeros(len(timestamps), dtype=np.int64)
+    days[known] = (reference - timestamps[known]) // np.timedelta64(1, 'D')
+    positions = np.searchsorted(ACTIVITY_BOUNDS, days, side='left')
+    statuses = _STATUS_LABELS[np.where(known, positions, len(ACTIVITY_STATUSES))]
+
+    days_since = [value if is_known else None for value, is_known in zip(days.tolist(), known.tolist())]
+    return days_since, statuses.tolist()
+
+
 class CopilotUserManager:
     """Gestionnaire pour les utilisateurs et sièges Copilot"""
     
     @staticmethod
-    def process_users_data(seats_data: Dict, metrics_data: List[Dict]) -> List[Dict]:
+    def process_users_data(seats_data: Dict, user_activity: Iterable[Dict] = ()) -> List[UserRow]:
         """
-        Traite les données des utilisateurs en combinant sièges et métriques
+        Traite les données des utilisateurs : jointure, par login, des sièges
+        avec une source d'activité par utilisateur
         
         Args:
             seats_data: Données des sièges depuis l'API billing/seats
-            metrics_data: Données des métriques depuis l'API metrics
+            user_activity: Enregistrements d'activité par utilisateur (voir
+                _compile_user_stats) ; les jours agrégés de /copilot/metrics,
+                sans login, sont ignorés
             
         Returns:
-            Liste des utilisateurs avec leurs statistiques
+            Liste des utilisateurs avec leurs statistiques (un par siège)
         """
-        logger.debug(f"Processing {len(seats_data.get('seats', []))} seats")
+        seats = seats_data.get('seats') or []
+        logger.debug(f"Processing {len(seats)} seats")
+        
+        # Index login -> statistiques, construit en un seul passage sur l'activité
+        user_stats = CopilotUserManager._compile_user_stats(user_activity)
         
-        # Compiler les statistiques par utilisateur depuis les métriques
-        user_stats = CopilotUserManager._compile_user_stats(metrics_data)
+        # Statuts d'activité de tous les sièges, calculés en un seul passage vectorisé
+        days_since, statuses = classify_seat_activity([seat.get('last_activity_at') for seat in seats])
         
-        # Préparer la liste des utilisateurs
-        users = []
-        for seat in seats_data.get('seats', []):
-            user = CopilotUserManager._process_user_seat(seat, user_stats)
-            users.append(user)
+        # Jointure : une recherche dans l'index par siège
+        users = [
+            CopilotUserManager._process_user_seat(seat, user_stats, days_since_activity, activity_status)
+            for seat, days_since_activity, activity_status in zip(seats, days_since, statuses)
+        ]
         
-        logger.debug(f"Processed {len(users)} users")
+        logger.debug(f"Processed {len(users)} users ({len(user_stats)} with activity)")
         return users
     
     @staticmethod
-    def _compile_user_stats(metrics_data: List[Dict]) -> Dict[str, Dict]:
-        """Compile les statistiques par utilisateur depuis les métriques"""
-        user_stats = {}
+    def _compile_user_stats(user_activity: Iterable[Dict]) -> Dict[str, Dict]:
+        """
+        Indexe l'activité par login (insensible à la casse) en un seul passage.
         
-        for day_data in metrics_data:
-            date = day_data.get('date')
-            
-            # Traitement des complétions de code IDE
-            ide_completions = day_data.get('copilot_ide_code_completions', {})
-            CopilotUserManager._process_ide_completions_for_users(
-                ide_completions, user_stats, date
-            )
-            
-            # Traitement du chat IDE
-            ide_chat = day_data.get('copilot_ide_chat', {})
-            CopilotUserManager._process_ide_chat_for_users(
-                ide_chat, user_stats, date
-            )
+        Chaque enregistrement porte un `login` (ou `user_login`), une date
+        optionnelle (`date` ou `day`, pour compter les jours actifs), un
+        `language` ou une liste `languages`, et tout ou partie des compteurs
+        USER_ACTIVITY_FIELDS. Plusieurs enregistrements d'un même login
+        (un par jour, par langage...) sont additionnés.
+        """
+        totals: Dict[str, list] = {}
+        for record in user_activity or ():
+            login = record.get('login') or record.get('user_login')
+            if not login:
+                continue
+            entry = totals.get(login.lower())
+            if entry is None:
+                entry = totals[login.lower()] = [[0] * len(USER_ACTIVITY_FIELDS), set(), set()]
+            counters, languages, dates = entry
+            for i, name in enumerate(USER_ACTIVITY_FIELDS):
+                counters[i] += record.get(name) or 0
+            if record.get('language'):
+                languages.add(record['language'])
+            languages.update(record.get('languages') or ())
+            date = record.get('date') or record.get('day')
+            if date:
+                dates.add(date[:10])
         
+        user_stats = {}
+        for login, (counters, languages, dates) in totals.items():
+            stats = dict(zip(USER_ACTIVITY_FIELDS, counters))
+            suggestions, accepted = stats['total_suggestions'], stats['accepted_suggestions']
+            stats['rejected_suggestions'] = max(suggestions - accepted, 0)
+            stats['acceptance_rate'] = round(accepted / suggestions * 100, 2) if suggestions > 0 else 0
+            stats['languages'] = sorted(languages)
+            stats['active_days'] = len(dates)
+            user_stats[login] = stats
         return user_stats
     
     @staticmethod
-    def _process_ide_completions_for_users(ide_completions: Dict, user_stats: Dict, date: str):
-        """Traite les complétions IDE pour extraire les stats utilisateur"""
-        # Note: La nouvelle API ne fournit pas de données par utilisateur individuel
-        # dans les métriques, seulement des agrégations
-        # Cette fonction est préparée pour une future évolution de l'API
-        pass
-    
-    @staticmethod
-    def _process_ide_chat_for_users(ide_chat: Dict, user_stats: Dict, date: str):
-        """Traite le chat IDE pour extraire les stats utilisateur"""
-        # Note: Même limitation que pour les complétions
-        pass
+    def summarize_users(users: Iterable[UserRow]) -> Dict[str, int]:
+        """Nombre d'utilisateurs, d'actifs (activité dans les 30 derniers jours) et d'inactifs"""
+        total = active = 0
+        for user in users:
+            total += 1
+            active += user.is_active
+        return {'total_users': total, 'active_users': active, 'inactive_users': total - active}
     
     @staticmethod
-    def _process_user_seat(seat: Dict, user_stats: Dict) -> Dict:
-        """Traite les données d'un siège utilisateur"""
-        assignee = seat.get('assignee', {})
-        login = assignee.get('login', '')
+    def _process_user_seat(seat: Dict, user_stats: Dict, days_since_activity: Optional[int],
+                           activity_status: str) -> UserRow:
+        """Traite les données d'un siège utilisateur (activité déjà classée par classify_seat_activity)"""
+        assignee = seat.get('assignee') or {}
+        login = assignee.get('login') or ''
         
-        # Récupération des stats utilisateur (vides pour l'instant car l'API ne les fournit pas)
-        stats = user_stats.get(login, {
+        # Statistiques d'utilisation de l'index (vides sans activité connue pour ce login)
+        stats = user_stats.get(login.lower(), {
             'total_suggestions': 0,
             'accepted_suggestions': 0,
             'rejected_suggestions': 0,
@@ -92,63 +180,44 @@ class CopilotUserManager:
             'chat_acceptances': 0
         })
         
-        # Formatage de la dernière activité
-        last_activity = seat.get('last_activity_at')
-        if last_activity:
-            try:
-                last_activity_date = datetime.fromisoformat(
-                    last_activity.replace('Z', '+00:00')
-                )
-                days_since_activity = (datetime.now().replace(tzinfo=None) - 
-                                     last_activity_date.replace(tzinfo=None)).days
-            except:
-                days_since_activity = None
-        else:
-            days_since_activity = None
-        
-        user = {
-            'login': login,
-            'name': assignee.get('name'),
-            'avatar_url': assignee.get('avatar_url'),
-            'last_activity': last_activity,
-            'last_activity_editor': seat.get('last_activity_editor'),
-            'last_authenticated_at': seat.get('last_authenticated_at'),
-            'created_at': seat.get('created_at'),
-            'updated_at': seat.get('updated_at'),
-            'pending_cancellation_date': seat.get('pending_cancellation_date'),
-            'plan_type': seat.get('plan_type', 'business'),
-            'days_since_last_activity': days_since_activity,
+        user = UserRow(
+            login=login,
+            name=assignee.get('name'),
+            avatar_url=assignee.get('avatar_url'),
+            last_activity=seat.get('last_activity_at'),
+            last_activity_editor=seat.get('last_activity_editor'),
+            last_authenticated_at=seat.get('last_authenticated_at'),
+            created_at=seat.get('created_at'),
+            updated_at=seat.get('updated_at'),
+            pending_cancellation_date=seat.get('pending_cancellation_date'),
+            plan_type=seat.get('plan_type', 'business'),
+            days_since_last_activity=days_since_activity,
             
             # Statistiques d'utilisation
-            'total_suggestions': stats['total_suggestions'],
-            'accepted_suggestions': stats['accepted_suggestions'],
-            'rejected_suggestions': stats['rejected_suggestions'],
-            'acceptance_rate': stats['acceptance_rate'],
-            'languages': stats['languages'],
-            'active_days': stats['active_days'],
-            'lines_suggested': stats['lines_suggested'],
-            'lines_accepted': stats['lines_accepted'],
-            'chat_turns': stats['chat_turns'],
-            'chat_acceptances': stats['chat_acceptances'],
+            total_suggestions=stats['total_suggestions'],
+            accepted_suggestions=stats['accepted_suggestions'],
+            rejected_suggestions=stats['rejected_suggestions'],
+            acceptance_rate=stats['acceptance_rate'],
+            languages=stats['languages'],
+            active_days=stats['active_days'],
+            lines_suggested=stats['lines_suggested'],
+            lines_accepted=stats['lines_accepted'],
+            chat_turns=stats['chat_turns'],
+            chat_acceptances=stats['chat_acceptances'],
             
             # Statut d'activité
-            'is_active': days_since_activity is not None and days_since_activity <= 30,
-            'activity_status': CopilotUserManager._get_activity_status(days_since_activity)
-        }
+            is_active=days_since_activity is not None and days_since_activity <= ACTIVE_WITHIN_DAYS,
+            activity_status=activity_status
+        )
         
         return user
     
     @staticmethod
-    def _get_activity_status(days_since_activity: int) -> str:
-        """Détermine le statut d'activité d'un utilisateur"""
+    def _get_activity_status(days_since_activity: Optional[int]) -> str:
+        """Détermine le statut d'activité d'un utilisateur (mêmes seuils que classify_seat_activity)"""
         if days_since_activity is None:
-            return 'never_active'
-        elif days_since_activity <= 7:
-            return 'very_active'
-        elif days_since_activity <= 30:
-            return 'active'
-        elif days_since_activity <= 90:
-            return 'inactive'
-        else:
-            return 'very_inactive'
-
+            return NEVER_ACTIVE
+        for bound, status in zip(ACTIVITY_BOUNDS, ACTIVITY_STATUSES):
+            if days_since_activity <= bound:
+                return status
+        return ACTIVITY_STATUSES[-1]
@@ -0,0 +1,6 @@
+"""
+Point d'entrée WSGI de production : gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app
+
+__all__ = ['app']
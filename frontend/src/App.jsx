@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react'
-import { Container, Box, TextField, Button, Paper, Typography, Grid, CircularProgress, Alert, TableContainer, Table, TableHead, TableRow, TableCell, TableBody, Avatar, Chip, Link, Dialog, DialogTitle, DialogContent, DialogActions, InputAdornment, Divider, Tooltip as MuiTooltip, IconButton, TableSortLabel } from '@mui/material'
+import { Container, Box, TextField, Button, Paper, Typography, Grid, CircularProgress, Alert, TableContainer, Table, TableHead, TableRow, TableCell, TableBody, Avatar, Chip, Link, Dialog, DialogTitle, DialogContent, DialogActions, InputAdornment, Divider, Tooltip as MuiTooltip, IconButton, TableSortLabel, MenuItem } from '@mui/material'
 import { Bar, Line, Pie } from 'react-chartjs-2'
 import {
   Chart as ChartJS,
@@ -35,6 +35,20 @@ function App() {
   const [error, setError] = useState(null)
   const [users, setUsers] = useState([]);
   const [totalSeats, setTotalSeats] = useState(0);
+  // Utilisateurs paginés, triés et filtrés côté serveur (/api/users)
+  const [activeUsersCount, setActiveUsersCount] = useState(0);
+  const [usersTotal, setUsersTotal] = useState(0);
+  const [usersCursor, setUsersCursor] = useState(null);
+  const [usersSort, setUsersSort] = useState({ sort: 'login', order: 'asc' });
+  const [usersStatus, setUsersStatus] = useState('');
+  const handleUsersSort = (property) => {
+    setUsersSort((prev) => ({
+      sort: property,
+      order: prev.sort === property
+        ? (prev.order === 'asc' ? 'desc' : 'asc')
+        : (property === 'login' ? 'asc' : 'desc')
+    }));
+  };
 
   // Tri pour la table "Statistiques détaillées par Langage"
   const [langOrderBy, setLangOrderBy] = useState('suggestions');
@@ -217,13 +231,20 @@ function App() {
     fetchMetrics()
   }
 
-  const fetchUsers = async () => {
+  // Charge la première page (ou la suivante avec `cursor`) ; le navigateur ne reçoit qu'une page à la fois
+  const fetchUsers = async (cursor = null) => {
     try {
-        const response = await fetch('/api/users');
+        const params = new URLSearchParams({ limit: '50', sort: usersSort.sort, order: usersSort.order });
+        if (usersStatus) params.set('status', usersStatus);
+        if (cursor) params.set('cursor', cursor);
+        const response = await fetch(`/api/users?${params}`);
         const data = await response.json();
         if (response.ok) {
-            setUsers(data.users);
+            setUsers((prev) => (cursor ? [...prev, ...data.users] : data.users));
+            setUsersCursor(data.next_cursor);
+            setUsersTotal(data.total);
             setTotalSeats(data.total_seats);
+            setActiveUsersCount(data.active_users);
         } else {
             console.error('Failed to fetch users:', data.error);
         }
@@ -232,6 +253,14 @@ function App() {
     }
   };
 
+  // Nouveau tri ou filtre : on repart de la première page
+  useEffect(() => {
+    if (metrics) {
+      fetchUsers();
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [usersSort, usersStatus]);
+
   if (loading) return (
     <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '100vh' }}>
       <CircularProgress />
@@ -1015,14 +1044,43 @@ function App() {
               <Typography variant="h5" gutterBottom>
                 Activité des Utilisateurs
               </Typography>
+              <TextField
+                select
+                size="small"
+                label="Statut"
+                value={usersStatus}
+                onChange={(e) => setUsersStatus(e.target.value)}
+                sx={{ mb: 2, minWidth: 200 }}
+              >
+                <MenuItem value="">Tous</MenuItem>
+                <MenuItem value="very_active,active">Actifs (30 jours)</MenuItem>
+                <MenuItem value="inactive,very_inactive">Inactifs</MenuItem>
+                <MenuItem value="never_active">Jamais actifs</MenuItem>
+              </TextField>
               {users.length > 0 ? (
                 <TableContainer component={Paper}>
                   <Table size="small">
                     <TableHead>
                       <TableRow>
-                        <TableCell>Utilisateur</TableCell>
+                        <TableCell sortDirection={usersSort.sort === 'login' ? usersSort.order : false}>
+                          <TableSortLabel
+                            active={usersSort.sort === 'login'}
+                            direction={usersSort.sort === 'login' ? usersSort.order : 'asc'}
+                            onClick={() => handleUsersSort('login')}
+                          >
+                            Utilisateur
+                          </TableSortLabel>
+                        </TableCell>
                         <TableCell>Statut</TableCell>
-                        <TableCell>Dernière Activité</TableCell>
+                        <TableCell sortDirection={usersSort.sort === 'last_activity' ? usersSort.order : false}>
+                          <TableSortLabel
+                            active={usersSort.sort === 'last_activity'}
+                            direction={usersSort.sort === 'last_activity' ? usersSort.order : 'desc'}
+                            onClick={() => handleUsersSort('last_activity')}
+                          >
+                            Dernière Activité
+                          </TableSortLabel>
+                        </TableCell>
                         <TableCell>Éditeur</TableCell>
                       </TableRow>
                     </TableHead>
@@ -1060,12 +1118,17 @@ function App() {
               ) : (
                 <Typography color="text.secondary">Aucune donnée disponible</Typography>
               )}
+              {usersCursor && (
+                <Button sx={{ mt: 1 }} onClick={() => fetchUsers(usersCursor)}>
+                  Afficher plus ({users.length} / {usersTotal})
+                </Button>
+              )}
               <Box sx={{ mt: 2, display: 'flex', gap: 2 }}>
                 <Typography variant="body2" color="text.secondary">
                   Total des sièges : {totalSeats}
                 </Typography>
                 <Typography variant="body2" color="text.secondary">
-                  Utilisateurs actifs : {users.filter(u => u.is_active).length}
+                  Utilisateurs actifs : {activeUsersCount}
                 </Typography>
               </Box>
             </Box>